@@ -1,32 +1,233 @@
 # api/app/db.py
 from __future__ import annotations
 
-import sqlite3
+import functools
 import pathlib
+import queue
+import sqlite3
+import threading
 import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from typing import Any
 
 DB_PATH = pathlib.Path(__file__).resolve().parents[1] / "data" / "app.db"
 
 
-# ---------- connect ----------
-def connect(db_path: pathlib.Path = DB_PATH) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path), check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    with conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA foreign_keys=ON;")
-        # Consider: conn.execute("PRAGMA synchronous=NORMAL;")
-    _ensure_core_schema(conn)
-    _ensure_blocks_schema(conn)
-    return conn
+# ---------- connection pool ----------
+# Readers get one connection per thread; every write goes through a single
+# writer thread that commits whatever has queued up in one transaction
+# (group commit), so worker threads neither contend for SQLite's write lock
+# nor pay an fsync each.
+
+_COMMON_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",  # 16 MiB
+)
+_WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # WAL + NORMAL: commits survive an app crash; only the WAL is fsync'd, at
+    # checkpoints, instead of on every commit
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA wal_autocheckpoint=4000",
+)
+_READER_PRAGMAS = (
+    "PRAGMA query_only=ON",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+)
+
+# Upper bound on write operations folded into one transaction.
+WRITE_BATCH_MAX = 512
+
+
+class Database:
+    """
+    SQLite access for the API: thread-local reader connections plus a single
+    batching writer. DAO functions in this module accept either a Database
+    (the app's) or a plain sqlite3.Connection (scripts, one-off tools).
+    """
+
+    def __init__(self, db_path: pathlib.Path = DB_PATH):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = db_path
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._queue: queue.Queue[tuple | None] = queue.Queue()
+        self._closed = False
+
+        self._writer = self._open(_WRITER_PRAGMAS)
+        _ensure_core_schema(self._writer)
+        _ensure_blocks_schema(self._writer)
+        _ensure_factor_schema(self._writer)
+        _ensure_prp_schema(self._writer)
+        _ensure_run_schema(self._writer)
+        _ensure_lease_schema(self._writer)
+        _ensure_version_schema(self._writer)
+        _ensure_artifact_cache_schema(self._writer)
+        _ensure_job_result_schema(self._writer)
+        self._thread = threading.Thread(
+            target=self._write_loop, name="db-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _open(self, pragmas) -> sqlite3.Connection:
+        # autocommit mode: transactions are explicit (BEGIN in the writer)
+        conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _COMMON_PRAGMAS + tuple(pragmas):
+            conn.execute(pragma)
+        return conn
+
+    # ---- reads --------------------------------------------------------------
+
+    def reader(self) -> sqlite3.Connection:
+        """The calling thread's read-only connection (opened on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("database is closed")
+            conn = self._open(_READER_PRAGMAS)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Ad-hoc read query on the calling thread's connection."""
+        return self.reader().execute(sql, params)
+
+    # ---- writes -------------------------------------------------------------
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue `fn(conn, *args, **kwargs)` for the writer. The returned future
+        resolves once the transaction containing it has committed.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("database is closed")
+        fut: Future = Future()
+        self._queue.put((fn, args, kwargs, fut))
+        return fut
+
+    def write(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a write on the writer thread and wait until it is committed."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _write_loop(self) -> None:
+        conn = self._writer
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._commit(conn, batch)
+            if stop:
+                return
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> None:
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, kwargs, _fut in batch:
+                # each op in its own savepoint, so one failure spares the rest
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((True, fn(conn, *args, **kwargs)))
+                    conn.execute("RELEASE op")
+                except Exception as e:  # noqa: BLE001 - handed to the caller
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except Exception as e:  # noqa: BLE001
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for *_, fut in batch:
+                fut.set_exception(e)
+            return
+        for (ok, value), (*_, fut) in zip(results, batch):
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+
+    # ---- lifecycle ----------------------------------------------------------
+
+    def close(self) -> None:
+        """Flush pending writes, stop the writer and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.close()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
+
+def _write(fn):
+    """
+    DAO write: runs on the writer thread (Database) or in its own transaction;
+    joins the caller's transaction if one is open (e.g. a writer batch).
+    """
+
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        if isinstance(conn, Database):
+            return conn.write(fn, *args, **kwargs)
+        if conn.in_transaction:
+            return fn(conn, *args, **kwargs)
+        with conn:
+            return fn(conn, *args, **kwargs)
+
+    return wrapper
+
+
+def _read(fn):
+    """DAO read: runs on the calling thread's reader connection."""
+
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        if isinstance(conn, Database):
+            conn = conn.reader()
+        return fn(conn, *args, **kwargs)
+
+    return wrapper
+
+
+def connect(db_path: pathlib.Path = DB_PATH) -> Database:
+    return Database(db_path)
+
+
+def _ensure_column(conn: sqlite3.Connection, table: str, column: str, decl: str):
+    """Add a column to an existing table if it is missing (lightweight migration)."""
+    cols = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        with conn:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
 
 
 # ---------- core (jobs/artifacts) ----------
 def _ensure_core_schema(conn: sqlite3.Connection):
     with conn:
-        conn.executescript(
-            """
+        conn.executescript("""
         CREATE TABLE IF NOT EXISTS jobs(
           id TEXT PRIMARY KEY,
           kind TEXT NOT NULL,          -- 'll' | 'digits'
@@ -48,48 +249,108 @@ def _ensure_core_schema(conn: sqlite3.Connection):
           sha256 TEXT NOT NULL,
           FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
         );
-        """
-        )
+        """)
 
 
+@_write
 def job_insert(
     c: sqlite3.Connection, id: str, kind: str, p: int, status: str = "queued"
 ):
-    with c:
-        c.execute(
-            "INSERT INTO jobs(id,kind,p,status,created_at) VALUES(?,?,?,?,?)",
-            (id, kind, int(p), status, int(time.time())),
-        )
+    c.execute(
+        "INSERT INTO jobs(id,kind,p,status,created_at) VALUES(?,?,?,?,?)",
+        (id, kind, int(p), status, int(time.time())),
+    )
 
 
+@_write
 def job_start(c: sqlite3.Connection, id: str):
-    with c:
-        c.execute(
-            "UPDATE jobs SET status='running', started_at=? WHERE id=?",
-            (int(time.time()), id),
-        )
+    c.execute(
+        "UPDATE jobs SET status='running', started_at=? WHERE id=?",
+        (int(time.time()), id),
+    )
 
 
-def job_finish_ok(c: sqlite3.Connection, id: str, engine: str | None = None):
-    with c:
-        c.execute(
-            "UPDATE jobs SET status='done', finished_at=?, engine_info=? WHERE id=?",
-            (int(time.time()), engine, id),
-        )
+@_write
+def job_finish_ok(
+    c: sqlite3.Connection, id: str, engine: str | None = None, result: str | None = None
+):
+    c.execute(
+        "UPDATE jobs SET status='done', finished_at=?, engine_info=?, result=? WHERE id=?",
+        (int(time.time()), engine, result, id),
+    )
+
 
+@_write
+def job_insert_done(
+    c: sqlite3.Connection,
+    id: str,
+    kind: str,
+    p: int,
+    result: str,
+    engine: str | None = None,
+):
+    """Record a job whose result was already known (finished on creation)."""
+    now = int(time.time())
+    c.execute(
+        "INSERT INTO jobs(id,kind,p,status,created_at,started_at,finished_at,engine_info,result)"
+        " VALUES(?,?,?,'done',?,?,?,?,?)",
+        (id, kind, int(p), now, now, now, engine, result),
+    )
 
+
+@_write
 def job_fail(c: sqlite3.Connection, id: str, err: str):
-    with c:
-        c.execute(
-            "UPDATE jobs SET status='error', finished_at=?, error=? WHERE id=?",
-            (int(time.time()), err, id),
-        )
+    c.execute(
+        "UPDATE jobs SET status='error', finished_at=?, error=? WHERE id=?",
+        (int(time.time()), err, id),
+    )
 
 
+@_read
 def job_get(c: sqlite3.Connection, id: str):
     return c.execute("SELECT * FROM jobs WHERE id=?", (id,)).fetchone()
 
 
+@_read
+def job_latest_result(c: sqlite3.Connection, kind: str, p: int):
+    """The most recent finished job of this kind for p that recorded a result."""
+    return c.execute(
+        "SELECT * FROM jobs WHERE kind=? AND p=? AND status='done' AND result IS NOT NULL"
+        " ORDER BY finished_at DESC LIMIT 1",
+        (kind, int(p)),
+    ).fetchone()
+
+
+@_read
+def jobs_unfinished(c: sqlite3.Connection, kind: str):
+    return c.execute(
+        "SELECT * FROM jobs WHERE kind=? AND status IN ('queued','running') ORDER BY created_at",
+        (kind,),
+    ).fetchall()
+
+
+def _ensure_job_result_schema(conn: sqlite3.Connection):
+    # result: JSON of an LL job's llcore result (or of the known verdict it
+    # was answered from), so GET /jobs/{id} outlives the process
+    _ensure_column(conn, "jobs", "result", "TEXT")
+    with conn:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_p ON jobs(p, kind)")
+
+
+def _ensure_artifact_cache_schema(conn: sqlite3.Connection):
+    # (p, format) identify an artifact's content, so each has at most one row;
+    # rows from before the cache keep NULLs and are never looked up or evicted.
+    # last_access orders LRU eviction under the disk budget.
+    _ensure_column(conn, "artifacts", "p", "INTEGER")
+    _ensure_column(conn, "artifacts", "format", "TEXT")
+    _ensure_column(conn, "artifacts", "last_access", "INTEGER")
+    with conn:
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_artifacts_key ON artifacts(p, format)"
+        )
+
+
+@_write
 def artifact_insert(
     c: sqlite3.Connection,
     job_id: str,
@@ -98,14 +359,57 @@ def artifact_insert(
     digits: int,
     size_bytes: int,
     sha256: str,
+    p: int | None = None,
+    fmt: str | None = None,
 ):
-    with c:
-        c.execute(
-            "INSERT INTO artifacts(job_id,filename,path,digits,size_bytes,sha256) VALUES(?,?,?,?,?,?)",
-            (job_id, filename, path, int(digits), int(size_bytes), sha256),
-        )
+    c.execute(
+        """
+        INSERT INTO artifacts(job_id,filename,path,digits,size_bytes,sha256,p,format,last_access)
+        VALUES(?,?,?,?,?,?,?,?,?)
+    """,
+        (
+            job_id,
+            filename,
+            path,
+            int(digits),
+            int(size_bytes),
+            sha256,
+            p,
+            fmt,
+            int(time.time()),
+        ),
+    )
+
+
+@_read
+def artifact_get_cached(c: sqlite3.Connection, p: int, fmt: str):
+    return c.execute(
+        "SELECT * FROM artifacts WHERE p=? AND format=?", (int(p), fmt)
+    ).fetchone()
+
+
+@_write
+def artifact_touch(c: sqlite3.Connection, job_id: str):
+    c.execute(
+        "UPDATE artifacts SET last_access=? WHERE job_id=?", (int(time.time()), job_id)
+    )
+
 
+@_read
+def artifacts_cached_lru(c: sqlite3.Connection):
+    """Cached artifacts, least recently used first."""
+    return c.execute("""
+        SELECT job_id, path, size_bytes FROM artifacts
+        WHERE format IS NOT NULL ORDER BY last_access, rowid
+    """).fetchall()
 
+
+@_write
+def artifact_delete(c: sqlite3.Connection, job_id: str):
+    c.execute("DELETE FROM artifacts WHERE job_id=?", (job_id,))
+
+
+@_read
 def artifact_get_by_job(c: sqlite3.Connection, job_id: str):
     return c.execute("SELECT * FROM artifacts WHERE job_id=?", (job_id,)).fetchone()
 
@@ -113,8 +417,7 @@ def artifact_get_by_job(c: sqlite3.Connection, job_id: str):
 # ---------- blocks/exponents ----------
 def _ensure_blocks_schema(conn: sqlite3.Connection):
     with conn:
-        conn.executescript(
-            """
+        conn.executescript("""
         PRAGMA journal_mode=WAL;
         PRAGMA foreign_keys=ON;
 
@@ -165,10 +468,91 @@ def _ensure_blocks_schema(conn: sqlite3.Connection):
         CREATE INDEX IF NOT EXISTS idx_exponents_block    ON exponents(block_id);
         CREATE INDEX IF NOT EXISTS idx_exponents_status   ON exponents(status);
         CREATE INDEX IF NOT EXISTS idx_exponents_prime_ok ON exponents(is_prime, status);
-        """
-        )
+        """)
+
+
+def _ensure_factor_schema(conn: sqlite3.Connection):
+    # factor: smallest known factor of M_p (decimal text; may exceed 64 bits)
+    # tf_bits: trial factoring has searched all q < 2^tf_bits
+    _ensure_column(conn, "exponents", "factor", "TEXT")
+    _ensure_column(conn, "exponents", "tf_bits", "INTEGER NOT NULL DEFAULT 0")
+    # pm1_b1/pm1_b2: P-1 bounds already run without finding a factor
+    _ensure_column(conn, "exponents", "pm1_b1", "INTEGER")
+    _ensure_column(conn, "exponents", "pm1_b2", "INTEGER")
+
 
+def _ensure_prp_schema(conn: sqlite3.Connection):
+    # test_kind: 'prp' when a Gerbicz-checked PRP run decided the exponent
+    # (composites) or preceded its LL confirmation (primes); NULL for plain LL
+    # res64: low 64 bits of 3^(2^p) mod M_p (hex) from that run
+    _ensure_column(conn, "exponents", "test_kind", "TEXT")
+    _ensure_column(conn, "exponents", "res64", "TEXT")
+    # proof_status: 'pending' while the run's PRP proof awaits verification,
+    # then 'verified' or 'invalid'; NULL when no proof was made
+    _ensure_column(conn, "exponents", "proof_status", "TEXT")
 
+
+def _ensure_run_schema(conn: sqlite3.Connection):
+    # run_params: JSON start options of the block's current run; blocks with
+    # status='running' are resumed with them on startup
+    _ensure_column(conn, "blocks", "run_params", "TEXT")
+
+
+def _ensure_lease_schema(conn: sqlite3.Connection):
+    # lease_id: set while a remote worker holds the exponent (status='running')
+    # lease_expires_at: epoch seconds; heartbeats push it forward, and an
+    #   expired lease puts the exponent back in the queue
+    # lease_worker: who holds (or last held) it; lease_iteration: its progress
+    _ensure_column(conn, "exponents", "lease_id", "TEXT")
+    _ensure_column(conn, "exponents", "lease_worker", "TEXT")
+    _ensure_column(conn, "exponents", "lease_expires_at", "INTEGER")
+    _ensure_column(conn, "exponents", "lease_iteration", "INTEGER")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_exponents_lease ON exponents(lease_id)"
+    )
+
+
+# Columns a block-detail client sees; a change to any of them gives the row a
+# new version so /blocks/{id}/exponents?since=V can return just the delta.
+EXPONENT_DETAIL_COLUMNS = (
+    "status",
+    "is_prime",
+    "ns_elapsed",
+    "engine_info",
+    "factor",
+    "test_kind",
+    "res64",
+    "proof_status",
+)
+
+
+def _ensure_version_schema(conn: sqlite3.Connection):
+    # version: value of exponents_clock when the row's detail columns last
+    # changed (0 = unchanged since seeding); bumped by a trigger so every DAO
+    # write is covered
+    _ensure_column(conn, "exponents", "version", "INTEGER NOT NULL DEFAULT 0")
+    with conn:
+        conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS exponents_clock(
+          id INTEGER PRIMARY KEY CHECK (id = 0),
+          version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO exponents_clock(id, version) VALUES (0, 0);
+
+        CREATE TRIGGER IF NOT EXISTS exponents_bump_version
+        AFTER UPDATE OF {', '.join(EXPONENT_DETAIL_COLUMNS)} ON exponents
+        WHEN {' OR '.join(f'OLD.{c} IS NOT NEW.{c}' for c in EXPONENT_DETAIL_COLUMNS)}
+        BEGIN
+          UPDATE exponents_clock SET version = version + 1;
+          UPDATE exponents SET version = (SELECT version FROM exponents_clock)
+           WHERE p = NEW.p;
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_exponents_version ON exponents(block_id, version);
+        """)
+
+
+@_write
 def block_upsert(
     conn: sqlite3.Connection,
     block_id: int,
@@ -176,66 +560,140 @@ def block_upsert(
     end_excl: int,
     candidate_count: int,
 ):
-    with conn:
-        conn.execute(
-            """
-        INSERT INTO blocks(id,start_p,end_p_excl,candidate_count,created_at)
-        VALUES(?,?,?,?,?)
-        ON CONFLICT(id) DO UPDATE SET
-          start_p=excluded.start_p,
-          end_p_excl=excluded.end_p_excl,
-          candidate_count=excluded.candidate_count
-        """,
-            (
-                int(block_id),
-                int(start),
-                int(end_excl),
-                int(candidate_count),
-                int(time.time()),
-            ),
-        )
+    conn.execute(
+        """
+    INSERT INTO blocks(id,start_p,end_p_excl,candidate_count,created_at)
+    VALUES(?,?,?,?,?)
+    ON CONFLICT(id) DO UPDATE SET
+      start_p=excluded.start_p,
+      end_p_excl=excluded.end_p_excl,
+      candidate_count=excluded.candidate_count
+    """,
+        (
+            int(block_id),
+            int(start),
+            int(end_excl),
+            int(candidate_count),
+            int(time.time()),
+        ),
+    )
 
 
+@_read
 def block_get(conn: sqlite3.Connection, block_id: int):
     return conn.execute("SELECT * FROM blocks WHERE id=?", (int(block_id),)).fetchone()
 
 
+@_read
 def block_list(conn: sqlite3.Connection, limit: int = 12):
     return conn.execute(
         "SELECT * FROM blocks ORDER BY id LIMIT ?", (int(limit),)
     ).fetchall()
 
 
+@_read
+def blocks_running(conn: sqlite3.Connection):
+    return conn.execute(
+        "SELECT id, run_params FROM blocks WHERE status='running' ORDER BY id"
+    ).fetchall()
+
+
+@_write
+def block_set_running(conn: sqlite3.Connection, block_id: int, run_params: str):
+    conn.execute(
+        "UPDATE blocks SET status='running', run_params=?, started_at=?, finished_at=NULL WHERE id=?",
+        (run_params, int(time.time()), int(block_id)),
+    )
+
+
+@_write
+def block_set_idle(conn: sqlite3.Connection, block_id: int, complete: bool = False):
+    """End a block's run: 'done' once every exponent is tested, else 'idle'."""
+    conn.execute(
+        "UPDATE blocks SET status=?, finished_at=? WHERE id=?",
+        ("done" if complete else "idle", int(time.time()), int(block_id)),
+    )
+
+
+@_write
 def block_counts_bump(conn: sqlite3.Connection, block_id: int, tested_inc: int):
-    with conn:
-        conn.execute(
-            "UPDATE blocks SET tested_count=tested_count+? WHERE id=?",
-            (int(tested_inc), int(block_id)),
+    conn.execute(
+        "UPDATE blocks SET tested_count=tested_count+? WHERE id=?",
+        (int(tested_inc), int(block_id)),
+    )
+
+
+@_write
+def blocks_recount_tested(conn: sqlite3.Connection) -> None:
+    """Rebuild tested_count from the exponents table (bumps are write-behind)."""
+    conn.execute("""
+        UPDATE blocks SET tested_count = (
+            SELECT COUNT(*) FROM exponents
+            WHERE exponents.block_id = blocks.id AND exponents.status = 'done'
         )
+    """)
 
 
+@_write
 def block_verified_bump(conn: sqlite3.Connection, block_id: int, inc: int = 1):
-    with conn:
-        conn.execute(
-            "UPDATE blocks SET verified_count=verified_count+? WHERE id=?",
-            (int(inc), int(block_id)),
-        )
+    conn.execute(
+        "UPDATE blocks SET verified_count=verified_count+? WHERE id=?",
+        (int(inc), int(block_id)),
+    )
 
 
+@_write
 def exponent_seed(conn: sqlite3.Connection, block_id: int, primes: list[int]):
-    with conn:
-        conn.executemany(
-            "INSERT OR IGNORE INTO exponents(p,block_id) VALUES(?,?)",
-            [(int(p), int(block_id)) for p in primes],
-        )
+    conn.executemany(
+        "INSERT OR IGNORE INTO exponents(p,block_id) VALUES(?,?)",
+        [(int(p), int(block_id)) for p in primes],
+    )
 
 
+@_read
 def exponents_by_block(conn: sqlite3.Connection, block_id: int):
     return conn.execute(
         "SELECT * FROM exponents WHERE block_id=? ORDER BY p", (int(block_id),)
     ).fetchall()
 
 
+@_read
+def exponents_version(conn: sqlite3.Connection) -> int:
+    """Current exponents_clock value: every row change so far has version <= it."""
+    return int(conn.execute("SELECT version FROM exponents_clock").fetchone()[0])
+
+
+@_read
+def exponents_page(
+    conn: sqlite3.Connection,
+    block_id: int,
+    after: int = 0,
+    limit: int = 1000,
+    statuses: list[str] | None = None,
+):
+    """Up to `limit` of a block's exponents with p > after, by p; optionally only given statuses."""
+    cols = ", ".join(("p", "version") + EXPONENT_DETAIL_COLUMNS)
+    sql = f"SELECT {cols} FROM exponents WHERE block_id=? AND p>?"
+    params: list = [int(block_id), int(after)]
+    if statuses:
+        sql += f" AND status IN ({','.join('?' * len(statuses))})"
+        params += statuses
+    return conn.execute(sql + " ORDER BY p LIMIT ?", (*params, int(limit))).fetchall()
+
+
+@_read
+def exponents_changed(
+    conn: sqlite3.Connection, block_id: int, since: int, limit: int = 1000
+):
+    """Up to `limit` of a block's exponents changed after version `since`, oldest change first."""
+    cols = ", ".join(("p", "version") + EXPONENT_DETAIL_COLUMNS)
+    return conn.execute(
+        f"SELECT {cols} FROM exponents WHERE block_id=? AND version>? ORDER BY version LIMIT ?",
+        (int(block_id), int(since), int(limit)),
+    ).fetchall()
+
+
+@_read
 def exponents_unfinished(conn: sqlite3.Connection, block_id: int):
     # Skip done and currently running; scheduler will only pick queued/error/paused
     return conn.execute(
@@ -244,14 +702,187 @@ def exponents_unfinished(conn: sqlite3.Connection, block_id: int):
     ).fetchall()
 
 
-def exponent_start(conn: sqlite3.Connection, p: int):
-    with conn:
+@_read
+def exponents_for_tf(conn: sqlite3.Connection, block_id: int):
+    """Unfinished exponents with how deep trial factoring has already gone."""
+    return conn.execute(
+        "SELECT p, tf_bits FROM exponents WHERE block_id=? AND status!='done' AND status!='running' ORDER BY p",
+        (int(block_id),),
+    ).fetchall()
+
+
+@_read
+def exponent_get(conn: sqlite3.Connection, p: int):
+    return conn.execute("SELECT * FROM exponents WHERE p=?", (int(p),)).fetchone()
+
+
+@_write
+def exponent_pm1_done(conn: sqlite3.Connection, p: int, b1: int, b2: int):
+    conn.execute(
+        "UPDATE exponents SET pm1_b1=?, pm1_b2=? WHERE p=?",
+        (int(b1), int(b2), int(p)),
+    )
+
+
+@_write
+def exponent_tf_bits(conn: sqlite3.Connection, p: int, bits: int):
+    conn.execute(
+        "UPDATE exponents SET tf_bits=MAX(tf_bits, ?) WHERE p=?",
+        (int(bits), int(p)),
+    )
+
+
+@_write
+def exponent_factored(
+    conn: sqlite3.Connection,
+    p: int,
+    factor: int,
+    ns_elapsed: int,
+    engine_info: str,
+    tf_bits: int | None = None,
+):
+    """Record a proper factor of M_p: the exponent is done and composite."""
+    conn.execute(
+        """
+        UPDATE exponents
+        SET status='done', is_prime=0, factor=?, ns_elapsed=?, engine_info=?,
+            tf_bits=MAX(tf_bits, COALESCE(?, 0)), error=NULL, job_finished_at=?
+        WHERE p=?
+    """,
+        (str(factor), int(ns_elapsed), engine_info, tf_bits, int(time.time()), int(p)),
+    )
+
+
+@_write
+def exponents_factored_many(conn: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    """
+    Bulk exponent_factored for (p, factor, ns_elapsed, engine_info) rows.
+    Only unfinished exponents change; returns how many did.
+    """
+    now = int(time.time())
+    cur = conn.executemany(
+        """
+        UPDATE exponents
+        SET status='done', is_prime=0, factor=?, ns_elapsed=?, engine_info=?,
+            error=NULL, job_finished_at=?
+        WHERE p=? AND status!='done' AND status!='running'
+    """,
+        [(str(f), int(ns), info, now, int(p)) for p, f, ns, info in rows],
+    )
+    return cur.rowcount
+
+
+@_write
+def exponent_prp_done(
+    conn: sqlite3.Connection,
+    p: int,
+    probable_prime: bool,
+    res64: str,
+    ns_elapsed: int,
+    engine_info: str,
+    proof: bool = False,
+):
+    """
+    Record a Gerbicz-checked PRP result. A composite verdict finishes the
+    exponent; a probable prime stays running until its LL confirmation.
+    With `proof`, the run left a proof file to verify (proof_status='pending').
+    """
+    proof_status = "pending" if proof else None
+    if probable_prime:
         conn.execute(
-            "UPDATE exponents SET status='running', job_started_at=? WHERE p=?",
-            (int(time.time()), int(p)),
+            "UPDATE exponents SET test_kind='prp', res64=?, proof_status=? WHERE p=?",
+            (res64, proof_status, int(p)),
+        )
+    else:
+        conn.execute(
+            """
+            UPDATE exponents
+            SET status='done', is_prime=0, test_kind='prp', res64=?, ns_elapsed=?,
+                engine_info=?, error=NULL, job_finished_at=?, proof_status=?
+            WHERE p=?
+        """,
+            (
+                res64,
+                int(ns_elapsed),
+                engine_info,
+                int(time.time()),
+                proof_status,
+                int(p),
+            ),
         )
 
 
+@_read
+def exponents_proof_pending(conn: sqlite3.Connection, block_id: int):
+    """Finished PRP runs of a block whose proof has not been verified yet."""
+    return conn.execute(
+        """
+        SELECT p, res64 FROM exponents
+        WHERE block_id=? AND proof_status='pending' AND status='done'
+        ORDER BY p
+    """,
+        (int(block_id),),
+    ).fetchall()
+
+
+@_write
+def exponent_proof_checked(
+    conn: sqlite3.Connection, p: int, ok: bool, error: str = ""
+) -> bool:
+    """
+    Record a proof verification. When a proof fails and the PRP verdict was
+    final (composite), the exponent goes back in the queue ('error') for a
+    fresh test; an LL-confirmed prime keeps its result. Returns True if the
+    exponent was requeued.
+    """
+    status = "verified" if ok else "invalid"
+    conn.execute("UPDATE exponents SET proof_status=? WHERE p=?", (status, int(p)))
+    if ok:
+        return False
+    cur = conn.execute(
+        """
+        UPDATE exponents
+        SET status='error', is_prime=NULL, error=?, job_finished_at=?
+        WHERE p=? AND is_prime=0 AND test_kind='prp'
+    """,
+        (error or "PRP proof failed verification", int(time.time()), int(p)),
+    )
+    return cur.rowcount > 0
+
+
+@_write
+def exponent_start(conn: sqlite3.Connection, p: int) -> bool:
+    """Mark p running unless it is already running (e.g. leased) or done.
+    Returns False if someone else has it."""
+    cur = conn.execute(
+        """
+        UPDATE exponents SET status='running', job_started_at=?
+        WHERE p=? AND status NOT IN ('running', 'done')
+    """,
+        (int(time.time()), int(p)),
+    )
+    return cur.rowcount > 0
+
+
+@_write
+def exponents_start_many(conn: sqlite3.Connection, ps: Iterable[int]) -> list[int]:
+    """exponent_start for a batch in one transaction; returns the ps it claimed."""
+    now = int(time.time())
+    claimed = []
+    for p in ps:
+        cur = conn.execute(
+            """
+            UPDATE exponents SET status='running', job_started_at=?
+            WHERE p=? AND status NOT IN ('running', 'done')
+        """,
+            (now, int(p)),
+        )
+        if cur.rowcount > 0:
+            claimed.append(int(p))
+    return claimed
+
+
+@_write
 def exponent_finish_ok(
     conn: sqlite3.Connection,
     p: int,
@@ -259,42 +890,255 @@ def exponent_finish_ok(
     ns_elapsed: int,
     engine_info: str | None,
 ):
-    with conn:
+    conn.execute(
+        """
+        UPDATE exponents
+        SET status='done', is_prime=?, ns_elapsed=?, engine_info=?, job_finished_at=?
+        WHERE p=?
+    """,
+        (int(is_prime), int(ns_elapsed), engine_info, int(time.time()), int(p)),
+    )
+    if is_prime:
         conn.execute(
+            """
+            UPDATE blocks SET verified_count = verified_count + 1
+            WHERE id = (SELECT block_id FROM exponents WHERE p=?)
+        """,
+            (int(p),),
+        )
+
+
+@_write
+def exponents_finish_many(
+    conn: sqlite3.Connection,
+    results: list[tuple[int, int, int]],
+    engine_info: str | None,
+):
+    """
+    Record (p, is_prime, ns_elapsed) for a batch of LL tests in one transaction.
+    Only exponents still marked running (exponents_start_many) are updated, so
+    a verdict that landed meanwhile is kept; returns the ps recorded.
+    """
+    now = int(time.time())
+    recorded = []
+    for p, ip, ns in results:
+        cur = conn.execute(
             """
             UPDATE exponents
-            SET status='done', is_prime=?, ns_elapsed=?, engine_info=?, job_finished_at=?
-            WHERE p=?
+            SET status='done', is_prime=?, ns_elapsed=?, engine_info=?,
+                job_finished_at=?
+            WHERE p=? AND status='running'
         """,
-            (int(is_prime), int(ns_elapsed), engine_info, int(time.time()), int(p)),
+            (int(ip), int(ns), engine_info, now, int(p)),
         )
-        if is_prime:
-            conn.execute(
-                """
-                UPDATE blocks SET verified_count = verified_count + 1
-                WHERE id = (SELECT block_id FROM exponents WHERE p=?)
-            """,
-                (int(p),),
-            )
+        if cur.rowcount > 0:
+            recorded.append(int(p))
+            if ip:
+                conn.execute(
+                    """
+                    UPDATE blocks SET verified_count = verified_count + 1
+                    WHERE id = (SELECT block_id FROM exponents WHERE p=?)
+                """,
+                    (int(p),),
+                )
+    return recorded
 
 
+@_write
 def exponent_fail(conn: sqlite3.Connection, p: int, err: str):
-    with conn:
+    conn.execute(
+        "UPDATE exponents SET status='error', error=?, job_finished_at=? WHERE p=?",
+        (err, int(time.time()), int(p)),
+    )
+
+
+@_write
+def exponents_requeue_running(conn: sqlite3.Connection) -> int:
+    """Put exponents left 'running' by a crash/restart back to 'queued'.
+    Remote leases are kept: their workers carry on and expiry covers the rest."""
+    cur = conn.execute(
+        "UPDATE exponents SET status='queued', job_started_at=NULL "
+        "WHERE status='running' AND lease_id IS NULL"
+    )
+    return cur.rowcount
+
+
+# ---------- remote worker leases ----------
+
+
+@_write
+def lease_acquire(
+    conn: sqlite3.Connection,
+    lease_id: str,
+    worker: str,
+    expires_at: int,
+    min_p: int = 0,
+    block_id: int | None = None,
+):
+    """
+    Hand the smallest queued exponent of a running block (optionally one
+    block) to a remote worker. Returns (p, block_id, run_params) or None.
+    """
+    where = "b.status='running' AND e.status IN ('queued','error') AND e.p>=?"
+    args: list = [int(min_p)]
+    if block_id is not None:
+        where += " AND e.block_id=?"
+        args.append(int(block_id))
+    row = conn.execute(
+        f"""
+        SELECT e.p, e.block_id, b.run_params FROM exponents e
+        JOIN blocks b ON b.id = e.block_id
+        WHERE {where} ORDER BY e.p LIMIT 1
+    """,
+        args,
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        """
+        UPDATE exponents
+        SET status='running', job_started_at=?, error=NULL, lease_id=?,
+            lease_worker=?, lease_expires_at=?, lease_iteration=0
+        WHERE p=?
+    """,
+        (int(time.time()), lease_id, worker, int(expires_at), int(row["p"])),
+    )
+    return row
+
+
+@_write
+def lease_renew(
+    conn: sqlite3.Connection, lease_id: str, expires_at: int, iteration: int
+):
+    """Heartbeat: extend a held lease. Returns (p, block_id) or None if it is gone."""
+    row = conn.execute(
+        "SELECT p, block_id FROM exponents WHERE lease_id=? AND status='running'",
+        (lease_id,),
+    ).fetchone()
+    if row is not None:
         conn.execute(
-            "UPDATE exponents SET status='error', error=?, job_finished_at=? WHERE p=?",
-            (err, int(time.time()), int(p)),
+            "UPDATE exponents SET lease_expires_at=?, lease_iteration=? WHERE p=?",
+            (int(expires_at), int(iteration), int(row["p"])),
         )
+    return row
 
 
-def exponent_reset(conn, p: int):
-    """Reset a running/cancelled exponent to 'queued' so it can be resumed later."""
-    with conn:
+@_write
+def lease_release(conn: sqlite3.Connection, lease_id: str):
+    """Give a lease back unfinished. Returns (p, block_id) or None."""
+    row = conn.execute(
+        "SELECT p, block_id FROM exponents WHERE lease_id=? AND status='running'",
+        (lease_id,),
+    ).fetchone()
+    if row is not None:
         conn.execute(
-            "UPDATE exponents SET status='queued', job_started_at=NULL, job_finished_at=NULL, error=NULL WHERE p=?",
-            (int(p),),
+            """
+            UPDATE exponents
+            SET status='queued', job_started_at=NULL, lease_id=NULL, lease_expires_at=NULL
+            WHERE p=?
+        """,
+            (int(row["p"]),),
         )
+    return row
+
+
+@_write
+def lease_submit(conn: sqlite3.Connection, lease_id: str, result: dict):
+    """
+    Record a remote result and end the lease in one transaction. `result` is
+    {is_prime, ns_elapsed, engine_info, prp?: {is_probable_prime, res64,
+    ns_elapsed, engine_info}}; with `prp`, a composite verdict stands on its
+    own and a probable prime carries its LL confirmation in the outer fields.
+    Returns (p, block_id) or None if the lease is no longer held.
+    """
+    row = conn.execute(
+        "SELECT p, block_id FROM exponents WHERE lease_id=? AND status='running'",
+        (lease_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    p = int(row["p"])
+    prp = result.get("prp")
+    if prp:
+        exponent_prp_done(
+            conn,
+            p,
+            bool(prp["is_probable_prime"]),
+            str(prp["res64"]),
+            int(prp["ns_elapsed"]),
+            str(prp["engine_info"]),
+        )
+    if not prp or prp["is_probable_prime"]:
+        exponent_finish_ok(
+            conn,
+            p,
+            int(bool(result["is_prime"])),
+            int(result["ns_elapsed"]),
+            result.get("engine_info"),
+        )
+    conn.execute(
+        "UPDATE exponents SET lease_id=NULL, lease_expires_at=NULL WHERE p=?", (p,)
+    )
+    return row
+
+
+@_write
+def leases_expire(conn: sqlite3.Connection, now: int):
+    """Requeue exponents whose lease ran out. Returns their (p, block_id) rows."""
+    rows = conn.execute(
+        """
+        SELECT p, block_id FROM exponents
+        WHERE lease_id IS NOT NULL AND status='running' AND lease_expires_at < ?
+    """,
+        (int(now),),
+    ).fetchall()
+    conn.executemany(
+        """
+        UPDATE exponents
+        SET status='queued', job_started_at=NULL, lease_id=NULL, lease_expires_at=NULL
+        WHERE p=?
+    """,
+        [(int(r["p"]),) for r in rows],
+    )
+    return rows
+
+
+@_read
+def leases_active(conn: sqlite3.Connection, block_id: int | None = None):
+    """Exponents currently leased to remote workers (all blocks or one)."""
+    sql = """
+        SELECT p, block_id, lease_id, lease_worker, lease_expires_at, lease_iteration,
+               job_started_at
+        FROM exponents WHERE lease_id IS NOT NULL AND status='running'
+    """
+    if block_id is None:
+        return conn.execute(sql + " ORDER BY p").fetchall()
+    return conn.execute(sql + " AND block_id=? ORDER BY p", (int(block_id),)).fetchall()
 
 
+@_write
+def exponent_reset(conn, p: int):
+    """Reset a running/cancelled exponent to 'queued' so it can be resumed later."""
+    conn.execute(
+        "UPDATE exponents SET status='queued', job_started_at=NULL, job_finished_at=NULL, error=NULL WHERE p=?",
+        (int(p),),
+    )
+
+
+@_write
+def exponents_reset_many(conn, ps: Iterable[int]):
+    """exponent_reset for a batch in one transaction."""
+    conn.executemany(
+        """
+        UPDATE exponents
+        SET status='queued', job_started_at=NULL, job_finished_at=NULL, error=NULL
+        WHERE p=? AND status='running'
+    """,
+        [(int(p),) for p in ps],
+    )
+
+
+@_read
 def primes_recent(conn: sqlite3.Connection, limit: int = 20):
     # Sorted with known finished times first, then nulls, newest first
     return conn.execute(
@@ -307,3 +1151,73 @@ def primes_recent(conn: sqlite3.Connection, limit: int = 20):
     """,
         (int(limit),),
     ).fetchall()
+
+
+@_read
+def primes_in_blocks(conn: sqlite3.Connection, block_ids: Iterable[int] | None = None):
+    """Verified primes (all, or those of the given blocks), same columns as primes_recent."""
+    sql = """
+        SELECT p, block_id, job_finished_at AS finished_at, engine_info, ns_elapsed
+        FROM exponents
+        WHERE is_prime = 1 AND status = 'done'
+    """
+    if block_ids is None:
+        return conn.execute(sql).fetchall()
+    ids = sorted({int(b) for b in block_ids})
+    return conn.execute(
+        sql + f" AND block_id IN ({','.join('?' * len(ids))})", ids
+    ).fetchall()
+
+
+@_read
+def exponents_timings(conn: sqlite3.Connection, limit: int = 5000):
+    """Most recent finished LL/PRP timings (rows decided by a factor excluded)."""
+    return conn.execute(
+        """
+        SELECT p, ns_elapsed, engine_info FROM exponents
+        WHERE status='done' AND factor IS NULL AND ns_elapsed > 0
+        ORDER BY job_finished_at DESC
+        LIMIT ?
+    """,
+        (int(limit),),
+    ).fetchall()
+
+
+@_read
+def exponents_remaining_work(
+    conn: sqlite3.Connection,
+    block_ids: Iterable[int],
+    batch_max_p: int,
+    ibdwt_min_p: int,
+):
+    """
+    Per (block, engine) sums over unfinished exponents for the cost model:
+    n, s2 = sum p^2 and s3 = sum p^3 (as floats).
+    """
+    ids = sorted({int(b) for b in block_ids})
+    if not ids:
+        return []
+    marks = ",".join("?" * len(ids))
+    return conn.execute(
+        f"""
+        SELECT block_id,
+               CASE WHEN p < ? THEN 'batch'
+                    WHEN ? > 0 AND p >= ? THEN 'ibdwt'
+                    ELSE 'gmp' END AS engine,
+               COUNT(*) AS n,
+               SUM(p * 1.0 * p) AS s2,
+               SUM(p * 1.0 * p * p) AS s3
+        FROM exponents
+        WHERE block_id IN ({marks}) AND status != 'done'
+        GROUP BY 1, 2
+    """,
+        (int(batch_max_p), int(ibdwt_min_p), int(ibdwt_min_p), *ids),
+    ).fetchall()
+
+
+@_read
+def primes_count(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT COUNT(*) AS c FROM exponents WHERE is_prime=1 AND status='done'"
+    ).fetchone()
+    return int(row["c"] or 0)
@@ -1,34 +1,94 @@
 # api/app/main.py
-from fastapi import FastAPI
+import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from .routes import jobs, digits, blocks, primes
-from . import ws
-from . import db
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import db, ws
+from ._llcore import llcore
+from .routes import blocks, digits, jobs, leases, primes, workers
+from .services.artifacts import ArtifactCache
+from .services.costmodel import CostModel
+from .services.ll_runner import LLJobs, resume_ll_jobs
+from .services.persistence import Persistence
+from .services.readmodel import ReadModel
+from .services.scheduler import WorkerPool
+
 
 def create_app() -> FastAPI:
     app = FastAPI(title="Mersenne Lab API")
     app.state.executor = ThreadPoolExecutor(max_workers=1)
-    app.state.jobs = {}
-    app.state.queues = {}
-    app.state.block_queues = {}
+    # LL block work: one pinned thread per CPU (LL_WORKERS / LL_PIN_WORKERS)
+    app.state.pool = WorkerPool()
+    # POST /jobs LL tests: live ones in memory, every one in the jobs table
+    app.state.ll_jobs = LLJobs(jobs.MAX_LIVE_JOBS)
+    app.state.job_executor = ThreadPoolExecutor(
+        max_workers=jobs.JOBS_WORKERS, thread_name_prefix="ll-job"
+    )
+    # digits job id -> {digits_written, total_digits} while an export runs
+    app.state.digits_progress = {}
+    # one artifact per (p, format), shared by every request for it
+    app.state.artifacts = ArtifactCache(digits.ARTIFACT_ROOT, digits.CACHE_BUDGET)
     app.state.block_cancel = set()
     app.state.block_topics = {}
+    app.state.block_progress = {}
+    app.state.block_tokens = {}
+    app.state.block_runs = {}
+    # time-per-exponent fit from finished rows: ETAs and queue ordering
+    app.state.costs = CostModel(
+        batch_max_p=blocks.BATCH_MAX_P, ibdwt_min_p=llcore.ibdwt_min_exponent()
+    )
+    # in-memory primes / block summaries for polled endpoints, refreshed per
+    # block as results are committed
+    app.state.readmodel = ReadModel(app.state.costs)
+    # coalesced, rate-limited fan-out to block WebSocket subscribers
+    app.state.broadcaster = ws.Broadcaster(app.state.block_topics)
 
     app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
     app.include_router(digits.router, prefix="/digits", tags=["digits"])
     app.include_router(blocks.router, prefix="/blocks", tags=["blocks"])
     app.include_router(primes.router, prefix="/primes", tags=["primes"])
+    app.include_router(workers.router, prefix="/workers", tags=["workers"])
+    app.include_router(leases.router, prefix="/leases", tags=["leases"])
     app.include_router(ws.router)
 
     @app.on_event("startup")
-    def _open_db():
+    async def _open_db():
         app.state.db = db.connect()
+        # nothing can be running yet; their checkpoints let them resume
+        db.exponents_requeue_running(app.state.db)
+        # tested counts are write-behind, so a crash may have lost some bumps
+        db.blocks_recount_tested(app.state.db)
+
+        async def _tested(bid: int, p: int) -> None:
+            # finished exponents of the block are committed
+            app.state.readmodel.touch(bid)
+            await blocks.broadcast_coverage(app, bid, p)
+
+        app.state.store = Persistence(app.state.db, on_coverage=_tested)
+        app.state.store.start()
+        app.state.broadcaster.start()
+        app.state.pool.start()
+        # remote workers' leases that stop being renewed go back to the queue
+        app.state.lease_reaper = asyncio.get_running_loop().create_task(
+            leases.expire_leases(app)
+        )
+        # blocks that were running when the server stopped pick up where they were
+        await blocks.resume_blocks(app)
+        # as do LL jobs that were queued or running
+        await resume_ll_jobs(app)
 
     @app.on_event("shutdown")
-    def _shutdown():
+    async def _shutdown():
+        # running exponents checkpoint and requeue themselves on the way out
+        blocks.cancel_running(app)
+        app.state.lease_reaper.cancel()
+        await asyncio.to_thread(app.state.pool.shutdown)
         app.state.executor.shutdown(wait=False, cancel_futures=True)
+        app.state.job_executor.shutdown(wait=False, cancel_futures=True)
+        await app.state.store.close()
+        await app.state.broadcaster.stop()
         try:
             app.state.db.close()
         except Exception:
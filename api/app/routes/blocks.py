@@ -1,52 +1,135 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Set
+import json
+import logging
+import pathlib
+from typing import Any, Literal
+
+from fastapi import APIRouter, HTTPException, Request
 
-from fastapi import APIRouter, Request
-from .._llcore import llcore
 from .. import db as dao
+from .._llcore import llcore
+from ..services import costmodel, factoring
+from ..services.readmodel import conditional, digest
 
+log = logging.getLogger("blocks")
 router = APIRouter()
 
+CHECKPOINT_ROOT = pathlib.Path(__file__).resolve().parents[2] / "data" / "checkpoints"
+CHECKPOINT_ROOT.mkdir(parents=True, exist_ok=True)
+# PRP proofs awaiting verification; each is deleted once it has been checked
+PROOF_ROOT = pathlib.Path(__file__).resolve().parents[2] / "data" / "proofs"
+PROOF_ROOT.mkdir(parents=True, exist_ok=True)
+
+# How often running exponents' llcore.Progress channels are polled for pct
+# updates (the LL loop itself never calls back).
+PROGRESS_POLL_SECS = 0.25
+
+# Exponents below BATCH_MAX_P are LL-tested in batches with one
+# llcore.ll_test_many call and one DB transaction; for them the per-call and
+# per-commit overhead would outweigh the squarings. Batches are cut to about
+# BATCH_TARGET_SECS of predicted work (at most BATCH_SIZE exponents), so
+# workers get shards of similar length.
+BATCH_MAX_P = 10_000
+BATCH_SIZE = 128
+BATCH_TARGET_SECS = 0.5
+
+# Largest page GET /blocks/{id}/exponents hands out.
+EXPONENTS_PAGE_MAX = 20_000
+
 # ---- helpers ---------------------------------------------------------------
 
 
 def _ensure_app_state(
     app,
-) -> tuple[
-    Dict[int, Set[asyncio.Queue]],
-    Set[int],
-    Dict[int, "asyncio.Queue[int]"],
-    Dict[int, Set[asyncio.Task]],
-]:
+) -> tuple[dict[int, set[asyncio.Queue]], set[int], dict[int, dict[int, Any]]]:
     """
     Make sure we have the state containers we need:
-      - block_topics:   block_id -> set[Queue] (for WS broadcasting; queues contain dict or None sentinel)
+      - block_topics:   block_id -> set[Queue] of WS subscribers (fed by app.state.broadcaster)
       - block_cancel:   set of block_ids requested to stop
-      - block_workq:    block_id -> work queue of exponents
-      - block_tasks:    block_id -> running asyncio tasks for that block
+      - block_progress: block_id -> {p: llcore.Progress} for exponents in their LL test
+      - block_tokens:   block_id -> llcore.CancelToken of the block's current run
+      - block_runs:     block_id -> asyncio.Event of the block's current run,
+                        set (and the entry dropped) once its finalize ran
+    Work queues and workers live in app.state.pool (services/scheduler.py).
     """
     s = app.state
     if not hasattr(s, "block_topics"):
         s.block_topics = {}  # dict[int, set[Queue]]
     if not hasattr(s, "block_cancel"):
         s.block_cancel = set()  # set[int]
-    if not hasattr(s, "block_workq"):
-        s.block_workq = {}  # dict[int, asyncio.Queue[int]]
-    if not hasattr(s, "block_tasks"):
-        s.block_tasks = {}  # dict[int, set[asyncio.Task]]
-    return s.block_topics, s.block_cancel, s.block_workq, s.block_tasks
+    if not hasattr(s, "block_progress"):
+        s.block_progress = {}  # dict[int, dict[int, llcore.Progress]]
+    if not hasattr(s, "block_tokens"):
+        s.block_tokens = {}  # dict[int, llcore.CancelToken]
+    if not hasattr(s, "block_runs"):
+        s.block_runs = {}  # dict[int, asyncio.Event]
+    return s.block_topics, s.block_cancel, s.block_progress
 
 
-def _broadcast_sync(app, block_id: int, msg: Dict[str, Any]):
-    """Broadcast a dict message to all subscriber queues for this block."""
-    block_topics, *_ = _ensure_app_state(app)
-    for q in list(block_topics.get(int(block_id), set())):
-        try:
-            q.put_nowait(msg)
-        except asyncio.QueueFull:
-            pass
+def _broadcast_sync(app, block_id: int, msg: dict[str, Any]):
+    """
+    Queue an update for the block's WS subscribers (call on the loop). The
+    broadcaster coalesces updates and sends them as rate-limited frames.
+    """
+    app.state.broadcaster.publish(int(block_id), msg)
+
+
+async def _poll_progress(app, block_id: int, done: asyncio.Event):
+    """
+    Poll the Progress channels of a block's running LL tests and broadcast
+    pct changes until the run is finalized (`done`), whatever stage it is in.
+    """
+    pool = app.state.pool
+    _topics, _cancel, block_progress = _ensure_app_state(app)
+    last_pct: dict[int, int] = {}
+    while True:
+        active = dict(block_progress.get(block_id, {}))
+        for p, prog in active.items():
+            total = prog.total
+            if total == 0:
+                continue  # not started yet
+            pct = int(prog.iteration * 100 / total)
+            if last_pct.get(p) == pct:
+                continue
+            last_pct[p] = pct
+            pool.update_progress(block_id, p, pct)
+            _broadcast_sync(
+                app, block_id, {"block_id": block_id, "p": p, "pct": pct, "stage": "ll"}
+            )
+        if not active and done.is_set():
+            return
+        await asyncio.sleep(PROGRESS_POLL_SECS)
+
+
+async def broadcast_coverage(app, block_id: int, last_p: int) -> None:
+    """
+    Coverage snapshot ({tested,total}) for a block, sent once its tested-count
+    bumps are committed (Persistence.on_coverage hook).
+    """
+    b = await app.state.store.read(dao.block_get, block_id)
+    if b:
+        _broadcast_sync(
+            app,
+            block_id,
+            {
+                "block_id": block_id,
+                "last_p": last_p,
+                "tested": b["tested_count"],
+                "total": b["candidate_count"],
+            },
+        )
+
+
+def cancel_running(app, block_id: int | None = None) -> None:
+    """Trip the cancel token of one block's run (or of every block)."""
+    tokens = getattr(app.state, "block_tokens", {})
+    ids = list(tokens) if block_id is None else [int(block_id)]
+    for bid in ids:
+        token = tokens.get(bid)
+        if token is not None:
+            token.cancel()
 
 
 def block_bounds(block_id: int) -> tuple[int, int]:
@@ -55,55 +138,155 @@ def block_bounds(block_id: int) -> tuple[int, int]:
     return start, start + 1_000_000
 
 
-def primes_in_range(a: int, b: int) -> List[int]:
-    """Segmented sieve of Eratosthenes: primes in [a, b)."""
-    if b <= 2:
-        return []
-    a = max(a, 2)
-    import math
+def checkpoint_path(p: int) -> pathlib.Path:
+    """Residue checkpoint file for exponent p."""
+    return CHECKPOINT_ROOT / f"M_{int(p)}.ckpt"
 
-    limit = int(math.isqrt(b)) + 1
 
-    base = [True] * (limit + 1)
-    base[0] = base[1] = False
-    for i in range(2, int(math.isqrt(limit)) + 1):
-        if base[i]:
-            step = i
-            base[i * i : limit + 1 : step] = [False] * (((limit - i * i) // step) + 1)
+def proof_path(p: int) -> pathlib.Path:
+    """PRP proof file for exponent p."""
+    return PROOF_ROOT / f"M_{int(p)}.proof"
 
-    small = [i for i, ok in enumerate(base) if ok]
 
-    size = b - a
-    seg = [True] * size
-    for p in small:
-        start = max(p * p, ((a + p - 1) // p) * p)
-        for x in range(start, b, p):
-            seg[x - a] = False
+def _resumable_checkpoint(p: int) -> pathlib.Path:
+    """
+    Return the checkpoint path for p, discarding the file if it is corrupt or
+    belongs to another exponent (the run then starts again from s=4).
+    """
+    path = checkpoint_path(p)
+    try:
+        ck = llcore.read_checkpoint(str(path))
+        if ck is not None and int(ck["p"]) != int(p):
+            path.unlink(missing_ok=True)
+    except RuntimeError:
+        path.unlink(missing_ok=True)
+    return path
+
+
+def primes_in_range(a: int, b: int) -> list[int]:
+    """Primes in [a, b) (native segmented wheel sieve; b <= 2^32)."""
+    return llcore.primes_in_range(max(0, int(a)), max(0, int(b)))
+
+
+def _cost_shards(
+    ps: list[int], model: costmodel.CostModel, workers: int
+) -> list[list[int]]:
+    """Split ascending exponents into batches of roughly equal predicted cost."""
+    target = min(BATCH_TARGET_SECS, model.predict_s(ps) / max(1, workers)) * 1e9
+    shards: list[list[int]] = []
+    cur: list[int] = []
+    acc = 0.0
+    for p in ps:
+        cur.append(p)
+        acc += model.predict_ns(p)
+        if acc >= target or len(cur) >= BATCH_SIZE:
+            shards.append(cur)
+            cur, acc = [], 0.0
+    if cur:
+        shards.append(cur)
+    return shards
+
+
+async def _block_etas(app, block_ids: list[int]) -> dict[int, dict[str, Any]]:
+    """
+    Cost-model estimates per block: remaining_s is the single-core time of
+    its unfinished exponents, eta_s the wall-clock time until it is done
+    given its place in the pool's queue (None unless the block is running).
+    """
+    model: costmodel.CostModel = app.state.costs
+    store = app.state.store
+    await store.read(model.refresh)
+    running = _running_blocks(app)
+    rows = await store.read(
+        dao.exponents_remaining_work,
+        set(block_ids) | set(running),
+        model.batch_max_p,
+        model.ibdwt_min_p,
+    )
+    return _etas_from(app, block_ids, running, rows)
+
+
+def _running_blocks(app) -> dict[int, tuple[int, int]]:
+    """block_id -> (priority, max_parallel) of the blocks in the pool."""
+    return {
+        int(b["block_id"]): (int(b["priority"]), int(b["max_parallel"]))
+        for b in app.state.pool.snapshot()["blocks"]
+        if not b["cancelled"]
+    }
 
-    return [a + i for i, ok in enumerate(seg) if ok]
+
+def _etas_from(app, block_ids: list[int], running, rows) -> dict[int, dict[str, Any]]:
+    model: costmodel.CostModel = app.state.costs
+    remaining = model.remaining_s(rows)
+    etas = costmodel.block_etas(remaining, running, app.state.pool.size)
+    return {
+        bid: {
+            "remaining_s": round(remaining.get(bid, 0.0), 1),
+            "eta_s": round(etas[bid], 1) if bid in etas else None,
+        }
+        for bid in block_ids
+    }
+
+
+async def _set_block_status(app, fn, block_id: int, *args) -> None:
+    """Commit dao.block_set_running / block_set_idle and tell the read model."""
+    await app.state.store.write(fn, block_id, *args)
+    app.state.readmodel.touch(block_id)
+
+
+async def _seeded_block(store, block_id: int):
+    """The block row, seeding the block first if it does not exist yet."""
+    b = await store.read(dao.block_get, block_id)
+    if b:
+        return b
+    return await store.write(_seed_block, block_id)
+
+
+def _seed_block(conn, block_id: int):
+    """
+    Writer op: create the block row and its exponents if missing, pre-screen
+    them, and return the block row. Check and seed share one transaction, so
+    concurrent requests never see a half-seeded block or seed it twice.
+    """
+    b = dao.block_get(conn, block_id)
+    if not b:
+        start, end_excl = block_bounds(block_id)
+        primes = primes_in_range(start, end_excl)
+        dao.block_upsert(conn, block_id, start, end_excl, len(primes))
+        dao.exponent_seed(conn, block_id, primes)
+        factoring.prescreen_exponents(conn, block_id, primes)
+        b = dao.block_get(conn, block_id)
+    return b
 
 
 # ---- REST endpoints --------------------------------------------------------
 
 
 @router.get("")
-def list_blocks(req: Request, limit: int = 6):
-    """List the first N blocks, lazily seeding any missing ones."""
-    conn = req.app.state.db
-    rows = dao.block_list(conn, limit=limit)
+async def list_blocks(req: Request, limit: int = 6):
+    """
+    List the first N blocks, lazily seeding any missing ones. Served from the
+    read model (services/readmodel.py) with an ETag, so polls that find
+    nothing new cost no SQLite work (and get a 304 with If-None-Match).
+    """
+    store = req.app.state.store
+    rm = req.app.state.readmodel
+    await rm.refresh(store)
+    rows = rm.blocks(limit)
 
     if len(rows) < limit:
         existing_ids = {r["id"] for r in rows}
         for bid in range(limit):
-            if bid in existing_ids:
-                continue
-            start, end_excl = block_bounds(bid)
-            primes = primes_in_range(start, end_excl)
-            dao.block_upsert(conn, bid, start, end_excl, len(primes))
-            dao.exponent_seed(conn, bid, primes)
-        rows = dao.block_list(conn, limit=limit)
-
-    return [
+            if bid not in existing_ids:
+                await _seeded_block(store, bid)
+                rm.touch(bid)
+        await rm.refresh(store)
+        rows = rm.blocks(limit)
+    ids = [int(r["id"]) for r in rows]
+    running = _running_blocks(req.app)
+    etas = _etas_from(req.app, ids, running, rm.remaining_work(set(ids) | set(running)))
+
+    body = [
         {
             "id": r["id"],
             "start": r["start_p"],
@@ -113,76 +296,237 @@ def list_blocks(req: Request, limit: int = 6):
             "tested_count": r["tested_count"],
             "verified_count": r["verified_count"],
             "status": r["status"],
+            **etas[int(r["id"])],
         }
         for r in rows
     ]
+    # etas also follow the pool and the cost model's fit, which are not versioned
+    return conditional(req, rm.etag("blocks", rm.blocks_version, digest(etas)), body)
 
 
-@router.get("/{block_id}")
-def get_block(req: Request, block_id: int):
-    """Return block metadata plus the list of exponents."""
-    block_id = int(block_id)
-    conn = req.app.state.db
-
-    b = dao.block_get(conn, block_id)
-    if not b:
-        start, end_excl = block_bounds(block_id)
-        primes = primes_in_range(start, end_excl)
-        dao.block_upsert(conn, block_id, start, end_excl, len(primes))
-        dao.exponent_seed(conn, block_id, primes)
-        b = dao.block_get(conn, block_id)
-
-    exps = dao.exponents_by_block(conn, block_id)
+def _block_summary(b, eta: dict[str, Any]) -> dict[str, Any]:
     return {
-        "block": {
-            "id": b["id"],
-            "start": b["start_p"],
-            "end_excl": b["end_p_excl"],
-            "candidate_count": b["candidate_count"],
-            "tested_count": b["tested_count"],
-            "verified_count": b["verified_count"],
-            "status": b["status"],
-        },
-        "exponents": [
-            {
-                "p": r["p"],
-                "status": r["status"],
-                "is_prime": r["is_prime"],
-                "ns_elapsed": r["ns_elapsed"],
-                "engine_info": r["engine_info"],
-            }
-            for r in exps
-        ],
+        "id": b["id"],
+        "start": b["start_p"],
+        "end_excl": b["end_p_excl"],
+        "candidate_count": b["candidate_count"],
+        "tested_count": b["tested_count"],
+        "verified_count": b["verified_count"],
+        "status": b["status"],
+        **eta,
     }
 
 
+def _exponent_row(r) -> dict[str, Any]:
+    return {"p": r["p"], **{c: r[c] for c in dao.EXPONENT_DETAIL_COLUMNS}}
+
+
+def _rle(values: list[Any]) -> list[list[Any]]:
+    """[[value, run length], ...] for a column of mostly repeated values."""
+    runs: list[list[Any]] = []
+    for v in values:
+        if runs and runs[-1][0] == v:
+            runs[-1][1] += 1
+        else:
+            runs.append([v, 1])
+    return runs
+
+
+def _columns(rows) -> dict[str, Any]:
+    """
+    Columnar encoding of exponent rows: `p` as gaps (first value absolute),
+    categorical columns run-length encoded, `ns_elapsed` as a plain array and
+    the mostly-null `factor`/`res64` as sparse [[row index, value], ...].
+    """
+    ps = [int(r["p"]) for r in rows]
+    out: dict[str, Any] = {"p": [b - a for a, b in zip([0] + ps, ps)]}
+    for c in ("status", "is_prime", "test_kind", "proof_status", "engine_info"):
+        out[c] = _rle([r[c] for r in rows])
+    out["ns_elapsed"] = [r["ns_elapsed"] for r in rows]
+    for c in ("factor", "res64"):
+        out[c] = [[i, r[c]] for i, r in enumerate(rows) if r[c] is not None]
+    return out
+
+
+@router.get("/{block_id}")
+async def get_block(req: Request, block_id: int, exponents: bool = True):
+    """
+    Return block metadata plus the list of exponents (`exponents=false` for
+    metadata only; /blocks/{id}/exponents pages, filters and diffs the rows).
+    """
+    block_id = int(block_id)
+    store = req.app.state.store
+
+    b = await _seeded_block(store, block_id)
+    etas = await _block_etas(req.app, [block_id])
+    out: dict[str, Any] = {"block": _block_summary(b, etas[block_id])}
+    if exponents:
+        exps = await store.read(dao.exponents_by_block, block_id)
+        out["exponents"] = [_exponent_row(r) for r in exps]
+    return out
+
+
+@router.get("/{block_id}/exponents")
+async def get_block_exponents(
+    req: Request,
+    block_id: int,
+    status: str = "",
+    after: int = 0,
+    limit: int = 1000,
+    since: int | None = None,
+    format: Literal["columns", "rows"] = "columns",
+):
+    """
+    Compact block detail. Pages through the block's exponents by p: pass the
+    reply's `next` as `after` until it is null; `status=queued,error` keeps
+    only those statuses. With `since=<version>`, returns only the exponents
+    whose status or result changed after that version, oldest change first;
+    `version` in the reply is what to pass as `since` next time (keep the one
+    from the first page of a full listing), and `more` says another delta
+    call would return rows right away.
+    `format=columns` (default) gives parallel arrays (see _columns) instead
+    of one object per exponent.
+    """
+    if not 1 <= limit <= EXPONENTS_PAGE_MAX:
+        raise HTTPException(400, detail=f"limit must be in 1..{EXPONENTS_PAGE_MAX}")
+    if since is not None and status:
+        raise HTTPException(400, detail="status filter cannot be combined with since")
+    block_id = int(block_id)
+    store = req.app.state.store
+
+    b = await _seeded_block(store, block_id)
+    etas = await _block_etas(req.app, [block_id])
+    # read the clock first: rows changed meanwhile are sent again, never missed
+    version = await store.read(dao.exponents_version)
+    out: dict[str, Any] = {"block": _block_summary(b, etas[block_id])}
+    if since is None:
+        statuses = [s for s in status.split(",") if s]
+        rows = await store.read(dao.exponents_page, block_id, after, limit, statuses)
+        out["next"] = int(rows[-1]["p"]) if len(rows) == limit else None
+    else:
+        rows = await store.read(dao.exponents_changed, block_id, since, limit)
+        out["more"] = len(rows) == limit
+        if out["more"]:
+            version = int(rows[-1]["version"])
+    out["version"] = version
+    out["count"] = len(rows)
+    out["exponents"] = (
+        _columns(rows) if format == "columns" else [_exponent_row(r) for r in rows]
+    )
+    return out
+
+
 @router.post("/{block_id}/start")
-async def start_block(req: Request, block_id: int, concurrency: int = 1):
+async def start_block(
+    req: Request,
+    block_id: int,
+    concurrency: int = 0,
+    tf: bool = True,
+    pm1: bool = False,
+    kind: Literal["ll", "prp"] = "ll",
+    proof: bool = True,
+    priority: int = 0,
+):
     """
     Start (or resume) testing all unfinished prime exponents in the block.
-    Broadcasts per-iteration ({p,pct}) and coverage snapshots ({tested,total}).
-    Supports mid-iteration cancel via the llcore callback.
+    Exponents join the worker pool's global queue, cheapest first across all
+    running blocks; a higher `priority` puts this block's work ahead of the
+    others'. `concurrency` caps how many workers this block may hold at once
+    (0 = as many as are free). A started block stays marked running in the
+    DB until it completes or is stopped, and is resumed on server restart.
+    With `tf` (default) a trial-factoring pass runs over the block first and
+    exponents with a small factor are marked composite without an LL test.
+    With `pm1`, each exponent also gets a P-1 attempt right before its LL test
+    (skipped where the auto-chosen bounds would not pay off).
+    With `kind=prp`, exponents get a Gerbicz-checked base-3 PRP test instead
+    of LL: composites are final without a double-check, probable primes are
+    confirmed by LL. (Batched small exponents always use LL.) Unless `proof`
+    is false, each PRP run also writes a Pietrzak proof, and a verification
+    stage after the tests checks every proof (~p/2^power squarings); an
+    exponent whose proof fails is queued again.
+    Broadcasts progress ({p,pct}, polled every PROGRESS_POLL_SECS) and
+    coverage snapshots ({tested,total}). Stop trips the block's
+    llcore.CancelToken: running LL tests halt within one iteration, checkpoint
+    and resume on the next start. A PRP test has no checkpoint: a stopped one
+    is discarded and starts over from zero on the next start.
     """
-    app = req.app
+    return await run_block(
+        req.app,
+        block_id,
+        concurrency=concurrency,
+        tf=tf,
+        pm1=pm1,
+        kind=kind,
+        proof=proof,
+        priority=priority,
+    )
+
+
+async def resume_blocks(app) -> None:
+    """Restart every block that was still running when the server went down."""
+    for r in await app.state.store.read(dao.blocks_running):
+        try:
+            params = json.loads(r["run_params"] or "{}")
+            res = await run_block(app, int(r["id"]), **params)
+            log.info("resumed block %d: %s", r["id"], res)
+        except Exception:
+            log.exception("cannot resume block %s", r["id"])
+
+
+async def run_block(
+    app,
+    block_id: int,
+    *,
+    concurrency: int = 0,
+    tf: bool = True,
+    pm1: bool = False,
+    kind: str = "ll",
+    proof: bool = True,
+    priority: int = 0,
+) -> dict[str, Any]:
+    """Seed the block and queue its unfinished exponents (see start_block)."""
     conn = app.state.db
+    store = app.state.store
     block_id = int(block_id)
-    concurrency = max(1, int(concurrency))
+    concurrency = max(0, int(concurrency))
 
-    block_topics, block_cancel, block_workq, block_tasks = _ensure_app_state(app)
+    _topics, block_cancel, block_progress = _ensure_app_state(app)
+    if block_id in app.state.block_runs:
+        # re-checked (and claimed) below; this only skips the reads
+        return {"scheduled": 0, "block_id": block_id, "message": "already running"}
 
-    # ensure block exists and is seeded
-    b = dao.block_get(conn, block_id)
-    if not b:
-        start, end_excl = block_bounds(block_id)
-        primes = primes_in_range(start, end_excl)
-        dao.block_upsert(conn, block_id, start, end_excl, len(primes))
-        dao.exponent_seed(conn, block_id, primes)
-        b = dao.block_get(conn, block_id)
+    # ensure block exists and is seeded (off the event loop)
+    b = await _seeded_block(store, block_id)
 
     # worklist of unfinished exponents
-    unfinished_rows = dao.exponents_unfinished(conn, block_id)
+    unfinished_rows = await store.read(dao.exponents_unfinished, block_id)
     todo = [int(r["p"]) for r in unfinished_rows]
-    if not todo:
+    # blocks seeded before the pre-screen existed get it here (idempotent)
+    if todo and await store.write(factoring.prescreen_exponents, block_id, todo):
+        b = await store.read(dao.block_get, block_id)
+        todo = [
+            int(r["p"]) for r in await store.read(dao.exponents_unfinished, block_id)
+        ]
+    # proofs left unverified by an interrupted run still get their stage
+    proofs_pending = await store.read(dao.exponents_proof_pending, block_id)
+    # remembered so a restart can pick the run up again (resume_blocks)
+    run_params = {
+        "concurrency": concurrency,
+        "tf": tf,
+        "pm1": pm1,
+        "kind": kind,
+        "proof": proof,
+        "priority": priority,
+    }
+    leased = await store.read(dao.leases_active, block_id)
+    if not todo and not proofs_pending and leased:
+        # the rest is out with remote workers; their results finish the block
+        # (reconcile_block), which must stay running for that
+        await _set_block_status(
+            app, dao.block_set_running, block_id, json.dumps(run_params)
+        )
+        return {"scheduled": 0, "block_id": block_id, "leased": len(leased)}
+    if not todo and not proofs_pending:
         # notify subscribers already complete
         _broadcast_sync(
             app,
@@ -195,124 +539,253 @@ async def start_block(req: Request, block_id: int, concurrency: int = 1):
             },
         )
         # close subscriber sockets gracefully
-        for q in list(block_topics.get(block_id, set())):
-            try:
-                q.put_nowait(None)
-            except asyncio.QueueFull:
-                pass
+        app.state.broadcaster.close(block_id)
+        await _set_block_status(app, dao.block_set_idle, block_id, True)
         return {"scheduled": 0, "message": "already complete"}
 
-    # create+remember a work queue and task set for this block
-    workq: "asyncio.Queue[int]" = asyncio.Queue()
-    for p in todo:
-        workq.put_nowait(p)
-    block_workq[block_id] = workq
-    block_tasks.setdefault(block_id, set())
+    pool = app.state.pool
+    model: costmodel.CostModel = app.state.costs
+    # check and claim without an await in between: the run stays registered
+    # through every stage until its finalize, so a second start cannot slip in
+    if block_id in app.state.block_runs:
+        return {"scheduled": 0, "block_id": block_id, "message": "already running"}
+    run_done = asyncio.Event()
+    app.state.block_runs[block_id] = run_done
+    # one native stop handle shared by every LL test of this run
+    token = llcore.CancelToken()
+    app.state.block_tokens[block_id] = token
+    block_cancel.discard(block_id)
+    await _set_block_status(
+        app, dao.block_set_running, block_id, json.dumps(run_params)
+    )
 
     loop = asyncio.get_running_loop()
-    sem = asyncio.Semaphore(concurrency)
 
-    async def worker():
-        while True:
-            try:
-                p = await workq.get()
-            except asyncio.CancelledError:
-                break
-            try:
-                # check cancel before scheduling next exponent
-                if block_id in block_cancel:
-                    # drain remaining items so workq.join() can complete
-                    while not workq.empty():
-                        try:
-                            workq.get_nowait()
-                            workq.task_done()
-                        except Exception:
-                            break
-                    break
-
-                def run_one():
-                    cancelled_here = False
-                    try:
-                        dao.exponent_start(conn, p)
-
-                        total_iters = max(0, p - 2)
-
-                        def cb(iter_idx: int, _digest: bytes):
-                            nonlocal cancelled_here
-                            # cooperative cancel: if requested, raise to abort llcore loop
-                            if block_id in block_cancel and not cancelled_here:
-                                cancelled_here = True
-                                raise RuntimeError("cancelled")
-                            pct = (
-                                100
-                                if total_iters == 0
-                                else int(((iter_idx + 1) * 100) / total_iters)
-                            )
-                            loop.call_soon_threadsafe(
-                                _broadcast_sync,
-                                app,
-                                block_id,
-                                {"block_id": block_id, "p": int(p), "pct": pct},
-                            )
-
-                        # Use stride=1 so we can react quickly to stop()
-                        res = llcore.ll_test(int(p), progress_stride=1, callback=cb)
-
-                        # finished normally
-                        dao.exponent_finish_ok(
-                            conn,
-                            p,
-                            int(res["is_prime"]),
-                            int(res["ns_elapsed"]),
-                            res.get("engine_info"),
-                        )
-                    except Exception as e:
-                        # If this exponent was cancelled mid-run, reset it to queued instead of marking error
-                        if str(e).lower().startswith("cancelled") or (
-                            block_id in block_cancel
-                        ):
-                            dao.exponent_reset(
-                                conn, p
-                            )  # <= requires tiny helper in db.py
-                            return
-                        # genuine failure
-                        dao.exponent_fail(conn, p, str(e))
-                        return
+    def stop_requested() -> bool:
+        return pool.should_stop(block_id) or block_id in block_cancel
+
+    def coverage_snapshot(p: int, tested: int = 1):
+        # write-behind: bumps are summed per block and broadcast after commit
+        store.add_tested(block_id, tested, p)
+
+    def tf_one(p: int):
+        """Trial-factor one exponent to its target depth (pre-pass stage)."""
+        if stop_requested():
+            return
+
+        def on_level(bits: int, target: int):
+            pct = int(bits * 100 / max(1, target))
+            pool.report_progress(pct)
+            loop.call_soon_threadsafe(
+                _broadcast_sync,
+                app,
+                block_id,
+                {"block_id": block_id, "p": int(p), "pct": pct, "stage": "tf"},
+            )
+
+        try:
+            factor = factoring.trial_factor_exponent(
+                conn, p, tf_done.get(p, 0), stop_requested, on_level
+            )
+        except Exception:
+            # not fatal: the exponent still gets its LL test
+            log.exception("trial factoring failed for p=%d", p)
+            return
+        if factor is not None:
+            coverage_snapshot(p)
+
+    def run_one(p: int):
+        """Test one exponent on a pool worker thread (llcore releases the GIL)."""
+        if stop_requested():
+            return
+        ck_path = _resumable_checkpoint(p)
+        try:
+            if not dao.exponent_start(conn, p):
+                return  # leased to a remote worker meanwhile
 
-                async with sem:
-                    # run in threadpool so Python loop stays responsive
-                    await loop.run_in_executor(app.state.executor, run_one)
+            if pm1:
 
-                # coverage snapshot after each exponent (only when not cancelled)
-                if block_id not in block_cancel:
-                    dao.block_counts_bump(conn, block_id, 1)
-                    b2 = dao.block_get(conn, block_id)
+                def on_pm1(stage: int, fraction: float):
+                    pct = int(fraction * 100)
+                    pool.report_progress(pct)
                     loop.call_soon_threadsafe(
                         _broadcast_sync,
                         app,
                         block_id,
                         {
                             "block_id": block_id,
-                            "last_p": p,
-                            "tested": b2["tested_count"],
-                            "total": b2["candidate_count"],
+                            "p": int(p),
+                            "pct": pct,
+                            "stage": f"pm1:{stage}",
                         },
                     )
 
+                if factoring.pm1_exponent(conn, p, stop_requested, on_pm1) is not None:
+                    ck_path.unlink(missing_ok=True)
+                    coverage_snapshot(p)
+                    return
+
+            # No per-iteration callback: the test loop publishes its iteration
+            # count to `prog` (read by _poll_progress) and watches `token`.
+            prog = llcore.Progress()
+            block_progress.setdefault(block_id, {})[p] = prog
+            try:
+                if kind == "prp":
+                    power = llcore.proof_default_power(int(p)) if proof else 0
+                    prp = llcore.prp_test(
+                        int(p),
+                        cancel=token,
+                        progress=prog,
+                        proof_power=power,
+                        proof_path=str(proof_path(p)) if power else None,
+                    )
+                    if prp["cancelled"]:
+                        # prp_test cannot checkpoint: the next start redoes
+                        # the whole test, so its proof residues are stale too
+                        pathlib.Path(f"{proof_path(p)}.points").unlink(missing_ok=True)
+                        dao.exponent_reset(conn, p)
+                        return
+                    dao.exponent_prp_done(
+                        conn,
+                        p,
+                        prp["is_probable_prime"],
+                        prp["res64"],
+                        int(prp["ns_elapsed"]),
+                        prp["engine_info"],
+                        proof=bool(prp["proof_power"]),
+                    )
+                    if not prp["is_probable_prime"]:
+                        coverage_snapshot(p)
+                        return
+                    # probable prime: confirm with LL below
+                    prog = llcore.Progress()
+                    block_progress[block_id][p] = prog
+                res = llcore.ll_resume(
+                    int(p), str(ck_path), progress=prog, cancel=token
+                )
             finally:
-                workq.task_done()
+                block_progress.get(block_id, {}).pop(p, None)
+            if res["cancelled"]:
+                # checkpoint written; the next start resumes from it
+                dao.exponent_reset(conn, p)
+                return
+
+            # finished normally
+            dao.exponent_finish_ok(
+                conn,
+                p,
+                int(res["is_prime"]),
+                int(res["ns_elapsed"]),
+                res.get("engine_info"),
+            )
+            ck_path.unlink(missing_ok=True)
+        except Exception as e:
+            # If this exponent was cancelled mid-run, reset it to queued instead of marking error
+            # (an LL checkpoint is kept, so the next start resumes from it)
+            if str(e).lower().startswith("cancelled") or stop_requested():
+                dao.exponent_reset(conn, p)
+                return
+            # genuine failure: the saved residue may be bad too
+            ck_path.unlink(missing_ok=True)
+            dao.exponent_fail(conn, p, str(e))
+            return
+
+        # coverage snapshot after each exponent
+        coverage_snapshot(p)
+
+    def run_many(ps: list[int]):
+        """LL-test a batch of small exponents in one native call."""
+        if stop_requested():
+            return
+        # like run_one: skip whatever was leased or settled meanwhile
+        ps = dao.exponents_start_many(conn, ps)
+        if not ps:
+            return
+        try:
+            res = llcore.ll_test_many(ps, cancel=token)
+        except Exception:
+            dao.exponents_reset_many(conn, ps)
+            raise
+        results = [
+            (p, ip, ns)
+            for p, ip, done, ns in zip(
+                res["p"], res["is_prime"], res["done"], res["ns_elapsed"]
+            )
+            if done
+        ]
+        recorded = dao.exponents_finish_many(conn, results, res["engine_info"])
+        untested = set(ps) - {p for p, _ip, _ns in results}
+        if untested:
+            # cancelled: the rest goes back to the queue
+            dao.exponents_reset_many(conn, untested)
+        if recorded:
+            coverage_snapshot(recorded[-1], len(recorded))
+
+    def verify_one(p: int, res64: str):
+        """Check one PRP proof against the recorded residue (verification stage)."""
+        if stop_requested():
+            return
+        path = proof_path(p)
+        try:
+            v = llcore.verify_prp_proof(str(path))
+            ok = bool(v["valid"]) and v["res64"] == res64
+            error = "" if ok else "PRP proof does not match the recorded result"
+        except RuntimeError as e:
+            ok, error = False, f"PRP proof unreadable: {e}"
+        if dao.exponent_proof_checked(conn, p, ok, error):
+            coverage_snapshot(p, -1)  # counted when the PRP test finished
+        if not ok:
+            log.warning("proof for p=%d rejected: %s", p, error)
+        path.unlink(missing_ok=True)
+
+    def after_tests():
+        # runs on a worker thread once the test stage has drained
+        pending: dict[int, str] = {}
+        if not stop_requested():
+            for r in dao.exponents_proof_pending(conn, block_id):
+                pending[int(r["p"])] = r["res64"]
+        if not pending:
+            asyncio.run_coroutine_threadsafe(finalize(), loop)
+            return
+        # Stage 3: proof verification, about 1% of each test at most
+        pool.submit(
+            block_id,
+            sorted(pending),
+            lambda p: verify_one(p, pending[p]),
+            max_parallel=concurrency,
+            on_drained=lambda: asyncio.run_coroutine_threadsafe(finalize(), loop),
+            priority=priority,
+        )
 
-    # spin workers
-    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
-    for w in workers:
-        block_tasks[block_id].add(w)
+    def end_run():
+        # this run is over: its poller exits and the block may be started again
+        if app.state.block_runs.get(block_id) is run_done:
+            del app.state.block_runs[block_id]
+        run_done.set()
 
-    async def monitor_and_finalize():
+    async def finalize():
+        # finalize / clean up regardless of normal or cancelled exit
         try:
-            await workq.join()
-        finally:
-            # finalize / clean up regardless of normal or cancelled exit
-            b3 = dao.block_get(conn, block_id)
+            await store.flush()
+            b3 = await store.read(dao.block_get, block_id)
+            stopped = block_id in block_cancel
+            complete = b3["tested_count"] >= b3["candidate_count"]
+            if not (complete or stopped) and await store.read(
+                dao.leases_active, block_id
+            ):
+                # remote workers still hold exponents: reconcile_block takes over
+                return
+            if not (complete or stopped or pool.stopping) and await store.read(
+                dao.exponents_unfinished, block_id
+            ):
+                # a lease expired while this run held the block, after the
+                # pool had skipped its exponent: hand over to a fresh run
+                end_run()
+                await reconcile_block(app, block_id)
+                return
+            if not pool.stopping:
+                # on shutdown the block stays 'running' and resumes on restart
+                await _set_block_status(app, dao.block_set_idle, block_id, complete)
             _broadcast_sync(
                 app,
                 block_id,
@@ -321,29 +794,117 @@ async def start_block(req: Request, block_id: int, concurrency: int = 1):
                     "tested": b3["tested_count"],
                     "total": b3["candidate_count"],
                     "done": True,
-                    "stopped": (block_id in block_cancel),
+                    "stopped": stopped,
                 },
             )
             # tell all subscribers to close
-            for q in list(block_topics.get(block_id, set())):
-                try:
-                    q.put_nowait(None)
-                except asyncio.QueueFull:
-                    pass
-
-            # cancel any leftover workers (safe even if already finished)
-            for w in list(block_tasks.get(block_id, set())):
-                w.cancel()
-            block_tasks.pop(block_id, None)
-            block_workq.pop(block_id, None)
+            app.state.broadcaster.close(block_id)
             # clear cancel mark for next time
-            if block_id in block_cancel:
-                block_cancel.discard(block_id)
+            block_cancel.discard(block_id)
+        finally:
+            end_run()
+
+    def submit_ll():
+        todo_ll = [int(r["p"]) for r in dao.exponents_unfinished(conn, block_id)]
+        model.refresh(conn)
+        small = [p for p in todo_ll if p < BATCH_MAX_P]
+        # a batch is queued under its first exponent
+        batches = {
+            s[0]: s for s in _cost_shards(small, model, concurrency or pool.size)
+        }
+        batch_ns = {p: sum(model.predict_ns(q) for q in s) for p, s in batches.items()}
+
+        def run_item(p: int):
+            if p in batches:
+                run_many(batches[p])
+            else:
+                run_one(p)
+
+        pool.submit(
+            block_id,
+            sorted(batches) + [p for p in todo_ll if p >= BATCH_MAX_P],
+            run_item,
+            max_parallel=concurrency,
+            on_drained=after_tests,
+            priority=priority,
+            cost=lambda p: batch_ns[p] if p in batches else model.predict_ns(p),
+        )
 
-    fin = asyncio.create_task(monitor_and_finalize())
-    block_tasks[block_id].add(fin)
+    def after_tf():
+        # runs on a worker thread once the TF pass has drained
+        if stop_requested():
+            asyncio.run_coroutine_threadsafe(finalize(), loop)
+        else:
+            submit_ll()
+
+    # Stage 1: trial factoring, for exponents not yet searched deep enough.
+    tf_done: dict[int, int] = {}
+    if tf:
+        for r in await store.read(dao.exponents_for_tf, block_id):
+            p, bits = int(r["p"]), int(r["tf_bits"] or 0)
+            if p > 2 and bits < factoring.tf_target_bits(p):
+                tf_done[p] = bits
+    if tf_done:
+        pool.submit(
+            block_id,
+            sorted(tf_done),
+            tf_one,
+            max_parallel=concurrency,
+            on_drained=after_tf,
+            priority=priority,
+        )
+    else:
+        # Stage 2: Lucas–Lehmer (or PRP) for whatever is left
+        submit_ll()
+    loop.create_task(_poll_progress(app, block_id, run_done))
 
-    return {"scheduled": len(todo), "block_id": block_id, "concurrency": concurrency}
+    return {
+        "scheduled": len(todo),
+        "trial_factoring": len(tf_done),
+        "proofs_pending": len(proofs_pending),
+        "block_id": block_id,
+        "kind": kind,
+        "priority": priority,
+        "concurrency": concurrency or pool.size,
+        "workers": pool.size,
+    }
+
+
+async def reconcile_block(app, block_id: int) -> None:
+    """
+    Move a running block on after remote workers changed it (a result came in,
+    a lease was released or expired). While a local run has the block, its
+    own finalize does this. Otherwise queued exponents restart the local run,
+    and once nothing is queued or leased the block is finished.
+    """
+    store = app.state.store
+    _ensure_app_state(app)
+    if block_id in app.state.block_runs:
+        return
+    b = await store.read(dao.block_get, block_id)
+    if b is None or b["status"] != "running":
+        return
+    if await store.read(dao.exponents_unfinished, block_id):
+        params = json.loads(b["run_params"] or "{}")
+        await run_block(app, block_id, **params)
+        return
+    if await store.read(dao.leases_active, block_id):
+        return
+    await store.flush()
+    b = await store.read(dao.block_get, block_id)
+    complete = b["tested_count"] >= b["candidate_count"]
+    await _set_block_status(app, dao.block_set_idle, block_id, complete)
+    _broadcast_sync(
+        app,
+        block_id,
+        {
+            "block_id": block_id,
+            "tested": b["tested_count"],
+            "total": b["candidate_count"],
+            "done": True,
+        },
+    )
+    app.state.broadcaster.close(block_id)
 
 
 @router.post("/{block_id}/stop")
@@ -355,24 +916,19 @@ async def stop_block(req: Request, block_id: int):
     - Immediately notifies subscribers with a 'stopped' snapshot
     """
     app = req.app
-    conn = app.state.db
     block_id = int(block_id)
 
-    block_topics, block_cancel, block_workq, _block_tasks = _ensure_app_state(app)
+    _block_topics, block_cancel, _progress = _ensure_app_state(app)
     block_cancel.add(block_id)
 
-    # Drain work queue (if any) so workq.join() is not blocked by pending items.
-    q = block_workq.get(block_id)
-    if q is not None:
-        while not q.empty():
-            try:
-                q.get_nowait()
-                q.task_done()
-            except Exception:
-                break
+    # Drop pending exponents; running LL tests stop within one iteration
+    # (checkpointing first) and the pool finalizes the block once they unwind.
+    app.state.pool.cancel(block_id)
+    cancel_running(app, block_id)
+    await _set_block_status(app, dao.block_set_idle, block_id)
 
     # Broadcast an immediate 'stopped' snapshot so the UI can react quickly
-    b = dao.block_get(conn, block_id)
+    b = await app.state.store.read(dao.block_get, block_id)
     if b:
         _broadcast_sync(
             app,
@@ -1,28 +1,43 @@
 # api/app/routes/digits.py
 import asyncio
-import hashlib
-import math
+import os
 import pathlib
-from uuid import uuid4
 from pathlib import Path
+from uuid import uuid4
+
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse
-from .._llcore import llcore
 
-# import compiled extension
+from .._llcore import llcore
+from ..services.artifacts import FORMATS, ArtifactCache
 
 root = pathlib.Path(__file__).resolve().parents[3]
 router = APIRouter()
 ARTIFACT_ROOT = root / "api" / "data" / "artifacts"
 ARTIFACT_ROOT.mkdir(parents=True, exist_ok=True)
 
+# Exports stream through a fixed buffer, so the limit is working memory (the
+# number, its powers of 5 and GMP's division scratch: ~7 bytes per bit of M_p)
+# rather than the digit count; MAX_DIGITS only bounds the disk footprint.
+MAX_DIGITS = int(os.environ.get("DIGITS_MAX", "100000000"))
+MEMORY_LIMIT = int(os.environ.get("DIGITS_MEMORY_MB", "1024")) << 20
+# Finished exports are kept under ARTIFACT_ROOT/<format>/ (services/artifacts.py)
+# and evicted least recently used first beyond this many bytes.
+CACHE_BUDGET = int(os.environ.get("DIGITS_CACHE_MB", "4096")) << 20
+
 
-def sha256_file(p: Path) -> str:
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1 << 20), b""):
-            h.update(chunk)
-    return h.hexdigest()
+class _PinnedFileResponse(FileResponse):
+    """FileResponse that unpins its artifact once sent, even if the client left."""
+
+    def __init__(self, cache: ArtifactCache, job_id: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache, self._job_id = cache, job_id
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._cache.unpin(self._job_id)
 
 
 @router.post("")
@@ -30,62 +45,110 @@ async def create_digits(req: Request, body: dict):
     p = int(body.get("p", 0))
     if p < 1:
         raise HTTPException(400, detail="p must be >= 1")
+    fmt = str(body.get("format") or "decimal")
+    if fmt not in FORMATS:
+        raise HTTPException(400, detail=f"format must be one of {sorted(FORMATS)}")
 
-    # safety cap: ~size in decimal digits; adjust as you like
-    est_digits = int(p * math.log10(2)) + 1
-    MAX_DIGITS = int(5_000_000)  # ≈5MB per million digits + newline
+    est_digits = int(llcore.mersenne_decimal_digits(p))
     if est_digits > MAX_DIGITS:
         raise HTTPException(
             413,
             detail=f"Requested decimal artifact is too large ({est_digits} digits).",
         )
+    est_memory = int(llcore.decimal_export_memory(p))
+    if est_memory > MEMORY_LIMIT:
+        raise HTTPException(
+            413,
+            detail=f"Export would need ~{est_memory >> 20} MiB of memory "
+            f"(limit {MEMORY_LIMIT >> 20} MiB).",
+        )
+
+    from .. import db as dao
 
+    conn = req.app.state.db
+    store = req.app.state.store
+    cache: ArtifactCache = req.app.state.artifacts
+    resp = {"p": p, "format": fmt, "estimated_digits": est_digits}
+
+    # Claim (p, fmt) before looking it up: a producer inserts its artifact
+    # before releasing the claim, so no export of it can finish in between.
     job_id = uuid4().hex
-    filename = body.get("filename") or f"M_{p}_decimal.txt"
-    out_dir = ARTIFACT_ROOT / job_id
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / filename
+    leader = cache.claim(p, fmt, job_id)
+    if leader is not None:
+        return {"id": leader, **resp, "coalesced": True}
+    try:
+        hit = await store.read(cache.lookup, p, fmt)
+    except BaseException:
+        cache.release(p, fmt)
+        raise
+    if hit is not None:
+        cache.release(p, fmt)
+        store.defer(dao.artifact_touch, hit["job_id"])
+        return {"id": hit["job_id"], **resp, "cached": True}
+
+    filename = body.get("filename") or f"M_{p}_{fmt}.{FORMATS[fmt]}"
+    out_path = cache.path_for(p, fmt)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # the final name only ever holds a complete, hashed file
+    part_path = out_path.with_name(out_path.name + ".part")
 
     # persist 'queued'
-    conn = req.app.state.db
-    from .. import db as dao
+    try:
+        await store.write(dao.job_insert, job_id, kind="digits", p=p, status="queued")
+    except BaseException:
+        cache.release(p, fmt)
+        raise
+
+    progress = req.app.state.digits_progress
 
-    dao.job_insert(conn, job_id, kind="digits", p=p, status="queued")
+    def on_progress(done: int, total: int):
+        progress[job_id] = {"digits_written": done, "total_digits": total}
 
     def work():
         try:
             dao.job_start(conn, job_id)
-            meta = llcore.write_mersenne_decimal(p, str(out_path))
-            size_bytes = out_path.stat().st_size
-            digest = sha256_file(out_path)
+            # written and hashed in one pass; the file is never re-read
+            meta = llcore.write_mersenne_decimal(
+                p, str(part_path), callback=on_progress, memory_limit=MEMORY_LIMIT
+            )
+            os.replace(part_path, out_path)
             dao.artifact_insert(
                 conn,
                 job_id,
                 filename,
                 str(out_path),
                 int(meta["digits"]),
-                int(size_bytes),
-                digest,
+                int(meta["bytes"]),
+                meta["sha256"],
+                p=p,
+                fmt=fmt,
             )
             dao.job_finish_ok(conn, job_id, engine=None)
         except Exception as e:
             dao.job_fail(conn, job_id, str(e))
             raise
+        finally:
+            progress.pop(job_id, None)
+            cache.release(p, fmt)
+        cache.evict(conn, keep=job_id)
 
     asyncio.get_running_loop().run_in_executor(req.app.state.executor, work)
-    return {"id": job_id, "p": p, "estimated_digits": est_digits}
+    return {"id": job_id, **resp}
 
 
 @router.get("/{job_id}")
 async def get_digits_job(req: Request, job_id: str):
     from .. import db as dao
 
-    conn = req.app.state.db
-    j = dao.job_get(conn, job_id)
+    store = req.app.state.store
+    j = await store.read(dao.job_get, job_id)
     if not j:
         raise HTTPException(404, detail="job not found")
-    a = dao.artifact_get_by_job(conn, job_id)
+    a = await store.read(dao.artifact_get_by_job, job_id)
     out = dict(j)
+    prog = req.app.state.digits_progress.get(job_id)
+    if prog:
+        out["progress"] = prog
     if a:
         out["artifact"] = dict(a)
     return out
@@ -95,11 +158,19 @@ async def get_digits_job(req: Request, job_id: str):
 async def download_digits(req: Request, job_id: str):
     from .. import db as dao
 
-    conn = req.app.state.db
-    a = dao.artifact_get_by_job(conn, job_id)
+    store = req.app.state.store
+    a = await store.read(dao.artifact_get_by_job, job_id)
     if not a:
         raise HTTPException(404, detail="artifact not ready")
     path = Path(a["path"])
+    # pinned until the response is streamed, so evict() leaves the file alone
+    cache: ArtifactCache = req.app.state.artifacts
+    cache.pin(job_id)
     if not path.exists():
+        cache.unpin(job_id)
         raise HTTPException(404, detail="file missing")
-    return FileResponse(str(path), filename=a["filename"], media_type="text/plain")
+    if a["format"] is not None:
+        store.defer(dao.artifact_touch, job_id)  # LRU order
+    return _PinnedFileResponse(
+        cache, job_id, str(path), filename=a["filename"], media_type="text/plain"
+    )
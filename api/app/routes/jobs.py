@@ -1,24 +1,94 @@
-from fastapi import APIRouter, HTTPException, Request
+import json
+import os
 from uuid import uuid4
+
+from fastapi import APIRouter, HTTPException, Request
+
+from .. import db as dao
 from ..schema.models import CreateJob
-from ..services.ll_runner import submit_ll
+from ..services.ll_runner import LLJobs, job_view, submit_ll
 
 router = APIRouter()
 
+# LL jobs queued or running at once; further requests get 429
+MAX_LIVE_JOBS = int(os.environ.get("JOBS_MAX_LIVE", "256"))
+# threads running them; their own executor, so long tests never hold up
+# digit exports
+JOBS_WORKERS = max(1, int(os.environ.get("JOBS_WORKERS", "2")))
+
+
+def _known_result(conn, p: int):
+    """A verdict for M_p already on record: an earlier job's, or a block run's."""
+    row = dao.job_latest_result(conn, "ll", p)
+    if row is not None:
+        return row["id"], None
+    e = dao.exponent_get(conn, p)
+    if e is None or e["status"] != "done" or e["is_prime"] is None:
+        return None, None
+    return None, {
+        "p": p,
+        "is_prime": bool(e["is_prime"]),
+        "ns_elapsed": e["ns_elapsed"],
+        "engine_info": e["engine_info"],
+        "factor": e["factor"],
+        "test_kind": e["test_kind"],
+        "source": "block",
+    }
+
 
 @router.post("")
 async def create_job(req: Request, body: CreateJob):
+    """
+    Test M_p by LL. A p whose verdict is known (from an earlier job or a
+    block run) is answered at once (`cached: true`, no digests); a request
+    for a p that a live job is already testing gets that job's id
+    (`coalesced: true`).
+    """
     p = int(body.p)
     if p < 2:
         raise HTTPException(400, detail="p must be >= 2")
+    store = req.app.state.store
+    registry: LLJobs = req.app.state.ll_jobs
+
+    # Claim p before looking it up: a job records its result before it is
+    # released, so no run of p can finish in between.
     job_id = uuid4().hex
+    leader = registry.claim(p, job_id)
+    if leader is not None:
+        return {"id": leader, "coalesced": True}
+    try:
+        if registry.over_capacity():
+            raise HTTPException(
+                429, detail=f"{registry.max_live} LL jobs already queued"
+            )
+        prior_id, result = await store.read(_known_result, p)
+        if result is not None:
+            await store.write(
+                dao.job_insert_done,
+                job_id,
+                "ll",
+                p,
+                json.dumps(result),
+                result["engine_info"],
+            )
+        elif prior_id is None:
+            await store.write(dao.job_insert, job_id, kind="ll", p=p, status="queued")
+    except BaseException:
+        registry.release(job_id)
+        raise
+    if prior_id is not None or result is not None:
+        registry.release(job_id)
+        return {"id": prior_id or job_id, "cached": True}
     await submit_ll(req.app, job_id, p, body.progress_stride)
     return {"id": job_id}
 
 
 @router.get("/{job_id}")
 async def get_job(req: Request, job_id: str):
-    job = req.app.state.jobs.get(job_id)
-    if not job:
+    job = req.app.state.ll_jobs.get(job_id)
+    if job is not None:
+        return job
+    row = await req.app.state.store.read(dao.job_get, job_id)
+    if row is None or row["kind"] != "ll":
         raise HTTPException(404, detail="job not found")
-    return job
+    return job_view(row)
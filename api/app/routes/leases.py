@@ -0,0 +1,143 @@
+# api/app/routes/leases.py
+"""
+Pull-based assignment for remote workers (scripts/worker.py). A worker leases
+one exponent of a running block, heartbeats while it tests it and submits the
+result; a lease that is not renewed within LEASE_TTL_SECS expires and the
+exponent goes back in the queue, where the local pool or another worker picks
+it up. Local and remote workers share the exponents table: whoever marks an
+exponent running first gets it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from uuid import uuid4
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from .. import db as dao
+from ..schema.models import LeaseHeartbeat, LeaseRequest, LeaseResult
+from . import blocks
+
+log = logging.getLogger("leases")
+router = APIRouter()
+
+LEASE_TTL_SECS = int(os.environ.get("LEASE_TTL_SECS", "120"))
+# Exponents below this stay with the local pool: they finish faster than a
+# lease round trip (and run there in batches).
+LEASE_MIN_P = int(os.environ.get("LEASE_MIN_P", str(blocks.BATCH_MAX_P)))
+
+
+@router.post("")
+async def acquire(req: Request, body: LeaseRequest):
+    """
+    Lease the smallest queued exponent of a running block (or of `block_id`).
+    Returns {lease_id, p, block_id, kind ('ll' | 'prp'), ttl, heartbeat_secs,
+    expires_at}, or 204 when there is nothing to hand out.
+    """
+    store = req.app.state.store
+    lease_id = uuid4().hex
+    expires_at = int(time.time()) + LEASE_TTL_SECS
+    row = await store.write(
+        dao.lease_acquire, lease_id, body.worker, expires_at, LEASE_MIN_P, body.block_id
+    )
+    if row is None:
+        return Response(status_code=204)
+    params = json.loads(row["run_params"] or "{}")
+    return {
+        "lease_id": lease_id,
+        "p": int(row["p"]),
+        "block_id": int(row["block_id"]),
+        "kind": params.get("kind", "ll"),
+        "ttl": LEASE_TTL_SECS,
+        "heartbeat_secs": max(1, LEASE_TTL_SECS // 4),
+        "expires_at": expires_at,
+    }
+
+
+@router.post("/{lease_id}/heartbeat")
+async def heartbeat(req: Request, lease_id: str, body: LeaseHeartbeat):
+    """
+    Extend a lease and report progress. `cancel: true` in the reply means the
+    block was stopped: the worker should give the lease back (DELETE).
+    410 if the lease expired or was never issued; the worker must drop it.
+    """
+    app = req.app
+    store = app.state.store
+    expires_at = int(time.time()) + LEASE_TTL_SECS
+    row = await store.write(dao.lease_renew, lease_id, expires_at, body.iteration)
+    if row is None:
+        raise HTTPException(410, detail="lease expired or unknown")
+    p, block_id = int(row["p"]), int(row["block_id"])
+    if body.total:
+        pct = int(body.iteration * 100 / body.total)
+        blocks._broadcast_sync(
+            app, block_id, {"block_id": block_id, "p": p, "pct": pct, "stage": "remote"}
+        )
+    b = await store.read(dao.block_get, block_id)
+    stopped = b["status"] != "running" or block_id in app.state.block_cancel
+    return {"expires_at": expires_at, "cancel": stopped}
+
+
+@router.post("/{lease_id}/result")
+async def submit(req: Request, lease_id: str, body: LeaseResult):
+    """Record the result of a leased test. 410 if the lease is no longer held."""
+    app = req.app
+    store = app.state.store
+    row = await store.write(dao.lease_submit, lease_id, body.model_dump())
+    if row is None:
+        raise HTTPException(410, detail="lease expired or unknown")
+    p, block_id = int(row["p"]), int(row["block_id"])
+    store.add_tested(block_id, 1, p)
+    await blocks.reconcile_block(app, block_id)
+    return {"ok": True, "p": p}
+
+
+@router.delete("/{lease_id}")
+async def release(req: Request, lease_id: str):
+    """Give a lease back unfinished; the exponent is queued again."""
+    row = await req.app.state.store.write(dao.lease_release, lease_id)
+    if row is None:
+        raise HTTPException(410, detail="lease expired or unknown")
+    await blocks.reconcile_block(req.app, int(row["block_id"]))
+    return {"ok": True, "p": int(row["p"])}
+
+
+@router.get("")
+async def list_leases(req: Request, block_id: int | None = None):
+    """Leases currently held by remote workers."""
+    rows = await req.app.state.store.read(dao.leases_active, block_id)
+    now = int(time.time())
+    return [
+        {
+            "p": int(r["p"]),
+            "block_id": int(r["block_id"]),
+            "lease_id": r["lease_id"],
+            "worker": r["lease_worker"],
+            "iteration": r["lease_iteration"],
+            "started_at": r["job_started_at"],
+            "expires_in": int(r["lease_expires_at"]) - now,
+        }
+        for r in rows
+    ]
+
+
+async def expire_leases(app) -> None:
+    """
+    Background task: every few seconds, requeue exponents whose lease ran out
+    and let their blocks pick them up again.
+    """
+    period = max(1, LEASE_TTL_SECS // 8)
+    while True:
+        await asyncio.sleep(period)
+        try:
+            rows = await app.state.store.write(dao.leases_expire, int(time.time()))
+            for bid in sorted({int(r["block_id"]) for r in rows}):
+                log.info("requeued expired leases in block %d", bid)
+                await blocks.reconcile_block(app, bid)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("lease expiry pass failed")
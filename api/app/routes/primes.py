@@ -1,40 +1,40 @@
 # api/app/routes/primes.py
 import math
+
 from fastapi import APIRouter, Request
-from .. import db as dao
+
+from ..services.readmodel import conditional
 
 router = APIRouter()
 
 
 @router.get("")
-def recent_primes(req: Request, limit: int = 12):
-    conn = req.app.state.db
-    rows = dao.primes_recent(conn, limit)
+async def recent_primes(req: Request, limit: int = 12):
+    """Newest verified primes, from the in-memory read model (ETag/If-None-Match)."""
+    rm = req.app.state.readmodel
+    await rm.refresh(req.app.state.store)
     out = []
-    for r in rows:
+    for r in rm.primes(limit):
         p = int(r["p"])
-        # tolerate NULL block_id from older rows; derive from p
-        bid = r["block_id"]
-        block_id = int(bid) if bid is not None else (p // 1_000_000)
         # decimal digit count of M_p = 2^p - 1
         digits = int(math.floor(p * math.log10(2)) + 1)
         out.append(
             {
                 "p": p,
-                "block_id": block_id,
+                "block_id": r["block_id"],
                 "digits": digits,
                 "finished_at": r["finished_at"],
                 "engine_info": r["engine_info"],
                 "ns_elapsed": r["ns_elapsed"],
             }
         )
-    return out
+    return conditional(req, rm.etag("primes", rm.primes_version), out)
 
 
 @router.get("/count")
-def primes_count(req: Request):
-    conn = req.app.state.db
-    row = conn.execute(
-        "SELECT COUNT(*) AS c FROM exponents WHERE is_prime=1 AND status='done'"
-    ).fetchone()
-    return {"count": int(row["c"] or 0)}
+async def primes_count(req: Request):
+    rm = req.app.state.readmodel
+    await rm.refresh(req.app.state.store)
+    return conditional(
+        req, rm.etag("count", rm.primes_version), {"count": rm.primes_count()}
+    )
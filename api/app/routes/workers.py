@@ -0,0 +1,40 @@
+# api/app/routes/workers.py
+import asyncio
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+
+router = APIRouter()
+
+
+@router.get("")
+def list_workers(req: Request):
+    """
+    Live view of the LL worker pool: which block/exponent each worker holds,
+    its pinned CPU and progress, plus pending/running counts per block.
+    """
+    return req.app.state.pool.snapshot()
+
+
+@router.get("/digest/{p}")
+async def residue_digest(req: Request, p: int, timeout: float = 2.0):
+    """
+    SHA-256 of the current residue of a running LL test, taken on demand
+    (the test loop only hashes when asked or when it checkpoints).
+    """
+    p = int(p)
+    prog = None
+    for running in getattr(req.app.state, "block_progress", {}).values():
+        prog = running.get(p) or prog
+    if prog is None:
+        raise HTTPException(status_code=404, detail=f"M_{p} is not running")
+    seq = prog.digest_seq
+    prog.request_digest()
+    deadline = time.monotonic() + max(0.0, timeout)
+    while prog.digest_seq == seq and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    d = prog.digest()
+    if prog.digest_seq == seq or d is None:
+        raise HTTPException(status_code=504, detail="no digest published in time")
+    iteration, digest = d
+    return {"p": p, "iteration": iteration, "total": prog.total, "sha256": digest.hex()}
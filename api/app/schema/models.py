@@ -1,15 +1,41 @@
+from typing import Any
+
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
 
 
 class CreateJob(BaseModel):
     p: int
-    progress_stride: Optional[int] = None  # 0/None => auto (~1%)
+    progress_stride: int | None = None  # 0/None => auto (~1%)
 
 
 class JobStatus(BaseModel):
     id: str
     p: int
     status: str  # queued | running | done | error
-    result: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+
+class LeaseRequest(BaseModel):
+    worker: str  # free-form name, e.g. "host-3/pid-1234"
+    block_id: int | None = None  # None => any running block
+
+
+class LeaseHeartbeat(BaseModel):
+    iteration: int = 0
+    total: int = 0
+
+
+class PRPOutcome(BaseModel):
+    is_probable_prime: bool
+    res64: str
+    ns_elapsed: int
+    engine_info: str
+
+
+class LeaseResult(BaseModel):
+    # final verdict; for a PRP probable prime, from its LL confirmation
+    is_prime: bool
+    ns_elapsed: int = 0
+    engine_info: str | None = None
+    prp: PRPOutcome | None = None
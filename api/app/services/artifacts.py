@@ -0,0 +1,122 @@
+# api/app/services/artifacts.py
+from __future__ import annotations
+
+import logging
+import pathlib
+import threading
+import time
+from collections import Counter
+
+from .. import db as dao
+
+log = logging.getLogger("artifacts")
+
+# format -> file extension
+FORMATS = {"decimal": "txt"}
+
+Key = tuple[int, str]
+
+# A looked-up artifact is safe from eviction this long, so the client that
+# was just told to download it still finds the file.
+LOOKUP_HOLD_SECS = 300.0
+
+
+class ArtifactCache:
+    """
+    Exports of M_p never change, so an artifact is identified by (p, format)
+    and stored once, at <root>/<format>/M_<p>.<ext>. One job per key runs at
+    a time (identical requests join it), finished artifacts are served from
+    disk, and once their total size exceeds `budget_bytes` the least recently
+    used ones are deleted, except those being downloaded (`pin`) or handed
+    out by `lookup` in the last LOOKUP_HOLD_SECS.
+    """
+
+    def __init__(self, root: pathlib.Path, budget_bytes: int):
+        self.root = pathlib.Path(root)
+        self.budget = int(budget_bytes)
+        self._inflight: dict[Key, str] = {}
+        self._pins: Counter[str] = Counter()  # job id -> downloads streaming
+        self._held: dict[str, float] = {}  # job id -> monotonic hold expiry
+        self._lock = threading.Lock()
+
+    def path_for(self, p: int, fmt: str) -> pathlib.Path:
+        return self.root / fmt / f"M_{int(p)}.{FORMATS[fmt]}"
+
+    # ---- in-flight coalescing ------------------------------------------------
+
+    def claim(self, p: int, fmt: str, job_id: str) -> str | None:
+        """
+        Make job_id the producer of (p, fmt). If another job already is,
+        nothing changes and that job's id is returned.
+        """
+        key = (int(p), fmt)
+        with self._lock:
+            current = self._inflight.get(key)
+            if current is None:
+                self._inflight[key] = job_id
+            return current
+
+    def release(self, p: int, fmt: str) -> None:
+        with self._lock:
+            self._inflight.pop((int(p), fmt), None)
+
+    def inflight(self) -> dict[Key, str]:
+        with self._lock:
+            return dict(self._inflight)
+
+    # ---- pins ----------------------------------------------------------------
+
+    def pin(self, job_id: str) -> None:
+        """Keep an artifact on disk until the matching unpin (e.g. a download)."""
+        with self._lock:
+            self._pins[job_id] += 1
+
+    def unpin(self, job_id: str) -> None:
+        with self._lock:
+            self._pins[job_id] -= 1
+            if self._pins[job_id] <= 0:
+                del self._pins[job_id]
+
+    def _hold(self, job_id: str) -> None:
+        with self._lock:
+            self._held[job_id] = time.monotonic() + LOOKUP_HOLD_SECS
+
+    def _pinned(self, job_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._held = {j: t for j, t in self._held.items() if t > now}
+            return job_id in self._pins or job_id in self._held
+
+    # ---- lookup / eviction ---------------------------------------------------
+
+    def lookup(self, conn, p: int, fmt: str):
+        """The cached artifact row for (p, fmt), or None. A row whose file has
+        gone missing is dropped, so the export is simply redone."""
+        row = dao.artifact_get_cached(conn, p, fmt)
+        if row is None:
+            return None
+        if not pathlib.Path(row["path"]).exists():
+            log.warning("artifact %s for M_%d is missing; dropping it", row["path"], p)
+            dao.artifact_delete(conn, row["job_id"])
+            return None
+        self._hold(row["job_id"])
+        return row
+
+    def evict(self, conn, keep: str | None = None) -> int:
+        """Delete least recently used artifacts (never `keep`, a job id, nor
+        pinned or held ones) until the cache fits its budget. Returns the
+        bytes freed."""
+        rows = dao.artifacts_cached_lru(conn)
+        total = sum(int(r["size_bytes"]) for r in rows)
+        freed = 0
+        for r in rows:
+            if total <= self.budget:
+                break
+            if r["job_id"] == keep or self._pinned(r["job_id"]):
+                continue
+            pathlib.Path(r["path"]).unlink(missing_ok=True)
+            dao.artifact_delete(conn, r["job_id"])
+            total -= int(r["size_bytes"])
+            freed += int(r["size_bytes"])
+            log.info("evicted %s (%d bytes)", r["path"], r["size_bytes"])
+        return freed
@@ -0,0 +1,136 @@
+# api/app/services/costmodel.py
+from __future__ import annotations
+
+import logging
+import math
+import statistics
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from .. import db as dao
+
+log = logging.getLogger("costmodel")
+
+# ns per work unit (p^2 log2 p) before any history exists; measured on a
+# desktop core, the fit replaces them after MIN_SAMPLES finished exponents.
+DEFAULT_NS_PER_UNIT = {"batch": 0.05, "gmp": 0.10, "ibdwt": 0.12}
+MIN_SAMPLES = 8
+# Fit on the most recent rows only, so a faster build or CPU takes over.
+HISTORY_ROWS = 5000
+REFIT_SECS = 60.0
+
+
+def work_units(p: int) -> float:
+    """LL cost shape: p squarings of a p-bit number, each ~p log p."""
+    p = max(3, int(p))
+    return float(p) * p * math.log2(p)
+
+
+def engine_family(engine_info: str | None) -> str | None:
+    """'batch' | 'gmp' | 'ibdwt' from a recorded engine_info string."""
+    if not engine_info:
+        return None
+    info = engine_info
+    info = info.removeprefix("prp3:")  # PRP squarings cost the same as LL's
+    head = info.split(":", 1)[0].split(";", 1)[0].strip()
+    return head if head in DEFAULT_NS_PER_UNIT else None
+
+
+class CostModel:
+    """
+    Predicted single-core time of an LL/PRP test: ns = c_engine * p^2 log2 p,
+    with c_engine the median ns per unit of recent finished exponents of that
+    engine (rows decided by a factor are skipped). Engine per exponent follows
+    the block runner: batched below batch_max_p, then GMP, then IBDWT from
+    ibdwt_min_p on.
+    """
+
+    def __init__(self, batch_max_p: int = 0, ibdwt_min_p: int = 0):
+        self.batch_max_p = int(batch_max_p)
+        self.ibdwt_min_p = int(ibdwt_min_p)
+        self._coef: dict[str, float] = dict(DEFAULT_NS_PER_UNIT)
+        self._samples: dict[str, int] = {}
+        self._fitted_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---- fit ---------------------------------------------------------------
+
+    def refresh(self, conn, force: bool = False) -> None:
+        """Refit from history if the last fit is older than REFIT_SECS."""
+        with self._lock:
+            if not force and time.monotonic() - self._fitted_at < REFIT_SECS:
+                return
+            self._fitted_at = time.monotonic()
+        ratios: dict[str, list] = {}
+        for r in dao.exponents_timings(conn, HISTORY_ROWS):
+            fam = engine_family(r["engine_info"])
+            if fam is None or not r["ns_elapsed"]:
+                continue
+            ratios.setdefault(fam, []).append(r["ns_elapsed"] / work_units(r["p"]))
+        with self._lock:
+            for fam, xs in ratios.items():
+                self._samples[fam] = len(xs)
+                if len(xs) >= MIN_SAMPLES:
+                    self._coef[fam] = statistics.median(xs)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                fam: {"ns_per_unit": c, "samples": self._samples.get(fam, 0)}
+                for fam, c in self._coef.items()
+            }
+
+    # ---- predict -----------------------------------------------------------
+
+    def engine_for(self, p: int) -> str:
+        if p < self.batch_max_p:
+            return "batch"
+        if self.ibdwt_min_p and p >= self.ibdwt_min_p:
+            return "ibdwt"
+        return "gmp"
+
+    def predict_ns(self, p: int) -> float:
+        return self._coef[self.engine_for(p)] * work_units(p)
+
+    def predict_s(self, ps: Iterable[int]) -> float:
+        return sum(self.predict_ns(p) for p in ps) / 1e9
+
+    def remaining_s(self, rows) -> dict[int, float]:
+        """
+        Seconds of single-core work per block from dao.exponents_remaining_work
+        rows. log2 p is taken at the bucket's p^2-weighted mean p, which is
+        within a fraction of a percent for a 1M-wide block.
+        """
+        out: dict[int, float] = {}
+        for r in rows:
+            if not r["n"]:
+                continue
+            mean_p = max(3.0, r["s3"] / r["s2"])
+            ns = self._coef[r["engine"]] * r["s2"] * math.log2(mean_p)
+            out[int(r["block_id"])] = out.get(int(r["block_id"]), 0.0) + ns / 1e9
+        return out
+
+
+def block_etas(
+    remaining: dict[int, float],
+    running: dict[int, tuple[int, int]],
+    workers: int,
+) -> dict[int, float]:
+    """
+    Wall-clock seconds until each running block is done. `running` maps
+    block_id -> (priority, max_parallel). The pool serves blocks by
+    (priority, cost) and blocks cover disjoint ranges of p, so a block's
+    work follows that of every block ahead of it in (-priority, id) order;
+    its own worker cap bounds it from below.
+    """
+    workers = max(1, int(workers))
+    ahead = 0.0
+    out: dict[int, float] = {}
+    for bid in sorted(running, key=lambda b: (-running[b][0], b)):
+        own = remaining.get(bid, 0.0)
+        ahead += own
+        cap = running[bid][1] or workers
+        out[bid] = max(ahead / workers, own / min(cap, workers))
+    return out
@@ -0,0 +1,140 @@
+# api/app/services/factoring.py
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Iterable
+
+from .. import db as dao
+from .._llcore import llcore
+
+log = logging.getLogger("factoring")
+
+# The first chunk covers every q < 2^32 in one call (cheap for any p); deeper
+# levels run one bit at a time so progress is persisted and stop() is honoured.
+_TF_FIRST_CHUNK_BITS = 32
+
+
+# Rule codes from llcore.prescreen, as recorded in engine_info.
+_PRESCREEN_RULES = {1: "euler", 2: "small"}
+
+
+def prescreen_exponents(conn, block_id: int, ps: Iterable[int]) -> int:
+    """
+    Run llcore.prescreen over a block's exponents and mark every M_p with a
+    certificate factor composite, so it is never queued for TF or LL. Bumps
+    the block's tested count; returns how many exponents were settled.
+    """
+    ps = [int(p) for p in ps]
+    if not ps:
+        return 0
+    res = llcore.prescreen(ps)
+    rule, ks = res["rule"], res["k"]
+    hits = [i for i, f in enumerate(res["factor"]) if f]
+    if not hits:
+        return 0
+    ns = int(res["ns_elapsed"]) // len(ps)  # amortised over the whole call
+    rows = [
+        (
+            ps[i],
+            res["factor"][i],
+            ns,
+            f"prescreen:{_PRESCREEN_RULES[rule[i]]},k={ks[i]}",
+        )
+        for i in hits
+    ]
+    settled = dao.exponents_factored_many(conn, rows)
+    if settled:
+        dao.block_counts_bump(conn, block_id, settled)
+    log.info(
+        "block %d: prescreen settled %d of %d exponents", block_id, settled, len(ps)
+    )
+    return settled
+
+
+def tf_target_bits(p: int) -> int:
+    return int(llcore.tf_default_bits(int(p)))
+
+
+def trial_factor_exponent(
+    conn,
+    p: int,
+    done_bits: int,
+    should_stop: Callable[[], bool],
+    on_level: Callable[[int, int], None] | None = None,
+) -> int | None:
+    """
+    Trial factor M_p from 2^done_bits up to tf_target_bits(p). Records the
+    searched depth after every level and, if a factor turns up, marks the
+    exponent composite. Returns the factor or None (also when stopped early).
+    """
+    p = int(p)
+    target = tf_target_bits(p)
+    lo = int(done_bits or 0)
+    ns_total = 0
+    while lo < target:
+        if should_stop():
+            return None
+        hi = min(target, _TF_FIRST_CHUNK_BITS) if lo < _TF_FIRST_CHUNK_BITS else lo + 1
+        res = llcore.trial_factor(p, max_bits=hi, min_bits=lo)
+        ns_total += int(res["ns_elapsed"])
+        if res["factor"] is not None:
+            factor = int(res["factor"])
+            dao.exponent_factored(
+                conn,
+                p,
+                factor,
+                ns_total,
+                f"tf:k={res['k']},bits={res['bits']}",
+                tf_bits=lo,
+            )
+            log.info("M_%d has factor %d (tf)", p, factor)
+            return factor
+        dao.exponent_tf_bits(conn, p, hi)
+        if on_level is not None:
+            on_level(hi, target)
+        lo = hi
+    return None
+
+
+def pm1_exponent(
+    conn,
+    p: int,
+    should_stop: Callable[[], bool],
+    on_progress: Callable[[int, float], None] | None = None,
+) -> int | None:
+    """
+    Run P-1 on M_p with bounds from llcore.pm1_default_bounds (given the
+    recorded trial-factoring depth), unless it is not worth it or those
+    bounds were already covered. Raises RuntimeError("cancelled") if
+    should_stop() turns true mid-run. Returns the factor or None.
+    """
+    p = int(p)
+    row = dao.exponent_get(conn, p)
+    tf_bits = int(row["tf_bits"] or 0) if row else 0
+    bounds = llcore.pm1_default_bounds(p, tf_bits)
+    b1, b2 = int(bounds["b1"]), int(bounds["b2"])
+    if b1 == 0:
+        return None
+    if row and (row["pm1_b1"] or 0) >= b1 and (row["pm1_b2"] or 0) >= b2:
+        return None
+
+    def cb(stage: int, fraction: float):
+        if should_stop():
+            raise RuntimeError("cancelled")
+        if on_progress is not None:
+            on_progress(stage, fraction)
+
+    res = llcore.pm1_factor(p, b1, b2, callback=cb)
+    if res["factor"] is None:
+        dao.exponent_pm1_done(conn, p, b1, b2)
+        return None
+    factor = int(res["factor"])
+    dao.exponent_factored(
+        conn,
+        p,
+        factor,
+        int(res["ns_elapsed"]),
+        f"pm1:B1={b1},B2={b2},stage={res['stage']}",
+    )
+    log.info("M_%d has factor %d (P-1 stage %d)", p, factor, res["stage"])
+    return factor
@@ -1,18 +1,90 @@
 import asyncio
+import json
+import logging
+import threading
+from typing import Any
+
+from .. import db as dao
+from .. import ws
 from .._llcore import llcore
 
+log = logging.getLogger("ll_runner")
+
+
+class LLJobs:
+    """
+    Registry of POST /jobs LL tests. The jobs table is the record (status
+    and result survive restarts); memory only holds jobs that are queued or
+    running, at most `max_live` of them, plus which job is testing each p so
+    identical requests join it.
+    """
+
+    def __init__(self, max_live: int):
+        self.max_live = int(max_live)
+        self._live: dict[str, dict[str, Any]] = {}
+        self._by_p: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, p: int, job_id: str) -> str | None:
+        """
+        Register job_id as the test of p. If a job for p is already live,
+        nothing changes and its id is returned.
+        """
+        with self._lock:
+            current = self._by_p.get(int(p))
+            if current is None:
+                self._by_p[int(p)] = job_id
+                self._live[job_id] = {
+                    "id": job_id,
+                    "p": int(p),
+                    "status": "queued",
+                    "result": None,
+                    "error": None,
+                }
+            return current
+
+    def over_capacity(self) -> bool:
+        """More live jobs than max_live (checked right after a claim)."""
+        with self._lock:
+            return len(self._live) > self.max_live
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            job = self._live.get(job_id)
+            return dict(job) if job is not None else None
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock:
+            if job_id in self._live:
+                self._live[job_id]["status"] = status
+
+    def release(self, job_id: str) -> None:
+        """Forget a finished job (its row in the jobs table is the record now)."""
+        with self._lock:
+            job = self._live.pop(job_id, None)
+            if job is not None and self._by_p.get(job["p"]) == job_id:
+                del self._by_p[job["p"]]
+
+
+def job_view(row) -> dict[str, Any]:
+    """GET /jobs/{id} shape of a jobs table row."""
+    return {
+        "id": row["id"],
+        "p": int(row["p"]),
+        "status": row["status"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+    }
+
 
 async def submit_ll(app, job_id: str, p: int, progress_stride):
+    """
+    Run an LL test of p for a job claimed in app.state.ll_jobs whose row is
+    already in the jobs table; streams per-iteration digests to /ws/jobs/{id}.
+    """
     loop = asyncio.get_running_loop()
-    q: asyncio.Queue = asyncio.Queue(maxsize=1024)
-    app.state.queues[job_id] = q
-    app.state.jobs[job_id] = {
-        "id": job_id,
-        "p": p,
-        "status": "queued",
-        "result": None,
-        "error": None,
-    }
+    registry: LLJobs = app.state.ll_jobs
+    conn = app.state.db
 
     stride = 0 if (progress_stride is None) else int(progress_stride)
 
@@ -20,24 +92,42 @@ async def submit_ll(app, job_id: str, p: int, progress_stride):
         pct = int((iter_idx + 1) * 100 / max(1, p - 2))
         item = {"iteration": int(iter_idx), "pct": pct, "digest": digest_bytes.hex()}
         # thread-safe handoff from worker thread to asyncio loop
-        loop.call_soon_threadsafe(q.put_nowait, item)
+        loop.call_soon_threadsafe(ws.publish_job, app, job_id, item)
 
     def work():
-        app.state.jobs[job_id]["status"] = "running"
+        registry.set_status(job_id, "running")
+        dao.job_start(conn, job_id)
         res = llcore.ll_test(int(p), progress_stride=stride, callback=cb)
-        app.state.jobs[job_id]["result"] = res
-        app.state.jobs[job_id]["status"] = "done"
+        dao.job_finish_ok(
+            conn, job_id, engine=res.get("engine_info"), result=json.dumps(res)
+        )
         return res
 
-    fut = loop.run_in_executor(app.state.executor, work)
+    fut = loop.run_in_executor(app.state.job_executor, work)
 
     async def finalize():
         try:
             await fut
         except Exception as e:
-            app.state.jobs[job_id]["status"] = "error"
-            app.state.jobs[job_id]["error"] = str(e)
+            log.warning("LL job %s (p=%d) failed: %s", job_id, p, e)
+            await app.state.store.write(dao.job_fail, job_id, str(e))
         finally:
-            loop.call_soon_threadsafe(q.put_nowait, None)  # sentinel to close WS
+            registry.release(job_id)
+            ws.publish_job(app, job_id, None)  # close subscribers' sockets
 
     loop.create_task(finalize())
+
+
+async def resume_ll_jobs(app) -> None:
+    """Re-run LL jobs that were queued or running when the server stopped."""
+    registry: LLJobs = app.state.ll_jobs
+    for row in await app.state.store.read(dao.jobs_unfinished, "ll"):
+        p = int(row["p"])
+        if registry.claim(p, row["id"]) is not None:
+            # another unfinished job tests the same p; this one is a duplicate
+            await app.state.store.write(
+                dao.job_fail, row["id"], "superseded on restart"
+            )
+            continue
+        log.info("resuming LL job %s (p=%d)", row["id"], p)
+        await submit_ll(app, row["id"], p, None)
@@ -0,0 +1,152 @@
+# api/app/services/persistence.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .. import db as dao
+
+log = logging.getLogger("persistence")
+
+CoverageHook = Callable[[int, int], Awaitable[None]]
+
+
+class Persistence:
+    """
+    Asyncio front end for db.Database, so coroutines never touch SQLite on
+    the event loop:
+
+      - `await read(fn, ...)` runs a DAO read on a thread (each thread has
+        its own reader connection);
+      - `await write(fn, ...)` hands a DAO write to the writer thread and
+        resumes once it is committed (status transitions go this way, or
+        through the blocking DAO call on a worker thread);
+      - `defer(fn, ...)` and `add_tested(...)` are write-behind: they return
+        at once, from any thread, and a background task drains them into one
+        writer transaction. Tested-count bumps for the same block are summed
+        first, and `on_coverage(block_id, last_p)` runs after each commit.
+
+    Deferred writes are lost on a crash, so only use them for data that can
+    be rebuilt (tested counts are recounted at startup).
+    """
+
+    def __init__(self, db: dao.Database, on_coverage: CoverageHook | None = None):
+        self.db = db
+        self.on_coverage = on_coverage
+        self._lock = threading.Lock()
+        self._ops: list[tuple[Callable[..., Any], tuple, dict]] = []
+        self._tested: Counter = Counter()
+        self._last_p: dict[int, int] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._committed: asyncio.Condition | None = None
+        # enqueue counter vs. counter of the last drained batch (for flush)
+        self._queued_seq = 0
+        self._done_seq = 0
+        self._task: asyncio.Task | None = None
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the drain task on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._committed = asyncio.Condition()
+        self._task = self._loop.create_task(self._drain())
+
+    async def close(self) -> None:
+        """Flush deferred writes and stop the drain task."""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---- reads / durable writes ----------------------------------------------
+
+    async def read(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """`fn(db, ...)` on a worker thread: DAO reads, or helpers like seeding."""
+        return await asyncio.to_thread(fn, self.db, *args, **kwargs)
+
+    async def write(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.db.submit(fn, *args, **kwargs))
+
+    # ---- write-behind ----------------------------------------------------------
+
+    def defer(self, fn: Callable[..., Any], *args, **kwargs) -> None:
+        """Queue a DAO write without waiting for it (thread-safe)."""
+        with self._lock:
+            self._ops.append((fn, args, kwargs))
+            self._queued_seq += 1
+        self._signal()
+
+    def add_tested(self, block_id: int, n: int, last_p: int) -> None:
+        """Count n more exponents of a block as tested (thread-safe, coalesced)."""
+        block_id = int(block_id)
+        with self._lock:
+            self._tested[block_id] += int(n)
+            self._last_p[block_id] = int(last_p)
+            self._queued_seq += 1
+        self._signal()
+
+    async def flush(self) -> None:
+        """Wait until everything deferred so far is committed."""
+        if self._committed is None:
+            return
+        with self._lock:
+            target = self._queued_seq
+        self._wake.set()
+        async with self._committed:
+            await self._committed.wait_for(lambda: self._done_seq >= target)
+
+    def _signal(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wake.set()
+        else:
+            loop.call_soon_threadsafe(self._wake.set)
+
+    async def _drain(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                ops, self._ops = self._ops, []
+                tested, self._tested = self._tested, Counter()
+                last_p, self._last_p = self._last_p, {}
+                seq = self._queued_seq
+            try:
+                futs = [self.db.submit(fn, *a, **kw) for fn, a, kw in ops]
+                futs += [
+                    self.db.submit(dao.block_counts_bump, bid, n)
+                    for bid, n in tested.items()
+                ]
+                # all queued together, so they share the writer's next transaction
+                for res in await asyncio.gather(
+                    *(asyncio.wrap_future(f) for f in futs), return_exceptions=True
+                ):
+                    if isinstance(res, Exception):
+                        log.error("deferred write failed: %s", res)
+                if self.on_coverage is not None:
+                    for bid in tested:
+                        try:
+                            await self.on_coverage(bid, last_p[bid])
+                        except Exception:
+                            log.exception("coverage hook failed for block %d", bid)
+            finally:
+                async with self._committed:
+                    self._done_seq = seq
+                    self._committed.notify_all()
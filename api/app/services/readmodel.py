@@ -0,0 +1,152 @@
+# api/app/services/readmodel.py
+from __future__ import annotations
+
+import asyncio
+import json
+import zlib
+from typing import Any
+from uuid import uuid4
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from .. import db as dao
+from .costmodel import CostModel
+
+
+class ReadModel:
+    """
+    In-memory copy of what dashboards poll (GET /primes, /primes/count,
+    /blocks), so those requests never reach SQLite while nothing changes:
+
+      - every verified prime (there are a few dozen at most);
+      - every blocks row;
+      - per block, the cost model's remaining-work sums.
+
+    Writers call `touch(block_id)` once a change to the block is committed:
+    its tested counts (the Persistence coverage hook, which follows every
+    finished exponent) or its status. The next `refresh()` re-reads only the
+    touched blocks and, where their rows differ from the cached ones, bumps
+    `primes_version` / `blocks_version`, which the routes use (with a
+    per-process epoch) as ETags. Everything runs on the event loop; the reads
+    go through Persistence.
+    """
+
+    def __init__(self, costs: CostModel):
+        self.costs = costs
+        # versions restart with the process; the epoch keeps old ETags from matching
+        self.epoch = uuid4().hex[:8]
+        self.primes_version = 0
+        self.blocks_version = 0
+        self._primes: dict[int, dict[str, Any]] = {}
+        self._blocks: dict[int, dict[str, Any]] = {}
+        self._work: dict[int, list[dict[str, Any]]] = {}
+        self._dirty: set[int] = set()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def touch(self, block_id: int) -> None:
+        """Mark a block's committed state as changed (call on the loop)."""
+        self._dirty.add(int(block_id))
+
+    async def refresh(self, store) -> None:
+        """Re-read touched blocks (everything on first use)."""
+        if self._loaded and not self._dirty:
+            return
+        async with self._lock:
+            if self._loaded and not self._dirty:
+                return
+            ids = None if not self._loaded else sorted(self._dirty)
+            self._dirty = set()
+            blocks, primes, work = await store.read(self._read, ids)
+            self._apply(ids, blocks, primes, work)
+            self._loaded = True
+
+    def _read(self, conn, ids: list[int] | None):
+        # worker thread: one pass over the touched blocks (or all of them)
+        self.costs.refresh(conn)
+        if ids is None:
+            blocks = dao.block_list(conn, limit=-1)  # SQLite: no limit
+            primes = dao.primes_in_blocks(conn)
+            work_ids = [int(b["id"]) for b in blocks]
+        else:
+            blocks = [b for b in (dao.block_get(conn, bid) for bid in ids) if b]
+            primes = dao.primes_in_blocks(conn, ids)
+            work_ids = ids
+        work = dao.exponents_remaining_work(
+            conn, work_ids, self.costs.batch_max_p, self.costs.ibdwt_min_p
+        )
+        return blocks, primes, work
+
+    def _apply(self, ids, blocks, primes, work) -> None:
+        before = dict(self._primes)
+        blocks_before = dict(self._blocks)
+        work_before = dict(self._work)
+        if ids is None:
+            self._primes.clear()
+            self._work.clear()
+        else:
+            touched = set(ids)
+            for bid in touched:
+                self._work.pop(bid, None)
+            self._primes = {
+                p: r for p, r in self._primes.items() if r["block_id"] not in touched
+            }
+        for b in blocks:
+            self._blocks[int(b["id"])] = dict(b)
+        for r in primes:
+            p = int(r["p"])
+            bid = r["block_id"]
+            # tolerate NULL block_id from older rows; derive from p
+            row = dict(r, block_id=int(bid) if bid is not None else p // 1_000_000)
+            self._primes[p] = row
+        for r in work:
+            self._work.setdefault(int(r["block_id"]), []).append(dict(r))
+        if self._primes != before:
+            self.primes_version += 1
+        # a touch is only a hint: unchanged rows keep the ETag (and the 304s)
+        if self._blocks != blocks_before or self._work != work_before:
+            self.blocks_version += 1
+
+    def etag(self, kind: str, version: int, *extra: str) -> str:
+        return "-".join((kind, self.epoch, str(version), *extra))
+
+    # ---- snapshots -----------------------------------------------------------
+
+    def primes(self, limit: int) -> list[dict[str, Any]]:
+        """Newest verified primes first (unknown finish times last), like dao.primes_recent."""
+        rows = sorted(
+            self._primes.values(),
+            key=lambda r: (r["finished_at"] is None, -(r["finished_at"] or 0)),
+        )
+        return rows[: max(0, int(limit))]
+
+    def primes_count(self) -> int:
+        return len(self._primes)
+
+    def blocks(self, limit: int) -> list[dict[str, Any]]:
+        """The first `limit` blocks rows by id, like dao.block_list."""
+        return [self._blocks[bid] for bid in sorted(self._blocks)[: max(0, int(limit))]]
+
+    def remaining_work(self, block_ids) -> list[dict[str, Any]]:
+        """Cached dao.exponents_remaining_work rows for these blocks."""
+        return [
+            r for bid in sorted(set(block_ids)) for r in self._work.get(int(bid), [])
+        ]
+
+
+def conditional(req: Request, etag: str, body: Any) -> Response:
+    """
+    `body` as JSON with a weak ETag, or an empty 304 if the client's
+    If-None-Match already names it.
+    """
+    tag = f'W/"{etag}"'
+    seen = req.headers.get("if-none-match", "")
+    if any(t.strip() in (tag, tag[2:], "*") for t in seen.split(",") if t.strip()):
+        return Response(status_code=304, headers={"ETag": tag})
+    return JSONResponse(body, headers={"ETag": tag})
+
+
+def digest(obj: Any) -> str:
+    """Short stable hash of a JSON-able value, for ETags of derived data."""
+    return format(zlib.crc32(json.dumps(obj, sort_keys=True).encode()), "08x")
@@ -0,0 +1,322 @@
+# api/app/services/scheduler.py
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+log = logging.getLogger("scheduler")
+
+
+def default_worker_count() -> int:
+    """Workers = CPUs this process may run on (override with LL_WORKERS)."""
+    env = os.getenv("LL_WORKERS", "").strip()
+    if env.isdigit() and int(env) > 0:
+        return int(env)
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def _pin_enabled() -> bool:
+    return os.getenv("LL_PIN_WORKERS", "1").lower() not in ("0", "false", "no")
+
+
+def default_cost(p: int) -> float:
+    """Relative cost of testing exponent p (only the ordering matters)."""
+    return float(p)
+
+
+@dataclass
+class _BlockWork:
+    block_id: int
+    fn: Callable[[int], None]
+    max_parallel: int  # 0 => no per-block cap
+    on_drained: Callable[[], None] | None
+    priority: int = 0  # higher runs first
+    # heap of (cost, seq, p): the block's cheapest exponent is pending[0]
+    pending: list[tuple[float, int, int]] = field(default_factory=list)
+    running: int = 0
+    cancelled: bool = False
+    # on_drained is running; a submit() for the block from it starts the
+    # next stage in this entry's place
+    draining: bool = False
+
+    def head_key(self) -> tuple[int, float, int]:
+        cost, seq, _p = self.pending[0]
+        return (-self.priority, cost, seq)
+
+
+@dataclass
+class _Slot:
+    worker: int
+    cpu: int | None
+    block_id: int | None = None
+    p: int | None = None
+    started_at: float | None = None
+    pct: int = 0
+
+
+class WorkerPool:
+    """
+    Fixed set of OS threads running exponent jobs (llcore releases the GIL, so
+    they run truly in parallel), one per CPU and optionally pinned to it.
+
+    Blocks submit a list of exponents plus a blocking `fn(p)`; a block's
+    `on_drained` may submit its next stage, which takes over the block's
+    entry without it ever leaving the pool. All pending
+    exponents form one global queue ordered by (block priority, estimated
+    cost, submission order): an idle worker always takes the best exponent
+    of any block, so cheap work is not stuck behind another block's backlog.
+    `max_parallel` caps how many workers a single block may hold at once;
+    workers it turns away take the next best item from the other blocks.
+    """
+
+    def __init__(self, workers: int | None = None, pin: bool | None = None):
+        self.size = int(workers or default_worker_count())
+        self.pin = _pin_enabled() if pin is None else bool(pin)
+        self._cv = threading.Condition()
+        self._blocks: OrderedDict[int, _BlockWork] = OrderedDict()
+        self._seq = itertools.count()
+        self._stopping = False
+        self._local = threading.local()
+        cpus = self._cpus()
+        self._slots = [
+            _Slot(worker=i, cpu=(cpus[i % len(cpus)] if cpus else None))
+            for i in range(self.size)
+        ]
+        self._threads: list[threading.Thread] = []
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        for slot in self._slots:
+            t = threading.Thread(
+                target=self._run,
+                args=(slot,),
+                name=f"ll-worker-{slot.worker}",
+                daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+        log.info("worker pool started: %d workers, pinned=%s", self.size, self.pin)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop handing out work; running jobs see should_stop() and unwind."""
+        with self._cv:
+            self._stopping = True
+            for bw in self._blocks.values():
+                bw.pending.clear()
+            self._cv.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    # ---- submission / cancel ----------------------------------------------
+
+    def submit(
+        self,
+        block_id: int,
+        items: Iterable[int],
+        fn: Callable[[int], None],
+        *,
+        max_parallel: int = 0,
+        on_drained: Callable[[], None] | None = None,
+        priority: int = 0,
+        cost: Callable[[int], float] = default_cost,
+    ) -> int:
+        """
+        Queue exponents for a block. `cost(p)` orders them (cheapest first)
+        within a `priority` level. `on_drained` runs (on a worker thread)
+        once the block has no pending or running exponents left, including
+        after cancel(); the block stays scheduled until it returns, and a
+        submit() for the same block from it queues the next stage (cancelled
+        at once if the block was). Returns the number of newly queued
+        exponents.
+        """
+        block_id = int(block_id)
+        with self._cv:
+            current = self._blocks.get(block_id)
+            if current is not None and not current.draining:
+                raise RuntimeError(f"block {block_id} is already scheduled")
+            bw = _BlockWork(
+                block_id,
+                fn,
+                max(0, int(max_parallel)),
+                on_drained,
+                priority=int(priority),
+            )
+            bw.cancelled = current is not None and current.cancelled
+            if not bw.cancelled:
+                bw.pending = [
+                    (float(cost(int(p))), next(self._seq), int(p)) for p in items
+                ]
+                heapq.heapify(bw.pending)
+            self._blocks[block_id] = bw
+            self._cv.notify_all()
+            n = len(bw.pending)
+        if n == 0:
+            self._finish_block(block_id)
+        return n
+
+    def cancel(self, block_id: int) -> int:
+        """Drop a block's pending exponents; returns how many were dropped."""
+        drained = False
+        with self._cv:
+            bw = self._blocks.get(int(block_id))
+            if bw is None:
+                return 0
+            bw.cancelled = True
+            dropped = len(bw.pending)
+            bw.pending.clear()
+            drained = bw.running == 0
+        if drained:
+            self._finish_block(int(block_id))
+        return dropped
+
+    def is_scheduled(self, block_id: int) -> bool:
+        with self._cv:
+            return int(block_id) in self._blocks
+
+    def should_stop(self, block_id: int) -> bool:
+        """True if the block was cancelled or the pool is shutting down."""
+        bw = self._blocks.get(int(block_id))
+        return self._stopping or (bw is not None and bw.cancelled)
+
+    # ---- live view ---------------------------------------------------------
+
+    def report_progress(self, pct: int) -> None:
+        """Record progress for the job running on the calling worker thread."""
+        slot = getattr(self._local, "slot", None)
+        if slot is not None:
+            slot.pct = int(pct)
+
+    def update_progress(self, block_id: int, p: int, pct: int) -> None:
+        """Record progress for (block, p) from any thread, e.g. a poller."""
+        with self._cv:
+            for slot in self._slots:
+                if slot.block_id == int(block_id) and slot.p == int(p):
+                    slot.pct = int(pct)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.time()
+        with self._cv:
+            workers = [
+                {
+                    "worker": s.worker,
+                    "cpu": s.cpu if self.pin else None,
+                    "block_id": s.block_id,
+                    "p": s.p,
+                    "pct": s.pct if s.p is not None else None,
+                    "running_s": (
+                        round(now - s.started_at, 1) if s.started_at else None
+                    ),
+                }
+                for s in self._slots
+            ]
+            blocks = [
+                {
+                    "block_id": bw.block_id,
+                    "pending": len(bw.pending),
+                    "running": bw.running,
+                    "max_parallel": bw.max_parallel,
+                    "priority": bw.priority,
+                    "next_p": bw.pending[0][2] if bw.pending else None,
+                    "cancelled": bw.cancelled,
+                }
+                for bw in self._blocks.values()
+            ]
+        return {
+            "size": self.size,
+            "pinned": self.pin,
+            "workers": workers,
+            "blocks": blocks,
+        }
+
+    # ---- internals ---------------------------------------------------------
+
+    def _cpus(self) -> list[int]:
+        if hasattr(os, "sched_getaffinity"):
+            return sorted(os.sched_getaffinity(0))
+        return []
+
+    def _pin(self, slot: _Slot) -> None:
+        if not self.pin or slot.cpu is None or not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            # pid 0 => the calling thread on Linux
+            os.sched_setaffinity(0, {slot.cpu})
+        except OSError as e:
+            log.warning("cannot pin worker %d to cpu %d: %s", slot.worker, slot.cpu, e)
+
+    def _take(self) -> tuple[_BlockWork, int] | None:
+        """Globally best (block, p) a worker may run now; caller holds the lock."""
+        best: _BlockWork | None = None
+        for bw in self._blocks.values():
+            if not bw.pending:
+                continue
+            if bw.max_parallel and bw.running >= bw.max_parallel:
+                continue
+            if best is None or bw.head_key() < best.head_key():
+                best = bw
+        if best is None:
+            return None
+        best.running += 1
+        return best, heapq.heappop(best.pending)[2]
+
+    def _run(self, slot: _Slot) -> None:
+        self._pin(slot)
+        self._local.slot = slot
+        while True:
+            with self._cv:
+                job = self._take()
+                while job is None and not self._stopping:
+                    self._cv.wait()
+                    job = self._take()
+                if job is None:
+                    return
+                bw, p = job
+                slot.block_id, slot.p, slot.pct = bw.block_id, p, 0
+                slot.started_at = time.time()
+            try:
+                bw.fn(p)
+            except Exception:
+                log.exception("job failed: block=%s p=%s", bw.block_id, p)
+            finally:
+                with self._cv:
+                    slot.block_id = slot.p = slot.started_at = None
+                    slot.pct = 0
+                    bw.running -= 1
+                    drained = not bw.pending and bw.running == 0
+                    # a freed per-block slot may unblock a waiting worker
+                    self._cv.notify_all()
+                if drained:
+                    self._finish_block(bw.block_id)
+
+    def _finish_block(self, block_id: int) -> None:
+        with self._cv:
+            bw = self._blocks.get(block_id)
+            if bw is None or bw.pending or bw.running or bw.draining:
+                return
+            bw.draining = True
+        try:
+            if bw.on_drained is not None:
+                bw.on_drained()
+        except Exception:
+            log.exception("on_drained failed for block %s", block_id)
+        finally:
+            with self._cv:
+                # unless on_drained queued a next stage in its place
+                if self._blocks.get(block_id) is bw:
+                    del self._blocks[block_id]
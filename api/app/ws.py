@@ -1,11 +1,14 @@
 # api/app/ws.py
 from __future__ import annotations
-import os
+
 import asyncio
-import time
+import json
 import logging
-from typing import Any, Dict, Set, cast
+import os
+import time
+from typing import Any, cast
 from urllib.parse import urlparse
+
 from fastapi import APIRouter, WebSocket
 from starlette.websockets import WebSocketDisconnect, WebSocketState
 
@@ -25,7 +28,7 @@ DEFAULT_ALLOWED = {
     "https://127.0.0.1:5173",
 }
 _env = os.getenv("WS_ALLOWED_ORIGINS", "").strip()
-ALLOWED_WS_ORIGINS: Set[str] = (
+ALLOWED_WS_ORIGINS: set[str] = (
     {"*"}
     if _env == "*"
     else {x.strip() for x in _env.split(",") if x.strip()} or DEFAULT_ALLOWED
@@ -34,7 +37,15 @@ ALLOWED_WS_ORIGINS: Set[str] = (
 STRICT = os.getenv("WS_ORIGIN_STRICT", "0").lower() in ("1", "true", "yes")
 DISABLE = os.getenv("WS_DISABLE_ORIGIN_CHECK", "").lower() in ("1", "true", "yes")
 
-QueueT = asyncio.Queue[dict[str, Any] | None]
+# Subscriber queues carry JSON frames, serialized once per frame for all
+# subscribers of a topic; None tells the socket to close.
+QueueT = asyncio.Queue[str | None]
+
+# Coalesced updates go out at most this many times per second per topic.
+FRAME_HZ = float(os.getenv("WS_FRAME_HZ", "10") or 10)
+# Frames buffered per subscriber; a client that falls further behind loses
+# its oldest frames (later frames carry the latest coverage anyway).
+SUBSCRIBER_BACKLOG = 64
 
 
 def _ensure_ws_state(app):
@@ -46,17 +57,17 @@ def _ensure_ws_state(app):
     if not hasattr(s, "block_cancel"):
         s.block_cancel = set()
     return (
-        cast(Dict[int, Set[QueueT]], s.block_topics),
-        cast(Dict[str, Set[QueueT]], s.job_topics),
-        cast(Set[int], s.block_cancel),
+        cast(dict[int, set[QueueT]], s.block_topics),
+        cast(dict[str, set[QueueT]], s.job_topics),
+        cast(set[int], s.block_cancel),
     )
 
 
-def _topic_add(m: Dict[Any, Set[QueueT]], k: Any, q: QueueT):
+def _topic_add(m: dict[Any, set[QueueT]], k: Any, q: QueueT):
     m.setdefault(k, set()).add(q)
 
 
-def _topic_discard(m: Dict[Any, Set[QueueT]], k: Any, q: QueueT):
+def _topic_discard(m: dict[Any, set[QueueT]], k: Any, q: QueueT):
     s = m.get(k)
     if s:
         s.discard(q)
@@ -95,6 +106,117 @@ def _origin_allowed(ws: WebSocket) -> bool:
     return False
 
 
+class _TopicState:
+    __slots__ = ("closing", "fields", "progress")
+
+    def __init__(self):
+        self.progress: dict[int, tuple[int, str]] = {}  # p -> (pct, stage)
+        self.fields: dict[str, Any] = {}  # latest tested/total/last_p/done/...
+        self.closing = False
+
+
+def _offer(q: QueueT, frame: str | None) -> None:
+    """Enqueue without blocking; a full queue sheds its oldest frame."""
+    while True:
+        try:
+            q.put_nowait(frame)
+            return
+        except asyncio.QueueFull:
+            try:
+                q.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+
+
+class Broadcaster:
+    """
+    Per-topic coalescing fan-out. publish() only merges a message into the
+    topic's pending state (latest pct per exponent, latest coverage fields);
+    every 1/FRAME_HZ seconds each changed topic becomes one frame
+
+      {"block_id": 0, "progress": [[p, pct, stage], ...],
+       "tested": ..., "total": ..., "last_p": ..., "done": ..., "stopped": ...}
+
+    (keys present only when they changed), serialized once and queued to
+    every subscriber. Cost per tick is bounded by the number of changed
+    exponents and subscribers, not by the update rate. Call from the loop.
+    """
+
+    def __init__(
+        self,
+        topics: dict[Any, set[QueueT]],
+        key: str = "block_id",
+        hz: float = FRAME_HZ,
+    ):
+        self.topics = topics
+        self.key = key
+        self.interval = 1.0 / max(0.1, float(hz))
+        self._pending: dict[Any, _TopicState] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def publish(self, topic: Any, msg: dict[str, Any]) -> None:
+        """Merge an update ({p, pct, stage} and/or coverage fields) into the next frame."""
+        if topic not in self.topics:
+            return  # nobody listening
+        st = self._pending.get(topic)
+        if st is None:
+            st = self._pending[topic] = _TopicState()
+        for k, v in msg.items():
+            if k in ("p", "pct", "stage", self.key):
+                continue
+            st.fields[k] = v
+        if msg.get("p") is not None and msg.get("pct") is not None:
+            st.progress[int(msg["p"])] = (int(msg["pct"]), str(msg.get("stage", "ll")))
+
+    def close(self, topic: Any) -> None:
+        """Send what is pending for the topic, then close its sockets."""
+        if topic not in self.topics:
+            return
+        self._pending.setdefault(topic, _TopicState()).closing = True
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        for topic, st in pending.items():
+            subs = list(self.topics.get(topic, ()))
+            if not subs:
+                continue
+            frame = None
+            if st.progress or st.fields:
+                body: dict[str, Any] = {self.key: topic}
+                if st.progress:
+                    body["progress"] = [
+                        [p, pct, stage] for p, (pct, stage) in st.progress.items()
+                    ]
+                body.update(st.fields)
+                frame = json.dumps(body, separators=(",", ":"))
+            for q in subs:
+                if frame is not None:
+                    _offer(q, frame)
+                if st.closing:
+                    _offer(q, None)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception("WS broadcast flush failed")
+
+
 async def _serve_queue(ws: WebSocket, q: QueueT) -> None:
     ping = asyncio.create_task(_pinger(ws))
     try:
@@ -102,7 +224,7 @@ async def _serve_queue(ws: WebSocket, q: QueueT) -> None:
             msg = await q.get()
             if msg is None:
                 break
-            await ws.send_json(msg)
+            await ws.send_text(msg)
     except WebSocketDisconnect:
         log.info("WS client disconnected")
     except Exception:
@@ -135,7 +257,7 @@ async def ws_block(ws: WebSocket, block_id: int):
     await ws.accept()
     log.info("WS accepted blocks/%s from %r", block_id, ws.headers.get("origin"))
     block_topics, _, _ = _ensure_ws_state(ws.app)
-    q: QueueT = asyncio.Queue(maxsize=256)
+    q: QueueT = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG)
     _topic_add(block_topics, int(block_id), q)
     try:
         await _serve_queue(ws, q)
@@ -143,6 +265,14 @@ async def ws_block(ws: WebSocket, block_id: int):
         _topic_discard(block_topics, int(block_id), q)
 
 
+def publish_job(app, job_id: str, frame: dict[str, Any] | None) -> None:
+    """Send a frame to an LL job's subscribers, or close them with None (call on the loop)."""
+    _, job_topics, _ = _ensure_ws_state(app)
+    data = None if frame is None else json.dumps(frame)
+    for q in list(job_topics.get(job_id, ())):
+        _offer(q, data)
+
+
 @router.websocket("/ws/jobs/{job_id}")
 async def ws_job(ws: WebSocket, job_id: str):
     if not _origin_allowed(ws):
@@ -152,8 +282,10 @@ async def ws_job(ws: WebSocket, job_id: str):
     await ws.accept()
     log.info("WS accepted jobs/%s from %r", job_id, ws.headers.get("origin"))
     _, job_topics, _ = _ensure_ws_state(ws.app)
-    q: QueueT = asyncio.Queue(maxsize=256)
+    q: QueueT = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG)
     _topic_add(job_topics, job_id, q)
+    if ws.app.state.ll_jobs.get(job_id) is None:
+        _offer(q, None)  # finished (or unknown): nothing more will be sent
     try:
         await _serve_queue(ws, q)
     finally:
@@ -3,13 +3,24 @@
 #include <pybind11/pytypes.h>
 #include <pybind11/stl.h>
 #include <cstdint>
+#include <memory>
 #include <optional>
 #include <string>
 #include <stdexcept>
 #include <gmp.h>
 #include <cstdio>
+#include <cstring>
+#include <vector>
 
+#include "ll/checkpoint.hpp"
+#include "ll/decimal.hpp"
+#include "ll/factor.hpp"
+#include "ll/hash.hpp"
 #include "ll/ll.hpp"
+#include "ll/prime.hpp"
+#include "ll/progress.hpp"
+#include "ll/proof.hpp"
+#include "ll/prp.hpp"
 
 namespace py = pybind11;
 
@@ -17,11 +28,27 @@ static py::bytes digest_to_bytes(const ll::ResidueDigest& d) {
   return py::bytes(reinterpret_cast<const char*>(d.bytes.data()), d.bytes.size());
 }
 
-static py::dict ll_test_py(std::uint32_t p,
-                           std::uint32_t progress_stride = 0,
-                           std::optional<py::function> callback = std::nullopt) {
+static py::bytes limbs_to_bytes(const std::vector<std::uint64_t>& limbs) {
+  return py::bytes(reinterpret_cast<const char*>(limbs.data()),
+                   limbs.size() * sizeof(std::uint64_t));
+}
+
+static py::dict run_ll_py(bool resume,
+                          std::uint32_t p,
+                          std::uint32_t progress_stride,
+                          std::optional<py::function> callback,
+                          const std::string& engine,
+                          std::optional<std::string> checkpoint_path,
+                          std::uint32_t checkpoint_secs,
+                          std::shared_ptr<ll::Progress> progress,
+                          std::shared_ptr<ll::CancelToken> cancel) {
 
   ll::LLConfig cfg{p, /*enable_progress=*/callback.has_value(), progress_stride};
+  cfg.engine = ll::engine_from_string(engine);  // ValueError on unknown name
+  cfg.checkpoint_path = checkpoint_path.value_or("");
+  cfg.checkpoint_secs = checkpoint_secs;
+  cfg.progress = progress.get();  // kept alive by the caller's reference
+  cfg.cancel = cancel.get();
 
   // Prepare C++ progress callback that reacquires the GIL when invoked.
   ll::ProgressCb cb_cpp;
@@ -37,7 +64,7 @@ static py::dict ll_test_py(std::uint32_t p,
   ll::LLResult res;
   {
     py::gil_scoped_release nogil;
-    res = ll::ll_test(cfg, cb_cpp);
+    res = resume ? ll::ll_resume(cfg, cb_cpp) : ll::ll_test(cfg, cb_cpp);
   }
 
   // Return a small, JSON-friendly dict
@@ -48,39 +75,307 @@ static py::dict ll_test_py(std::uint32_t p,
   out["ns_elapsed"] = py::int_(res.ns_elapsed);
   out["final_residue_is_zero"] = res.final_residue_is_zero;
   out["engine_info"] = res.engine_info;
+  out["resumed_from"] = py::int_(res.resumed_from);
+  out["completed"] = py::int_(res.completed);
+  out["cancelled"] = res.cancelled;
+  out["residue"] = res.cancelled ? py::object(limbs_to_bytes(res.residue))
+                                 : py::object(py::none());
   return out;
 }
 
-static py::dict write_mersenne_decimal_py(std::uint32_t p, const std::string& path) {
-  if (p < 1) throw std::invalid_argument("p must be >= 1");
+static py::dict ll_test_py(std::uint32_t p,
+                           std::uint32_t progress_stride = 0,
+                           std::optional<py::function> callback = std::nullopt,
+                           const std::string& engine = "auto",
+                           std::optional<std::string> checkpoint_path = std::nullopt,
+                           std::uint32_t checkpoint_secs = 60,
+                           std::shared_ptr<ll::Progress> progress = nullptr,
+                           std::shared_ptr<ll::CancelToken> cancel = nullptr) {
+  return run_ll_py(false, p, progress_stride, std::move(callback), engine,
+                   std::move(checkpoint_path), checkpoint_secs, std::move(progress),
+                   std::move(cancel));
+}
+
+static py::dict ll_resume_py(std::uint32_t p,
+                             const std::string& checkpoint_path,
+                             std::uint32_t progress_stride = 0,
+                             std::optional<py::function> callback = std::nullopt,
+                             const std::string& engine = "auto",
+                             std::uint32_t checkpoint_secs = 60,
+                             std::shared_ptr<ll::Progress> progress = nullptr,
+                             std::shared_ptr<ll::CancelToken> cancel = nullptr) {
+  return run_ll_py(true, p, progress_stride, std::move(callback), engine,
+                   checkpoint_path, checkpoint_secs, std::move(progress),
+                   std::move(cancel));
+}
 
-  mpz_t M; mpz_init2(M, p + 1);
-  mpz_set_ui(M, 1); mpz_mul_2exp(M, M, p); mpz_sub_ui(M, M, 1);
+static py::object read_checkpoint_py(const std::string& path) {
+  std::optional<ll::Checkpoint> ck;
+  {
+    py::gil_scoped_release nogil;
+    ck = ll::load_checkpoint(path);
+  }
+  if (!ck) return py::none();
+  const auto d = ll::make_residue_digest(ck->limbs.data(),
+                                         ck->limbs.size() * sizeof(std::uint64_t));
+  py::dict out;
+  out["p"] = ck->p;
+  out["iteration"] = ck->iteration;
+  out["digest"] = digest_to_bytes(d);
+  return out;
+}
+
+static py::dict ll_test_many_py(std::vector<std::uint32_t> ps, unsigned threads,
+                                const std::string& engine,
+                                std::shared_ptr<ll::CancelToken> cancel) {
+  ll::LLBatchConfig cfg;
+  cfg.threads = threads;
+  cfg.engine = ll::engine_from_string(engine);
+  cfg.cancel = cancel.get();
+  ll::LLBatchResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::ll_test_many(ps, cfg);
+  }
+  py::dict out;
+  out["p"] = std::move(res.p);
+  out["is_prime"] = py::bytes(reinterpret_cast<const char*>(res.is_prime.data()), res.is_prime.size());
+  out["done"] = py::bytes(reinterpret_cast<const char*>(res.done.data()), res.done.size());
+  out["ns_elapsed"] = std::move(res.ns_elapsed);
+  out["ns_total"] = py::int_(res.ns_total);
+  out["engine_info"] = res.engine_info;
+  return out;
+}
 
-  std::FILE* f = std::fopen(path.c_str(), "wb");
-  if (!f) { mpz_clear(M); throw std::runtime_error("cannot open output file"); }
+static void save_checkpoint_py(const std::string& path, std::uint32_t p,
+                               std::uint32_t iteration, const py::bytes& residue) {
+  const std::string raw = residue;
+  if (raw.size() % sizeof(std::uint64_t) != 0)
+    throw std::invalid_argument("residue must be a whole number of 64-bit limbs");
+  ll::Checkpoint ck{p, iteration, std::vector<std::uint64_t>(raw.size() / sizeof(std::uint64_t))};
+  std::memcpy(ck.limbs.data(), raw.data(), raw.size());
+  py::gil_scoped_release nogil;
+  ll::save_checkpoint(path, ck);
+}
 
-  size_t written = mpz_out_str(f, 10, M);   // exact digits written
-  std::fputc('\n', f);
-  std::fclose(f);
-  mpz_clear(M);
-  if (written == 0) throw std::runtime_error("mpz_out_str failed");
+static py::dict trial_factor_py(std::uint32_t p, unsigned max_bits = 0,
+                                unsigned min_bits = 0) {
+  ll::TFResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::trial_factor(ll::TFConfig{p, min_bits, max_bits});
+  }
+  py::dict out;
+  out["p"] = res.p;
+  out["factor"] = res.factor ? py::object(py::int_(res.factor)) : py::object(py::none());
+  out["k"] = py::int_(res.k);
+  out["bits"] = res.bits;
+  out["tested"] = py::int_(res.tested);
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
+  return out;
+}
 
+static py::dict prescreen_py(std::vector<std::uint32_t> ps, std::uint32_t max_k) {
+  ll::PrescreenResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::prescreen(ps, max_k);
+  }
+  py::dict out;
+  out["p"] = std::move(res.p);
+  out["factor"] = std::move(res.factor);
+  out["k"] = std::move(res.k);
+  out["rule"] = py::bytes(reinterpret_cast<const char*>(res.rule.data()), res.rule.size());
+  out["tested"] = py::int_(res.tested);
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
+  return out;
+}
+
+static py::dict time_squarings_py(std::uint32_t p, std::uint32_t iterations,
+                                  const std::string& engine = "auto") {
+  const ll::Engine e = ll::engine_from_string(engine);
+  ll::SquareTiming t;
+  {
+    py::gil_scoped_release nogil;
+    t = ll::time_squarings(p, iterations, e);
+  }
+  py::dict out;
+  out["p"] = p;
+  out["iterations"] = iterations;
+  out["ns"] = py::int_(t.ns);
+  out["ns_per_iter"] = iterations ? static_cast<double>(t.ns) / iterations : 0.0;
+  out["engine_info"] = t.engine_info;
+  return out;
+}
+
+static py::dict prp_test_py(std::uint32_t p, const std::string& engine = "auto",
+                            std::uint32_t block = 0, std::uint32_t check_every = 0,
+                            std::shared_ptr<ll::CancelToken> cancel = nullptr,
+                            std::shared_ptr<ll::Progress> progress = nullptr,
+                            std::uint32_t inject_error_at = 0,
+                            std::uint32_t proof_power = 0,
+                            std::optional<std::string> proof_path = std::nullopt) {
+  ll::PRPConfig cfg{p};
+  cfg.engine = ll::engine_from_string(engine);
+  cfg.block = block;
+  cfg.check_every = check_every;
+  cfg.cancel = cancel.get();
+  cfg.progress = progress.get();
+  cfg.inject_error_at = inject_error_at;
+  cfg.proof_power = proof_power;
+  cfg.proof_path = proof_path.value_or("");
+  ll::PRPResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::prp_test(cfg);
+  }
+  char hex[17];
+  std::snprintf(hex, sizeof hex, "%016llx", static_cast<unsigned long long>(res.res64));
+  py::dict out;
+  out["p"] = res.p;
+  out["is_probable_prime"] = res.is_probable_prime;
+  out["iterations"] = py::int_(res.iterations);
+  out["res64"] = std::string(hex);
+  out["block"] = res.block;
+  out["gerbicz_checks"] = res.gerbicz_checks;
+  out["rollbacks"] = res.rollbacks;
+  out["cancelled"] = res.cancelled;
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
+  out["engine_info"] = res.engine_info;
+  out["proof_power"] = res.proof_power;
+  out["proof_bytes"] = py::int_(res.proof_bytes);
+  out["proof_ns"] = py::int_(res.proof_ns);
+  return out;
+}
+
+static py::dict verify_prp_proof_py(const std::string& path) {
+  ll::ProofVerifyResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::verify_prp_proof(path);
+  }
+  char hex[17];
+  std::snprintf(hex, sizeof hex, "%016llx", static_cast<unsigned long long>(res.res64));
+  py::dict out;
+  out["p"] = res.p;
+  out["power"] = res.power;
+  out["valid"] = res.valid;
+  out["is_probable_prime"] = res.is_probable_prime;
+  out["res64"] = std::string(hex);
+  out["squarings"] = py::int_(res.squarings);
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
+  return out;
+}
+
+static py::dict pm1_default_bounds_py(std::uint32_t p, unsigned tf_bits = 0) {
+  const auto b = ll::pm1_default_bounds(p, tf_bits);
+  py::dict out;
+  out["b1"] = py::int_(b.b1);
+  out["b2"] = py::int_(b.b2);
+  out["probability"] = b.probability;
+  return out;
+}
+
+static py::dict pm1_factor_py(std::uint32_t p, std::uint64_t b1 = 0,
+                              std::uint64_t b2 = 0,
+                              std::optional<py::function> callback = std::nullopt) {
+  ll::PM1ProgressCb cb_cpp;
+  if (callback.has_value()) {
+    py::function fn = *callback;
+    cb_cpp = [fn = std::move(fn)](unsigned stage, double fraction) {
+      py::gil_scoped_acquire gil;
+      fn(stage, fraction);
+    };
+  }
+  ll::PM1Result res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::pm1_factor(ll::PM1Config{p, b1, b2}, cb_cpp);
+  }
+  py::dict out;
+  out["p"] = res.p;
+  out["b1"] = py::int_(res.b1);
+  out["b2"] = py::int_(res.b2);
+  out["factor"] = res.factor.empty()
+                      ? py::object(py::none())
+                      : py::object(py::int_(py::str(res.factor)));
+  out["stage"] = res.stage;
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
+  return out;
+}
+
+static py::dict write_mersenne_decimal_py(std::uint32_t p, const std::string& path,
+                                          std::optional<py::function> callback = std::nullopt,
+                                          std::uint64_t memory_limit = 0) {
+  ll::DecimalProgressCb cb_cpp;
+  if (callback.has_value()) {
+    py::function fn = *callback;
+    cb_cpp = [fn = std::move(fn)](std::uint64_t done, std::uint64_t total) {
+      py::gil_scoped_acquire gil;
+      fn(done, total);
+    };
+  }
+  ll::DecimalExportResult res;
+  {
+    py::gil_scoped_release nogil;
+    res = ll::write_mersenne_decimal(ll::DecimalExportConfig{p, path, memory_limit}, cb_cpp);
+  }
   py::dict out;
   out["p"] = p;
   out["path"] = path;
-  out["digits"] = py::int_(written);        // use written (exact)
-  out["written_digits"] = py::int_(written);
+  out["digits"] = py::int_(res.digits);
+  out["written_digits"] = py::int_(res.digits);
+  out["bytes"] = py::int_(res.bytes);
+  out["sha256"] = ll::to_hex(res.sha256);
+  out["memory"] = py::int_(res.memory);
+  out["ns_elapsed"] = py::int_(res.ns_elapsed);
   return out;
 }
 
 PYBIND11_MODULE(llcore, m) {
   m.doc() = "Lucas-Lehmer core (pybind11)";
 
+  py::class_<ll::Progress, std::shared_ptr<ll::Progress>>(m, "Progress", R"pbdoc(
+Lock-free progress channel for one ll_test/ll_resume run. Poll it from any
+thread while the run holds no GIL; nothing calls back into Python.
+)pbdoc")
+      .def(py::init<>())
+      .def_property_readonly("iteration", &ll::Progress::iteration,
+                             "Iterations completed so far.")
+      .def_property_readonly("total", &ll::Progress::total,
+                             "Total iterations (p - 2) once the run has started.")
+      .def_property_readonly("cancel_requested", &ll::Progress::cancel_requested)
+      .def_property_readonly("digest_seq", &ll::Progress::digest_seq,
+                             "Bumped each time a new digest is published.")
+      .def("cancel", &ll::Progress::cancel,
+           "Stop the run at the next iteration (it checkpoints, then raises RuntimeError('cancelled')).")
+      .def("request_digest", &ll::Progress::request_digest,
+           "Ask the run to publish a digest of the current residue.")
+      .def("digest", [](const ll::Progress& pr) -> py::object {
+             auto d = pr.digest();
+             if (!d) return py::none();
+             return py::make_tuple(d->iteration, digest_to_bytes(d->digest));
+           },
+           "Latest (iteration, digest bytes) published on request or at a checkpoint, or None.");
+
+  py::class_<ll::CancelToken, std::shared_ptr<ll::CancelToken>>(m, "CancelToken", R"pbdoc(
+Stop handle for ll_test/ll_resume. cancel() may be called from any thread;
+the run notices within one iteration. One token may be shared by many runs.
+)pbdoc")
+      .def(py::init<>())
+      .def("cancel", &ll::CancelToken::cancel)
+      .def("reset", &ll::CancelToken::reset)
+      .def_property_readonly("cancelled", &ll::CancelToken::cancelled);
+
   m.def("ll_test", &ll_test_py,
       py::arg("p"),
       py::arg("progress_stride") = 0,         // 0 => auto (~1% of p-2)
       py::arg("callback") = py::none(),
+      py::arg("engine") = "auto",
+      py::arg("checkpoint_path") = py::none(),
+      py::arg("checkpoint_secs") = 60,
+      py::arg("progress") = py::none(),
+      py::arg("cancel") = py::none(),
       R"pbdoc(
 Run the Lucas–Lehmer test for M_p = 2^p - 1.
 
@@ -88,12 +383,200 @@ Args:
   p (int): prime exponent p >= 2.
   progress_stride (int): 0 for auto (~1% of (p−2)); otherwise invoke the callback every N iterations.
   callback (callable): optional function (iter:int, digest:bytes) -> None.
+  engine (str): "auto" (default), "gmp", "ibdwt" or "mpn". "auto" uses the
+    IBDWT (FFT) engine from p >= ibdwt_min_exponent() and GMP below it;
+    "mpn" is the limb-level GMP path (mpn_sqr + fused fold).
+  checkpoint_path (str): optional file for residue checkpoints, written every
+    `checkpoint_secs` and when the callback raises (cooperative cancel).
+  progress (Progress): optional polling channel; lets callers watch the
+    iteration count, fetch digests on demand and cancel without a callback.
+  cancel (CancelToken): optional stop handle, checked every iteration. A
+    cancelled run returns normally with cancelled=True (after writing its
+    checkpoint, if any) instead of raising.
+
+Returns:
+  dict { p, is_prime, iterations, ns_elapsed, final_residue_is_zero, engine_info,
+         resumed_from, completed, cancelled, residue }.
+  `completed` counts squarings done; when cancelled, `residue` holds the
+  state at that point as little-endian 64-bit limbs (see save_checkpoint).
+)pbdoc");
+
+  m.def("ll_resume", &ll_resume_py,
+      py::arg("p"),
+      py::arg("checkpoint_path"),
+      py::arg("progress_stride") = 0,
+      py::arg("callback") = py::none(),
+      py::arg("engine") = "auto",
+      py::arg("checkpoint_secs") = 60,
+      py::arg("progress") = py::none(),
+      py::arg("cancel") = py::none(),
+      R"pbdoc(
+Like ll_test, but continue from `checkpoint_path` if it holds a checkpoint
+for p (a missing file starts from s = 4) and keep checkpointing to it.
+Raises RuntimeError if the checkpoint is corrupt or for another exponent.
+`ns_elapsed` covers only this run; `resumed_from` is the restored iteration.
+)pbdoc");
+
+  m.def("ll_test_many", &ll_test_many_py,
+      py::arg("ps"),
+      py::arg("threads") = 1,
+      py::arg("engine") = "auto",
+      py::arg("cancel") = py::none(),
+      R"pbdoc(
+LL-test a list of exponents in one native call (no callbacks, digests or
+checkpoints; buffers are reused across exponents). Meant for sweeping many
+small exponents, where per-call overhead would dominate.
+
+Args:
+  ps (list[int]): prime exponents (ValueError otherwise).
+  threads (int): native threads to spread the list over; 0 = all CPUs.
+  cancel (CancelToken): optional; exponents not reached stay done == 0.
+
+Returns:
+  Columnar dict { p: list[int], is_prime: bytes, done: bytes,
+  ns_elapsed: list[int], ns_total, engine_info }; entry k belongs to ps[k]
+  (is_prime[k] / done[k] are 0 or 1).
+)pbdoc");
+
+  m.def("save_checkpoint", &save_checkpoint_py,
+        py::arg("path"), py::arg("p"), py::arg("iteration"), py::arg("residue"),
+        R"pbdoc(Write a checkpoint from the partial state of a cancelled run (its `completed` and `residue`).)pbdoc");
+
+  m.def("read_checkpoint", &read_checkpoint_py, py::arg("path"),
+        R"pbdoc(Validate a checkpoint file: None if missing, else { p, iteration, digest }; RuntimeError if corrupt.)pbdoc");
+
+  m.def("primes_in_range",
+        [](std::uint64_t a, std::uint64_t b) {
+          std::vector<std::uint32_t> ps;
+          {
+            py::gil_scoped_release nogil;
+            ps = ll::primes_in_range(a, b);
+          }
+          return ps;
+        },
+        py::arg("a"), py::arg("b"),
+        R"pbdoc(All primes in [a, b) as a sorted list (segmented wheel sieve; b <= 2^32, else ValueError).)pbdoc");
+
+  m.def("time_squarings", &time_squarings_py,
+        py::arg("p"), py::arg("iterations"), py::arg("engine") = "auto",
+        R"pbdoc(Time `iterations` bare LL steps (square, subtract 2, reduce mod M_p) on one
+engine; returns {p, iterations, ns, ns_per_iter, engine_info}. For benchmarks.)pbdoc");
+
+  m.def("ibdwt_min_exponent", &ll::ibdwt_min_exponent,
+        R"pbdoc(Smallest p for which engine="auto" selects the IBDWT engine.)pbdoc");
+
+  m.def("trial_factor", &trial_factor_py,
+        py::arg("p"), py::arg("max_bits") = 0, py::arg("min_bits") = 0,
+        R"pbdoc(
+Search for a factor q = 2kp + 1 of M_p with 2^min_bits <= q < 2^max_bits
+(max_bits = 0 => tf_default_bits(p); at most 63).
+
+Returns:
+  dict { p, factor (int | None, smallest in range), k, bits, tested, ns_elapsed }.
+)pbdoc");
+
+  m.def("prescreen", &prescreen_py,
+        py::arg("ps"), py::arg("max_k") = ll::kPrescreenDefaultMaxK,
+        R"pbdoc(
+Cheap factor certificates for a whole list of prime exponents in one call:
+Euler's rule (p = 3 mod 4 and 2p + 1 prime => 2p + 1 divides M_p) and every
+q = 2kp + 1 with k <= max_k. Candidates are tested several at a time in
+interleaved Montgomery chains.
 
 Returns:
-  dict { p, is_prime, iterations, ns_elapsed, final_residue_is_zero, engine_info }.
+  dict { p (list), factor (list, 0 = none), k (list), rule (bytes: 0 none,
+  1 euler, 2 small factor), tested, ns_elapsed }. Each factor is the
+  smallest q = 2kp + 1 that divides M_p in range.
+)pbdoc");
+
+  m.def("tf_default_bits", &ll::tf_default_bits, py::arg("p"),
+        R"pbdoc(Trial-factoring depth (bits) worth searching before an LL test of p.)pbdoc");
+
+  m.def("pm1_default_bounds", &pm1_default_bounds_py,
+        py::arg("p"), py::arg("tf_bits") = 0,
+        R"pbdoc(Auto P-1 bounds for p given trial factoring to 2^tf_bits: { b1, b2, probability }; b1 == 0 means not worth running.)pbdoc");
+
+  m.def("pm1_factor", &pm1_factor_py,
+        py::arg("p"), py::arg("b1") = 0, py::arg("b2") = 0,
+        py::arg("callback") = py::none(),
+        R"pbdoc(
+Pollard P-1 on M_p with stage 1 bound b1 and stage 2 bound b2 (b1 = 0 =>
+pm1_default_bounds(p); b2 <= b1 => stage 1 only).
+
+Args:
+  callback (callable): optional (stage:int, fraction:float) -> None; raise to cancel.
+
+Returns:
+  dict { p, b1, b2, factor (int | None), stage, ns_elapsed }.
+)pbdoc");
+
+  m.def("prp_test", &prp_test_py,
+        py::arg("p"), py::arg("engine") = "auto", py::arg("block") = 0,
+        py::arg("check_every") = 0, py::arg("cancel") = py::none(),
+        py::arg("progress") = py::none(), py::arg("inject_error_at") = 0,
+        py::arg("proof_power") = 0, py::arg("proof_path") = py::none(),
+        R"pbdoc(
+Base-3 Fermat PRP test of M_p with Gerbicz error checking: arithmetic errors
+are detected and the run rolls back to the last verified state, so a
+composite result needs no double-check. Probable primes should still be
+confirmed with ll_test.
+
+Args:
+  block (int): Gerbicz block length L (0 = auto).
+  check_every (int): squarings between checks (0 = auto).
+  cancel (CancelToken): optional; a cancelled run returns cancelled=True.
+  progress (Progress): optional; only its iteration counter is updated.
+  inject_error_at (int): testing aid, corrupts the residue once after that iteration.
+  proof_power (int): write a Pietrzak proof of this power (1..12, see
+    proof_default_power); 0 = no proof.
+  proof_path (str): where the proof goes; 2^proof_power residues are kept in
+    `proof_path + ".points"` while the test runs.
+
+Returns:
+  dict { p, is_probable_prime, iterations, res64 (hex of 3^(2^p) mod M_p),
+         block, gerbicz_checks, rollbacks, cancelled, ns_elapsed, engine_info,
+         proof_power, proof_bytes, proof_ns }.
+Raises RuntimeError if checks keep failing from the same verified state.
+)pbdoc");
+
+  m.def("proof_default_power", &ll::proof_default_power, py::arg("p"),
+        R"pbdoc(Proof power for prp_test(p) that keeps verification cheapest.
+
+0 = no proof: below p ~ 1.64M, verifying would cost over 1% of the test.)pbdoc");
+
+  m.def("verify_prp_proof", &verify_prp_proof_py, py::arg("path"),
+        R"pbdoc(
+Check a PRP proof written by prp_test, in about p / 2^power squarings.
+
+Returns:
+  dict { p, power, valid, is_probable_prime, res64, squarings, ns_elapsed };
+  is_probable_prime and res64 are only meaningful when valid.
+Raises RuntimeError if the file is unreadable, truncated or corrupt.
 )pbdoc");
 
   m.def("write_mersenne_decimal", &write_mersenne_decimal_py,
-        py::arg("p"), py::arg("path"),
-        R"pbdoc(Write M_p = 2^p - 1 to `path` in base-10; returns metadata.)pbdoc");
+        py::arg("p"), py::arg("path"), py::arg("callback") = py::none(),
+        py::arg("memory_limit") = 0,
+        R"pbdoc(
+Write M_p = 2^p - 1 to `path` in base 10 (plus a newline). Divide-and-conquer
+conversion streamed through a fixed buffer and hashed on the way out, so the
+file is written in one pass and never re-read.
+
+Args:
+  callback (callable): optional (digits_written:int, total_digits:int) -> None,
+    called about once per MiB; raise to cancel (the partial file is removed).
+  memory_limit (int): bytes of working memory allowed; 0 = no ceiling. An
+    export whose estimate (decimal_export_memory) is larger raises ValueError
+    before anything is allocated.
+
+Returns:
+  dict { p, path, digits, written_digits, bytes, sha256 (hex of the file),
+  memory, ns_elapsed }.
+)pbdoc");
+
+  m.def("decimal_export_memory", &ll::decimal_export_memory, py::arg("p"),
+        R"pbdoc(Estimated peak working memory (bytes) of write_mersenne_decimal(p).)pbdoc");
+
+  m.def("mersenne_decimal_digits", &ll::mersenne_decimal_digits, py::arg("p"),
+        R"pbdoc(Number of decimal digits of M_p.)pbdoc");
 }
@@ -7,9 +7,10 @@
 #include <chrono>
 
 int main(int argc, char** argv) {
-  // Flags: --bench=N (repeat), --stride=K, --no-progress
+  // Flags: --bench=N (repeat), --stride=K, --no-progress, --engine=NAME
   unsigned repeats = 1, stride = 0;   // 0 = auto (~1%)
   bool enable_progress = true;
+  ll::Engine engine = ll::Engine::Auto;
   std::vector<std::uint32_t> exps;
 
   for (int i = 1; i < argc; ++i) {
@@ -18,6 +19,9 @@ int main(int argc, char** argv) {
       repeats = std::stoul(a.substr(8));
     } else if (a.rfind("--stride=", 0) == 0) {
       stride = std::stoul(a.substr(9));
+    } else if (a.rfind("--engine=", 0) == 0) {
+      try { engine = ll::engine_from_string(a.substr(9)); }
+      catch (const std::exception& e) { std::cerr << e.what() << "\n"; return 2; }
     } else if (a == "--no-progress") {
       enable_progress = false;
     } else {
@@ -46,7 +50,7 @@ int main(int argc, char** argv) {
 
     std::uint64_t best = UINT64_MAX, sum = 0;
     for (unsigned r = 0; r < repeats; ++r) {
-      ll::LLConfig cfg{p, enable_progress, stride};
+      ll::LLConfig cfg{p, enable_progress, stride, engine};
       auto t0 = std::chrono::steady_clock::now();
       auto res = ll::ll_test(cfg, enable_progress ? progress : ll::ProgressCb{});
       auto t1 = std::chrono::steady_clock::now();
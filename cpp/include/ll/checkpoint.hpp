@@ -0,0 +1,29 @@
+// include/ll/checkpoint.hpp
+#pragma once
+#include <cstdint>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace ll {
+
+// LL state after `iteration` completed squarings: s_iteration mod M_p.
+struct Checkpoint {
+  std::uint32_t p = 0;
+  std::uint32_t iteration = 0;      // next iteration index to run (0..p-2)
+  std::vector<std::uint64_t> limbs; // residue, least significant limb first
+};
+
+// On-disk layout (little-endian):
+//   "LLCKPT01" | p:u32 | iteration:u32 | nlimbs:u32 | reserved:u32
+//   | limbs:u64[nlimbs] | sha256(all preceding bytes)
+// Written to `path + ".tmp"` and renamed over `path`, so a crash mid-write
+// leaves the previous checkpoint intact.
+// Throws std::runtime_error on I/O failure.
+void save_checkpoint(const std::string &path, const Checkpoint &ck);
+
+// std::nullopt if `path` does not exist. Throws std::runtime_error if the
+// file is truncated, has a bad magic or fails its checksum.
+std::optional<Checkpoint> load_checkpoint(const std::string &path);
+
+} // namespace ll
@@ -0,0 +1,54 @@
+// include/ll/decimal.hpp
+#pragma once
+#include "ll.hpp" // for ll::ResidueDigest
+#include <cstdint>
+#include <functional>
+#include <string>
+
+namespace ll {
+
+// ---- Decimal export ---------------------------------------------------------
+// M_p = 2^p - 1 in base 10, streamed to a file. The number is split top-down
+// by the powers 10^(L 2^i), so the work is a tree of GMP divisions
+// (subquadratic) instead of one mpz_get_str on the whole value. Leaves of L
+// digits come out in order and go through a fixed write buffer; each buffer
+// that reaches the file also feeds a running SHA-256, so the file is written
+// and hashed in a single pass and the full decimal string never exists in
+// memory. Divided values and powers are freed as soon as the traversal is past
+// them. The file ends with a newline, which is included in the digest.
+
+struct DecimalExportConfig {
+  std::uint32_t p;                // exponent >= 1 (need not be prime)
+  std::string path;               // created or truncated
+  std::uint64_t memory_limit = 0; // bytes of working memory; 0 = no ceiling
+};
+
+struct DecimalExportResult {
+  std::uint32_t p = 0;
+  std::uint64_t digits = 0;
+  std::uint64_t bytes = 0;  // file size (digits + newline)
+  ResidueDigest sha256;     // of the file contents
+  std::uint64_t memory = 0; // decimal_export_memory(p)
+  std::uint64_t ns_elapsed = 0;
+};
+
+// Progress: (digits written, total digits), called after each flushed write
+// buffer and once at the end. May throw to cancel the export.
+using DecimalProgressCb = std::function<void(std::uint64_t, std::uint64_t)>;
+
+// Number of decimal digits of M_p.
+std::uint64_t mersenne_decimal_digits(std::uint32_t p) noexcept;
+
+// Upper estimate of the peak working memory (bytes) of an export of M_p:
+// the value, the table of powers, one level of quotient/remainder and the
+// write buffer.
+std::uint64_t decimal_export_memory(std::uint32_t p) noexcept;
+
+// Throws std::invalid_argument if p == 0, std::length_error if
+// decimal_export_memory(p) exceeds a non-zero memory_limit (before any
+// allocation) and std::runtime_error on I/O errors. On any error, including
+// one thrown by the callback, the partial file is removed.
+DecimalExportResult write_mersenne_decimal(const DecimalExportConfig &cfg,
+                                           DecimalProgressCb cb = {});
+
+} // namespace ll
@@ -0,0 +1,111 @@
+// include/ll/factor.hpp
+#pragma once
+#include <cstdint>
+#include <functional>
+#include <string>
+#include <vector>
+
+namespace ll {
+
+// ---- Trial factoring -------------------------------------------------------
+// Any factor q of M_p (p an odd prime) has the form q = 2kp + 1 with
+// q = +-1 (mod 8). Candidates are sieved by small primes and the survivors
+// tested by checking 2^p = 1 (mod q).
+
+// Deepest supported search: q < 2^63 (64-bit Montgomery arithmetic).
+inline constexpr unsigned kTrialFactorMaxBits = 63;
+
+struct TFConfig {
+  std::uint32_t p;       // exponent (prime)
+  unsigned min_bits = 0; // skip q < 2^min_bits (already searched)
+  unsigned max_bits = 0; // search q < 2^max_bits; 0 = tf_default_bits(p)
+};
+
+struct TFResult {
+  std::uint32_t p = 0;
+  std::uint64_t factor = 0;     // smallest factor found in range (0 = none)
+  std::uint64_t k = 0;          // factor = 2kp + 1
+  unsigned bits = 0;            // all q < 2^bits searched (or up to factor)
+  std::uint64_t tested = 0;     // candidates surviving the sieve
+  std::uint64_t ns_elapsed = 0; // wall-clock nanoseconds
+};
+
+// Depth at which one more bit level stops paying for itself: the cost of
+// searching [2^(b-1), 2^b) is kept below the ~1/b chance of a factor there
+// times the cost of the LL test it would save.
+unsigned tf_default_bits(std::uint32_t p) noexcept;
+
+// Throws std::invalid_argument if p is not an odd prime or max_bits > 63.
+TFResult trial_factor(const TFConfig &cfg);
+
+// ---- Pre-screen -------------------------------------------------------------
+// Cheap certificates checked over a whole list of exponents before anything is
+// queued. Euler: for p = 3 (mod 4), p > 3, q = 2p + 1 divides M_p exactly when
+// q is prime (any prime factor r of q has 2 of order p mod r, so r >= 2p + 1),
+// which the divisibility test itself decides. Then every q = 2kp + 1 with
+// k <= max_k, q = +-1 (mod 8) and no prime factor below 64 is tried.
+// Candidates are tested kPrescreenLanes at a time in lockstep, so the
+// independent Montgomery chains overlap instead of waiting on each other.
+
+inline constexpr unsigned kPrescreenLanes = 8;
+inline constexpr std::uint32_t kPrescreenDefaultMaxK = 64;
+
+enum class PrescreenRule : std::uint8_t {
+  None = 0,        // no certificate found
+  Euler = 1,       // p = 3 (mod 4) and 2p + 1 prime
+  SmallFactor = 2, // some q = 2kp + 1, 1 < k <= max_k
+};
+
+// Columnar, entry i belongs to ps[i]. factor = 2 k p + 1 (0 = none).
+struct PrescreenResult {
+  std::vector<std::uint32_t> p;
+  std::vector<std::uint64_t> factor;
+  std::vector<std::uint32_t> k;
+  std::vector<std::uint8_t> rule; // PrescreenRule
+  std::uint64_t tested = 0;       // candidates that reached the 2^p test
+  std::uint64_t ns_elapsed = 0;
+};
+
+// Throws std::invalid_argument (before any work) if some p is not prime.
+// p = 2 and exponents whose M_p is below every candidate q are passed through.
+PrescreenResult prescreen(const std::vector<std::uint32_t> &ps,
+                          std::uint32_t max_k = kPrescreenDefaultMaxK);
+
+// ---- Pollard P-1 ------------------------------------------------------------
+// Stage 1 computes x = 3^(2p * prod q^e) mod M_p over prime powers q^e <= B1;
+// stage 2 covers one extra prime B1 < q <= B2. Any prime factor f with f - 1
+// smooth to those bounds divides gcd(x - 1, M_p) (resp. the stage 2 product).
+
+struct PM1Bounds {
+  std::uint64_t b1 = 0;     // 0 => P-1 is not worth running for this p
+  std::uint64_t b2 = 0;     // <= b1 => stage 1 only
+  double probability = 0.0; // estimated chance of finding a factor
+};
+
+// Bounds maximising (chance of a factor) x (LL time saved) - (P-1 time),
+// given trial factoring to 2^tf_bits (0 => tf_default_bits(p)). Uses the
+// Dickman rho estimate for the smoothness of (f - 1) / 2p.
+PM1Bounds pm1_default_bounds(std::uint32_t p, unsigned tf_bits = 0) noexcept;
+
+struct PM1Config {
+  std::uint32_t p;      // exponent (prime)
+  std::uint64_t b1 = 0; // 0 => pm1_default_bounds(p)
+  std::uint64_t b2 = 0; // <= b1 => no stage 2 (ignored when b1 == 0)
+};
+
+struct PM1Result {
+  std::uint32_t p = 0;
+  std::uint64_t b1 = 0, b2 = 0; // bounds actually used
+  std::string factor;           // proper factor in decimal ("" if none)
+  unsigned stage = 0;           // stage that found it (0 = none)
+  std::uint64_t ns_elapsed = 0;
+};
+
+// Progress: stage (1 or 2) and fraction of that stage done. May throw to
+// cancel the run (the exception propagates out of pm1_factor).
+using PM1ProgressCb = std::function<void(unsigned, double)>;
+
+// Throws std::invalid_argument if p is not an odd prime.
+PM1Result pm1_factor(const PM1Config &cfg, PM1ProgressCb cb = {});
+
+} // namespace ll
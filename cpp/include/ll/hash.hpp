@@ -18,6 +18,21 @@ ResidueDigest make_residue_digest(const void *data,
 ResidueDigest make_residue_digest(const std::string &s) noexcept;
 ResidueDigest make_residue_digest(const std::vector<std::uint8_t> &v) noexcept;
 
+// Incremental SHA-256 over data that arrives in pieces (e.g. a file being
+// streamed out); make_residue_digest is the one-shot form. finish() once.
+class Sha256 {
+public:
+  Sha256() noexcept;
+  void update(const void *data, std::size_t len) noexcept;
+  ResidueDigest finish() noexcept;
+
+private:
+  std::uint32_t h_[8];
+  unsigned char buf_[64];
+  std::size_t buffered_ = 0;
+  std::uint64_t total_ = 0;
+};
+
 // Hex encoding for logs and debugging.
 std::string to_hex(const ResidueDigest &d);
 
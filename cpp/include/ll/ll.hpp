@@ -1,9 +1,11 @@
 // include/ll/ll.hpp
 #pragma once
 #include <array>
+#include <atomic>
 #include <cstdint>
 #include <functional>
 #include <string>
+#include <vector>
 
 namespace ll {
 
@@ -15,11 +17,54 @@ struct ResidueDigest {
   std::array<std::uint8_t, 32> bytes{}; // 256-bit
 };
 
+class Progress; // see ll/progress.hpp
+
+// Stop handle shared with a running test. ll_test checks it with one relaxed
+// load per iteration, so a cancel takes effect within one squaring no matter
+// how sparse the progress stride is. Reusable after reset().
+class CancelToken {
+public:
+  void cancel() noexcept { flag_.store(true, std::memory_order_relaxed); }
+  void reset() noexcept { flag_.store(false, std::memory_order_relaxed); }
+  bool cancelled() const noexcept {
+    return flag_.load(std::memory_order_relaxed);
+  }
+
+private:
+  std::atomic<bool> flag_{false};
+};
+
+// Squaring engine used for the s <- s^2 - 2 (mod M_p) step.
+enum class Engine : std::uint8_t {
+  Auto,  // pick per exponent (IBDWT above ibdwt_min_exponent(), else GMP)
+  Gmp,   // mpz_mul + Mersenne fold (exact integer arithmetic)
+  Ibdwt, // irrational-base DWT: floating-point FFT, reduction is implicit
+  Mpn,   // mpn_sqr + fused limb-level fold and subtract (exact, no mpz)
+};
+
 // Optional knobs; keep minimal now for a clean API.
 struct LLConfig {
   std::uint32_t p;                   // exponent (assumed <= 2^32-1)
   bool enable_progress = true;       // allow callbacks
   std::uint32_t progress_stride = 0; // 0 = auto (~1% of total)
+  Engine engine = Engine::Auto;      // squaring engine
+
+  // Residue checkpoints (disabled when checkpoint_path is empty). A checkpoint
+  // is written every checkpoint_secs of wall time and when the progress
+  // callback throws (cooperative cancel), so an interrupted run can continue
+  // via ll_resume().
+  std::string checkpoint_path;
+  std::uint32_t checkpoint_secs = 60;
+
+  // Optional polling channel (not owned): iteration counter, digests on
+  // request, and cancel. A cancelled run writes its checkpoint (if any) and
+  // throws std::runtime_error("cancelled").
+  Progress *progress = nullptr;
+
+  // Optional stop handle (not owned). Unlike the two mechanisms above, a
+  // cancelled run does not throw: it checkpoints (if enabled) and returns
+  // a partial LLResult with cancelled = true.
+  const CancelToken *cancel = nullptr;
 };
 
 // Result summary; no internal types leaked.
@@ -29,15 +74,75 @@ struct LLResult {
   std::uint64_t iterations = 0;       // should equal (p >= 2 ? p - 2 : 0)
   std::uint64_t ns_elapsed = 0;       // wall-clock nanoseconds (best effort)
   bool final_residue_is_zero = false; // sanity flag for LL correctness
-  std::string engine_info; // e.g., "gmp:6.3.0; fft:toom/fft; cpu:apple-m1"
+  std::uint64_t resumed_from = 0;     // iterations restored from a checkpoint
+  std::uint64_t completed = 0;        // squarings done when the run ended
+
+  // Set when the run stopped on cfg.cancel: is_prime is meaningless and
+  // `residue` holds s_completed mod M_p (least significant limb first), i.e.
+  // Checkpoint{p, completed, residue} continues the run via ll_resume().
+  bool cancelled = false;
+  std::vector<std::uint64_t> residue;
+  std::string engine_info; // e.g., "ibdwt:n=2^16,bpw=19.07; gcc:13.2.0; ..."
 };
 
 // Progress callback: iteration index (0..p-3) and a residue digest.
 using ProgressCb = std::function<void(std::uint32_t, const ResidueDigest &)>;
 
+// Smallest exponent for which Engine::Auto selects the IBDWT engine.
+std::uint32_t ibdwt_min_exponent() noexcept;
+
+// Parse/format engine names ("auto" | "gmp" | "ibdwt" | "mpn").
+// Throws std::invalid_argument on an unknown name.
+Engine engine_from_string(const std::string &name);
+const char *engine_name(Engine e) noexcept;
+
+// Benchmark aid: time `iterations` bare LL steps (s <- s^2 - 2 mod M_p) on
+// one engine, without progress, cancel or checkpoint work. The clock starts
+// once the residue has grown to full size (~log2 p untimed steps from 4).
+// Throws std::invalid_argument if p is not an odd prime.
+struct SquareTiming {
+  std::uint64_t ns = 0;    // wall-clock nanoseconds for the loop
+  std::string engine_info; // engine that ran, as in LLResult::engine_info
+};
+SquareTiming time_squarings(std::uint32_t p, std::uint32_t iterations,
+                            Engine engine = Engine::Auto);
+
 // Single entrypoint: runs the Lucas–Lehmer test for M_p = 2^p - 1.
 // Throws std::invalid_argument if p < 2 or p is not prime (exponent must be
 // prime).
 LLResult ll_test(const LLConfig &cfg, ProgressCb cb = {});
 
+// Like ll_test, but continues from cfg.checkpoint_path when it holds a valid
+// checkpoint for cfg.p (starts from s = 4 when the file does not exist).
+// ns_elapsed only covers the resumed segment. Throws std::runtime_error if
+// the checkpoint is corrupt or belongs to another exponent.
+LLResult ll_resume(const LLConfig &cfg, ProgressCb cb = {});
+
+// ---- Batches of small exponents ----------------------------------------
+
+struct LLBatchConfig {
+  unsigned threads = 1;         // native threads; 0 = hardware concurrency
+  Engine engine = Engine::Auto; // as LLConfig::engine
+  // not owned; unfinished entries stay done = 0
+  const CancelToken *cancel = nullptr;
+};
+
+// Columnar result of ll_test_many: entry k belongs to ps[k].
+struct LLBatchResult {
+  std::vector<std::uint32_t> p;
+  std::vector<std::uint8_t> is_prime;
+  std::vector<std::uint8_t> done;        // 0 if skipped because of cancel
+  std::vector<std::uint64_t> ns_elapsed; // per exponent
+  std::uint64_t ns_total = 0;            // wall clock for the whole batch
+  std::string engine_info;               // engines used; compiler; flags
+};
+
+// LL-test many exponents in one call. Per-exponent overhead is kept to the
+// squarings: GMP-sized exponents share buffers allocated once per thread,
+// and no progress, digests or checkpoints are involved. Exponents are
+// handed out largest first so threads finish together.
+// Throws std::invalid_argument (before any work) if some p is not prime.
+LLBatchResult ll_test_many(const std::vector<std::uint32_t> &ps,
+                           const LLBatchConfig &cfg = {});
+
 } // namespace ll
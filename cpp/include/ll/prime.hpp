@@ -1,6 +1,7 @@
 // include/ll/prime.hpp
 #pragma once
 #include <cstdint>
+#include <vector>
 
 namespace ll {
 
@@ -9,4 +10,10 @@ namespace ll {
 // with a fixed small base set valid for 32/64-bit integers.
 bool is_prime_exponent(std::uint32_t p) noexcept;
 
+// All primes in [a, b), ascending. Segmented odd-only sieve with a 3..13
+// wheel pattern and a cached table of base primes below 2^16, so any window
+// of 32-bit numbers costs about as much as its length.
+// Throws std::invalid_argument if b > 2^32.
+std::vector<std::uint32_t> primes_in_range(std::uint64_t a, std::uint64_t b);
+
 } // namespace ll
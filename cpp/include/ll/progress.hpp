@@ -0,0 +1,81 @@
+// include/ll/progress.hpp
+#pragma once
+#include "ll.hpp"
+
+#include <atomic>
+#include <cstdint>
+#include <mutex>
+#include <optional>
+
+namespace ll {
+
+// Shared progress channel for one run: the LL loop publishes its iteration
+// count with a relaxed store and checks pending requests with one relaxed
+// load per iteration, so observers (e.g. a Python poller) never stall it.
+// Residue digests are only computed when requested or at checkpoints.
+class Progress {
+public:
+  static constexpr std::uint32_t kCancel = 1u << 0;
+  static constexpr std::uint32_t kDigest = 1u << 1;
+
+  struct Digest {
+    std::uint32_t iteration = 0; // iterations completed when taken
+    ResidueDigest digest;
+  };
+
+  // ---- observer side (any thread) ----
+  std::uint32_t iteration() const noexcept {
+    return iteration_.load(std::memory_order_relaxed);
+  }
+  std::uint32_t total() const noexcept {
+    return total_.load(std::memory_order_relaxed);
+  }
+  void cancel() noexcept {
+    requests_.fetch_or(kCancel, std::memory_order_relaxed);
+  }
+  bool cancel_requested() const noexcept {
+    return requests_.load(std::memory_order_relaxed) & kCancel;
+  }
+  // Ask the running loop for a digest of the current residue.
+  void request_digest() noexcept {
+    requests_.fetch_or(kDigest, std::memory_order_relaxed);
+  }
+  // Latest published digest, if any; `seq` increases with every publish.
+  std::optional<Digest> digest() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return digest_;
+  }
+  std::uint64_t digest_seq() const noexcept {
+    return seq_.load(std::memory_order_acquire);
+  }
+
+  // ---- runner side ----
+  void start(std::uint32_t first, std::uint32_t total) noexcept {
+    total_.store(total, std::memory_order_relaxed);
+    iteration_.store(first, std::memory_order_relaxed);
+  }
+  void set_iteration(std::uint32_t i) noexcept {
+    iteration_.store(i, std::memory_order_relaxed);
+  }
+  std::uint32_t pending() const noexcept {
+    return requests_.load(std::memory_order_relaxed);
+  }
+  void publish_digest(std::uint32_t iteration, const ResidueDigest &d) {
+    {
+      std::lock_guard<std::mutex> lock(mu_);
+      digest_ = Digest{iteration, d};
+    }
+    requests_.fetch_and(~kDigest, std::memory_order_relaxed);
+    seq_.fetch_add(1, std::memory_order_release);
+  }
+
+private:
+  std::atomic<std::uint32_t> iteration_{0};
+  std::atomic<std::uint32_t> total_{0};
+  std::atomic<std::uint32_t> requests_{0};
+  std::atomic<std::uint64_t> seq_{0};
+  mutable std::mutex mu_;
+  std::optional<Digest> digest_;
+};
+
+} // namespace ll
@@ -0,0 +1,66 @@
+// include/ll/prp.hpp
+#pragma once
+#include "ll.hpp"
+
+#include <cstdint>
+#include <string>
+
+namespace ll {
+
+// ---- Base-3 Fermat PRP with Gerbicz error checking --------------------------
+// M_p is a base-3 probable prime iff 3^(M_p - 1) = 1 (mod M_p), i.e. iff
+// x_p = 3^(2^p) = 9 (mod M_p); x_i = 3^(2^i) takes p plain squarings.
+//
+// Gerbicz check: every `block` squarings the residue is multiplied into a
+// running product d = x_0 * x_L * x_2L * ..., which satisfies
+//   d_(k+1) = x_0 * d_k^(2^L).
+// Recomputing the right-hand side costs L squarings and catches (with
+// overwhelming probability) any arithmetic error in all the x_jL since the
+// last verified state; on a mismatch the run rolls back to that state.
+// A composite verdict from a checked run is therefore as trustworthy as a
+// matched LL double-check.
+
+struct PRPConfig {
+  std::uint32_t p;                     // exponent (prime)
+  Engine engine = Engine::Auto;        // as LLConfig::engine
+  std::uint32_t block = 0;             // L; 0 = auto (~sqrt(p)/2, 16..1000)
+  std::uint32_t check_every = 0;       // squarings between checks (multiple
+                                       // of L); 0 = auto (<= L^2, >= 8 checks)
+  const CancelToken *cancel = nullptr; // not owned
+  Progress *progress = nullptr;        // not owned; only the iteration
+                                       // counter is used (no digests/cancel)
+  // Testing aid: perturb the residue once, right after this iteration, to
+  // exercise the rollback path (0 = never).
+  std::uint32_t inject_error_at = 0;
+  // Pietrzak proof (ll/proof.hpp): power k in 1..kMaxProofPower, 0 = none.
+  // The 2^k intermediate residues go to `proof_path + ".points"` during the
+  // run; the proof is written to `proof_path` at the end (not on cancel).
+  std::uint32_t proof_power = 0;
+  std::string proof_path;
+};
+
+struct PRPResult {
+  std::uint32_t p = 0;
+  bool is_probable_prime = false;
+  std::uint64_t iterations = 0;     // squarings done (p unless cancelled),
+                                    // not counting re-runs after rollback
+  std::uint64_t res64 = 0;          // low 64 bits of 3^(2^p) mod M_p
+  std::uint32_t block = 0;          // L actually used
+  std::uint32_t gerbicz_checks = 0; // passed checks
+  std::uint32_t rollbacks = 0;      // failed checks (each followed by a re-run)
+  bool cancelled = false;
+  std::uint64_t ns_elapsed = 0; // wall-clock nanoseconds, proof included
+  std::string engine_info;
+  std::uint32_t proof_power = 0; // 0 if no proof was written
+  std::uint64_t proof_bytes = 0;
+  std::uint64_t proof_ns = 0; // part of ns_elapsed spent building it
+};
+
+// Throws std::invalid_argument if p is not prime or the proof settings are
+// unusable (power out of range, p < 2^power, no path), and
+// std::runtime_error if the Gerbicz check keeps failing from the same
+// verified state (a persistent hardware or engine fault rather than a
+// transient error) or the proof files cannot be written.
+PRPResult prp_test(const PRPConfig &cfg);
+
+} // namespace ll
@@ -0,0 +1,104 @@
+// src/checkpoint.cpp
+#include "ll/checkpoint.hpp"
+#include "ll/hash.hpp"
+
+#include <cerrno>
+#include <cstdio>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace ll {
+namespace {
+
+inline constexpr char kMagic[8] = {'L', 'L', 'C', 'K', 'P', 'T', '0', '1'};
+inline constexpr std::size_t kHeaderBytes = 8 + 4 * 4;
+inline constexpr std::size_t kDigestBytes = 32;
+
+inline void put_le(std::vector<std::uint8_t> &buf, std::uint64_t v, int n) {
+  for (int i = 0; i < n; ++i)
+    buf.push_back(static_cast<std::uint8_t>(v >> (8 * i)));
+}
+inline std::uint64_t get_le(const std::uint8_t *p, int n) {
+  std::uint64_t v = 0;
+  for (int i = 0; i < n; ++i)
+    v |= static_cast<std::uint64_t>(p[i]) << (8 * i);
+  return v;
+}
+
+[[noreturn]] void fail(const std::string &what, const std::string &path) {
+  throw std::runtime_error("checkpoint " + what + ": " + path);
+}
+
+} // namespace
+
+void save_checkpoint(const std::string &path, const Checkpoint &ck) {
+  std::vector<std::uint8_t> buf;
+  buf.reserve(kHeaderBytes + 8 * ck.limbs.size() + kDigestBytes);
+  buf.insert(buf.end(), kMagic, kMagic + sizeof kMagic);
+  put_le(buf, ck.p, 4);
+  put_le(buf, ck.iteration, 4);
+  put_le(buf, ck.limbs.size(), 4);
+  put_le(buf, 0, 4);
+  for (std::uint64_t l : ck.limbs)
+    put_le(buf, l, 8);
+  const ResidueDigest d = make_residue_digest(buf.data(), buf.size());
+  buf.insert(buf.end(), d.bytes.begin(), d.bytes.end());
+
+  const std::string tmp = path + ".tmp";
+  std::FILE *f = std::fopen(tmp.c_str(), "wb");
+  if (!f)
+    fail(std::string("open failed (") + std::strerror(errno) + ")", tmp);
+  const bool ok = std::fwrite(buf.data(), 1, buf.size(), f) == buf.size() &&
+                  std::fflush(f) == 0;
+  if (std::fclose(f) != 0 || !ok) {
+    std::remove(tmp.c_str());
+    fail("write failed", tmp);
+  }
+  if (std::rename(tmp.c_str(), path.c_str()) != 0) {
+    std::remove(tmp.c_str());
+    fail("rename failed", path);
+  }
+}
+
+std::optional<Checkpoint> load_checkpoint(const std::string &path) {
+  std::FILE *f = std::fopen(path.c_str(), "rb");
+  if (!f) {
+    if (errno == ENOENT)
+      return std::nullopt;
+    fail(std::string("open failed (") + std::strerror(errno) + ")", path);
+  }
+  std::vector<std::uint8_t> buf;
+  std::uint8_t chunk[1 << 16];
+  std::size_t got;
+  while ((got = std::fread(chunk, 1, sizeof chunk, f)) > 0)
+    buf.insert(buf.end(), chunk, chunk + got);
+  const bool read_err = std::ferror(f) != 0;
+  std::fclose(f);
+  if (read_err)
+    fail("read failed", path);
+
+  if (buf.size() < kHeaderBytes + kDigestBytes ||
+      std::memcmp(buf.data(), kMagic, sizeof kMagic) != 0)
+    fail("bad header", path);
+
+  Checkpoint ck;
+  ck.p = static_cast<std::uint32_t>(get_le(buf.data() + 8, 4));
+  ck.iteration = static_cast<std::uint32_t>(get_le(buf.data() + 12, 4));
+  const std::uint64_t nlimbs = get_le(buf.data() + 16, 4);
+  if (buf.size() != kHeaderBytes + 8 * nlimbs + kDigestBytes)
+    fail("truncated", path);
+
+  const std::size_t body = buf.size() - kDigestBytes;
+  const ResidueDigest d = make_residue_digest(buf.data(), body);
+  if (std::memcmp(d.bytes.data(), buf.data() + body, kDigestBytes) != 0)
+    fail("checksum mismatch", path);
+
+  ck.limbs.resize(nlimbs);
+  for (std::size_t i = 0; i < nlimbs; ++i)
+    ck.limbs[i] = get_le(buf.data() + kHeaderBytes + 8 * i, 8);
+  return ck;
+}
+
+} // namespace ll
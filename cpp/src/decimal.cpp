@@ -0,0 +1,231 @@
+// src/decimal.cpp
+#include "ll/decimal.hpp"
+#include "engine.hpp" // ScopedMpz
+#include "ll/hash.hpp"
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstring>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace ll {
+namespace {
+
+// Leaves are converted by mpz_get_str; below ~10^4 digits its basecase is
+// as fast as anything, and a leaf that size keeps the tree shallow.
+inline constexpr std::uint64_t kLeafDigits = 1u << 14;
+inline constexpr std::size_t kWriteBuffer = 1u << 20;
+inline constexpr double kBitsPerDigit = 3.321928094887362; // log2(10)
+inline constexpr double kBitsPer5 = 2.321928094887362;     // log2(5)
+
+// Tree shape for D digits: depth k and leaf width L with L * 2^k >= D and
+// L <= kLeafDigits, so the top split is at about D/2 digits.
+struct Shape {
+  unsigned levels = 0;
+  std::uint64_t leaf = 1;
+};
+
+Shape shape_for(std::uint64_t digits) {
+  Shape s;
+  while ((kLeafDigits << s.levels) < digits)
+    ++s.levels;
+  s.leaf = (digits + (std::uint64_t{1} << s.levels) - 1) >> s.levels;
+  return s;
+}
+
+class Writer {
+public:
+  Writer(const std::string &path, std::uint64_t total,
+         const DecimalProgressCb &cb)
+      : path_(path), total_(total), cb_(cb) {
+    f_ = std::fopen(path.c_str(), "wb");
+    if (!f_)
+      throw std::runtime_error("cannot open output file: " + path);
+    buf_.reserve(kWriteBuffer);
+  }
+  ~Writer() {
+    if (f_) { // not committed: an error or a cancel unwound past us
+      std::fclose(f_);
+      std::remove(path_.c_str());
+    }
+  }
+  Writer(const Writer &) = delete;
+  Writer &operator=(const Writer &) = delete;
+
+  void put(const char *s, std::size_t n) {
+    digits_ += n;
+    while (n) {
+      const std::size_t take = std::min(n, kWriteBuffer - buf_.size());
+      buf_.insert(buf_.end(), s, s + take);
+      s += take;
+      n -= take;
+      if (buf_.size() == kWriteBuffer)
+        flush();
+    }
+  }
+  void zeros(std::size_t n) {
+    static const std::string z(256, '0');
+    for (; n >= z.size(); n -= z.size())
+      put(z.data(), z.size());
+    put(z.data(), n);
+  }
+
+  // Trailing newline, last flush, close. Returns the file digest.
+  ResidueDigest commit() {
+    buf_.push_back('\n'); // put() never leaves the buffer full
+    flush();
+    std::FILE *f = f_;
+    f_ = nullptr;
+    if (std::fclose(f) != 0) {
+      std::remove(path_.c_str());
+      throw std::runtime_error("cannot write output file: " + path_);
+    }
+    return sha_.finish();
+  }
+
+  std::uint64_t digits() const { return digits_; }
+  std::uint64_t bytes() const { return bytes_; }
+
+private:
+  void flush() {
+    if (buf_.empty())
+      return;
+    sha_.update(buf_.data(), buf_.size());
+    if (std::fwrite(buf_.data(), 1, buf_.size(), f_) != buf_.size())
+      throw std::runtime_error("cannot write output file: " + path_);
+    bytes_ += buf_.size();
+    buf_.clear();
+    if (cb_)
+      cb_(std::min(digits_, total_), total_);
+  }
+
+  std::string path_;
+  std::FILE *f_ = nullptr;
+  std::vector<char> buf_;
+  Sha256 sha_;
+  std::uint64_t digits_ = 0, bytes_ = 0, total_;
+  const DecimalProgressCb &cb_;
+};
+
+// Top-down conversion. A node at level j holds a value below 10^(L 2^(j+1))
+// and is split by 10^(L 2^j), with pow[j] = 5^(L 2^j); level -1 is a leaf of
+// at most L digits. Only the leading path omits zero padding.
+class Converter {
+public:
+  Converter(const Shape &shape, Writer &out) : shape_(shape), out_(out) {
+    leaf_buf_.resize(shape.leaf + 2);
+    for (unsigned j = 0; j < shape.levels; ++j) {
+      pow_.emplace_back(std::make_unique<ScopedMpz>(
+          static_cast<mp_bitcnt_t>(kBitsPer5 * double(shape.leaf << j)) + 64));
+      if (j == 0)
+        mpz_ui_pow_ui(*pow_[0], 5, shape.leaf);
+      else
+        mpz_mul(*pow_[j], *pow_[j - 1], *pow_[j - 1]);
+      uses_.push_back(std::uint64_t{1} << (shape.levels - 1 - j));
+    }
+  }
+
+  // Consumes x (its limbs are released once it has been split).
+  void emit(mpz_ptr x, int level, bool leading) {
+    if (level < 0)
+      return leaf(x, leading);
+    // 10^m = 5^m 2^m: shift the 2^m out first, so the division is by 5^m,
+    // about 30% shorter than 10^m.
+    const mp_bitcnt_t m = shape_.leaf << level;
+    ScopedMpz q(0), r(0);
+    mpz_tdiv_q_2exp(q, x, m);
+    if (leading && mpz_cmp(q, *pow_[level]) < 0) {
+      mpz_realloc2(q, 1);
+      return emit(x, level - 1, true);
+    }
+    mpz_tdiv_r_2exp(x, x, m); // x keeps the low m bits of the remainder
+    mpz_tdiv_qr(q, r, q, *pow_[level]);
+    mpz_mul_2exp(r, r, m);
+    mpz_ior(r, r, x);
+    mpz_realloc2(x, 1);
+    if (--uses_[level] == 0)
+      pow_[level].reset(); // the traversal is past every node of this level
+    emit(q, level - 1, leading);
+    mpz_realloc2(q, 1);
+    emit(r, level - 1, false);
+  }
+
+private:
+  void leaf(mpz_srcptr x, bool leading) {
+    mpz_get_str(leaf_buf_.data(), 10, x);
+    const std::size_t n = std::strlen(leaf_buf_.data());
+    if (!leading)
+      out_.zeros(shape_.leaf - n);
+    out_.put(leaf_buf_.data(), n);
+  }
+
+  Shape shape_;
+  Writer &out_;
+  std::vector<std::unique_ptr<ScopedMpz>> pow_;
+  std::vector<std::uint64_t> uses_;
+  std::vector<char> leaf_buf_;
+};
+
+} // namespace
+
+std::uint64_t mersenne_decimal_digits(std::uint32_t p) noexcept {
+  // 2^p - 1 has as many digits as 2^p (never a power of ten for p >= 1)
+  return static_cast<std::uint64_t>(std::floor(static_cast<long double>(p) *
+                                               0.30102999566398119521L)) +
+         1;
+}
+
+std::uint64_t decimal_export_memory(std::uint32_t p) noexcept {
+  const Shape s = shape_for(mersenne_decimal_digits(p));
+  const std::uint64_t value = (std::uint64_t{p} + 64) / 8;
+  // powers of 5: leaf * (2^k - 1) digits' worth, about 0.7 of the value
+  const double pow_bits =
+      kBitsPer5 * double(s.leaf) * double((std::uint64_t{1} << s.levels) - 1);
+  const std::uint64_t powers =
+      static_cast<std::uint64_t>(pow_bits / 8) + 64 * s.levels;
+  // the top split holds the value, its shifted copy, quotient, remainder
+  // and GMP's division scratch: measured at ~7 values including the powers
+  // (p = 7M .. 100M), so this errs a little high
+  return powers + 7 * value + kWriteBuffer + s.leaf + 2;
+}
+
+DecimalExportResult write_mersenne_decimal(const DecimalExportConfig &cfg,
+                                           DecimalProgressCb cb) {
+  if (cfg.p < 1)
+    throw std::invalid_argument("p must be >= 1");
+  DecimalExportResult out;
+  out.p = cfg.p;
+  out.memory = decimal_export_memory(cfg.p);
+  if (cfg.memory_limit && out.memory > cfg.memory_limit)
+    throw std::length_error(
+        "decimal export of M_" + std::to_string(cfg.p) + " needs ~" +
+        std::to_string(out.memory >> 20) + " MiB, over the " +
+        std::to_string(cfg.memory_limit >> 20) + " MiB ceiling");
+
+  const auto t0 = std::chrono::steady_clock::now();
+  const std::uint64_t total = mersenne_decimal_digits(cfg.p);
+  const Shape shape = shape_for(total);
+  Writer writer(cfg.path, total, cb);
+  {
+    ScopedMpz m(cfg.p + 1);
+    mpz_setbit(m, cfg.p);
+    mpz_sub_ui(m, m, 1);
+    Converter conv(shape, writer);
+    conv.emit(m, static_cast<int>(shape.levels) - 1, true);
+  }
+  out.digits = writer.digits();
+  out.sha256 = writer.commit();
+  out.bytes = writer.bytes();
+  out.ns_elapsed = static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(
+          std::chrono::steady_clock::now() - t0)
+          .count());
+  return out;
+}
+
+} // namespace ll
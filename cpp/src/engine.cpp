@@ -0,0 +1,159 @@
+// src/engine.cpp
+#include "engine.hpp"
+#include "ll/prime.hpp"
+
+#include <chrono>
+#include <stdexcept>
+#include <string>
+
+namespace ll {
+// Forward decl for the internal reducer (no public header exposure)
+void mersenne_reduce_once(mpz_t x, const mpz_t M, std::uint32_t p, mpz_t hi);
+} // namespace ll
+
+namespace ll {
+namespace {
+
+// Below this exponent GMP's basecase/Toom squaring plus the fold beats the
+// transform setup and carry passes of the IBDWT engine.
+inline constexpr std::uint32_t kIbdwtMinExponent = 50000;
+
+// Classic path: full mpz_mul into a 2p-bit buffer, then one Mersenne fold.
+class GmpEngine final : public SquareEngine {
+public:
+  explicit GmpEngine(std::uint32_t p) : p_(p) {
+    // Preallocate to avoid reallocations
+    mpz_init2(M_, p + 1);       // M ~ p bits
+    mpz_init2(s_, p + 1);       // residue s < 2^p
+    mpz_init2(tmp_, 2 * p + 2); // s^2 - 2 < 2^(2p)
+    mpz_init2(hi_, p + 1);
+
+    // M = 2^p - 1
+    mpz_set_ui(M_, 1);
+    mpz_mul_2exp(M_, M_, p);
+    mpz_sub_ui(M_, M_, 1);
+  }
+  ~GmpEngine() override {
+    mpz_clear(M_);
+    mpz_clear(s_);
+    mpz_clear(tmp_);
+    mpz_clear(hi_);
+  }
+  GmpEngine(const GmpEngine &) = delete;
+  GmpEngine &operator=(const GmpEngine &) = delete;
+
+  void load(const mpz_t x) override { mpz_set(s_, x); }
+  void store(mpz_t x) override { mpz_set(x, s_); }
+
+  void square_sub(std::uint32_t c) override {
+    // tmp = s*s - c; the fold expects a non-negative input, so borrow one M
+    // when s*s < c (only possible for s in {0, 1}).
+    mpz_mul(tmp_, s_, s_);
+    if (mpz_cmp_ui(tmp_, c) < 0)
+      mpz_add(tmp_, tmp_, M_);
+    mpz_sub_ui(tmp_, tmp_, c);
+
+    // One-fold Mersenne reduction into [0, M-1]
+    mersenne_reduce_once(tmp_, M_, p_, hi_);
+
+    // s <- tmp
+    mpz_swap(s_, tmp_);
+
+#if defined(LL_ENABLE_DEBUG_INVARIANTS) || !defined(NDEBUG)
+    if (mpz_sgn(s_) < 0 || mpz_cmp(s_, M_) >= 0)
+      throw std::logic_error("LL invariant violated: residue out of range");
+#endif
+  }
+
+  bool is_zero() const override { return mpz_sgn(s_) == 0; }
+
+  std::string info() const override {
+    return std::string("gmp:") + (::gmp_version ? ::gmp_version : "?");
+  }
+
+private:
+  std::uint32_t p_;
+  mpz_t M_, s_, tmp_, hi_;
+};
+
+} // namespace
+
+std::uint32_t ibdwt_min_exponent() noexcept { return kIbdwtMinExponent; }
+
+Engine engine_from_string(const std::string &name) {
+  if (name.empty() || name == "auto")
+    return Engine::Auto;
+  if (name == "gmp")
+    return Engine::Gmp;
+  if (name == "ibdwt")
+    return Engine::Ibdwt;
+  if (name == "mpn")
+    return Engine::Mpn;
+  throw std::invalid_argument("unknown engine: " + name);
+}
+
+const char *engine_name(Engine e) noexcept {
+  switch (e) {
+  case Engine::Gmp:
+    return "gmp";
+  case Engine::Ibdwt:
+    return "ibdwt";
+  case Engine::Mpn:
+    return "mpn";
+  case Engine::Auto:
+    break;
+  }
+  return "auto";
+}
+
+Engine resolve_engine(Engine e, std::uint32_t p) noexcept {
+  if (e != Engine::Auto)
+    return e;
+  return p >= kIbdwtMinExponent ? Engine::Ibdwt : Engine::Gmp;
+}
+
+std::unique_ptr<SquareEngine> make_gmp_engine(std::uint32_t p) {
+  return std::make_unique<GmpEngine>(p);
+}
+
+std::unique_ptr<SquareEngine> make_engine(Engine e, std::uint32_t p) {
+  switch (resolve_engine(e, p)) {
+  case Engine::Ibdwt:
+    return make_ibdwt_engine(p);
+  case Engine::Mpn:
+    return make_mpn_engine(p);
+  case Engine::Gmp:
+  case Engine::Auto:
+    break;
+  }
+  return make_gmp_engine(p);
+}
+
+SquareTiming time_squarings(std::uint32_t p, std::uint32_t iterations,
+                            Engine e) {
+  if (p < 3 || !is_prime_exponent(p))
+    throw std::invalid_argument("exponent p must be an odd prime");
+  auto engine = make_engine(e, p);
+  ScopedMpz s(p + 1);
+  mpz_set_ui(s, 4);
+  engine->load(s);
+  // untimed warm-up: s = 4^(2^k) needs ~log2(p) steps to reach full size
+  std::uint32_t warmup = 1;
+  for (std::uint32_t v = p; v; v >>= 1)
+    ++warmup;
+  for (std::uint32_t i = 0; i < warmup; ++i)
+    engine->square_sub(2);
+  const auto t0 = std::chrono::steady_clock::now();
+  for (std::uint32_t i = 0; i < iterations; ++i)
+    engine->square_sub(2);
+  const auto t1 = std::chrono::steady_clock::now();
+  engine->store(s); // keep the loop observable
+
+  SquareTiming out;
+  out.ns = static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(t1 - t0).count());
+  out.engine_info = engine->info();
+  return out;
+}
+
+} // namespace ll
@@ -0,0 +1,57 @@
+// src/engine.hpp
+// Internal squaring engines (not part of the public include/ll headers).
+#pragma once
+#include "ll/ll.hpp"
+
+#include <cstdint>
+#include <gmp.h>
+#include <memory>
+#include <string>
+
+namespace ll {
+
+// RAII owner of a scratch mpz_t (keeps early returns and throws leak-free).
+class ScopedMpz {
+public:
+  explicit ScopedMpz(mp_bitcnt_t bits) { mpz_init2(v_, bits); }
+  ~ScopedMpz() { mpz_clear(v_); }
+  ScopedMpz(const ScopedMpz &) = delete;
+  ScopedMpz &operator=(const ScopedMpz &) = delete;
+
+  operator mpz_ptr() { return v_; }
+  operator mpz_srcptr() const { return v_; }
+
+private:
+  mpz_t v_;
+};
+
+// Residue arithmetic modulo M_p = 2^p - 1. Each engine keeps the residue in
+// its own working representation; load()/store() convert from/to a canonical
+// mpz in [0, M_p), so callers (digests, checkpoints) never see the internals.
+class SquareEngine {
+public:
+  virtual ~SquareEngine() = default;
+
+  // Set the residue from x (0 <= x < M_p).
+  virtual void load(const mpz_t x) = 0;
+  // Write the fully reduced residue into x (0 <= x < M_p).
+  virtual void store(mpz_t x) = 0;
+  // s <- s^2 - c (mod M_p)
+  virtual void square_sub(std::uint32_t c) = 0;
+  // True iff the residue is 0 (mod M_p).
+  virtual bool is_zero() const = 0;
+  // Short identifier for engine_info, e.g. "gmp:6.3.0" or "ibdwt:n=2^16,...".
+  virtual std::string info() const = 0;
+};
+
+// Resolve Engine::Auto for exponent p.
+Engine resolve_engine(Engine e, std::uint32_t p) noexcept;
+
+// Construct an engine for exponent p (p must be an odd prime).
+std::unique_ptr<SquareEngine> make_engine(Engine e, std::uint32_t p);
+
+std::unique_ptr<SquareEngine> make_gmp_engine(std::uint32_t p);
+std::unique_ptr<SquareEngine> make_ibdwt_engine(std::uint32_t p);
+std::unique_ptr<SquareEngine> make_mpn_engine(std::uint32_t p);
+
+} // namespace ll
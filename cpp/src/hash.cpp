@@ -1,5 +1,6 @@
 // src/hash.cpp
 #include "ll/hash.hpp"
+#include <algorithm>
 #include <array>
 #include <cstdint>
 #include <cstring>
@@ -9,7 +10,7 @@
 namespace ll {
 namespace {
 
-// ---- Minimal SHA-256 (one-shot) ----
+// ---- Minimal SHA-256 ----
 inline constexpr std::uint32_t rotr(std::uint32_t x, int n) {
   return (x >> n) | (x << (32 - n));
 }
@@ -24,101 +25,110 @@ inline void store_be32(unsigned char *p, std::uint32_t v) {
   p[3] = (unsigned char)(v);
 }
 
-static void sha256(const void *data, std::size_t len,
-                   std::array<std::uint8_t, 32> &out) {
-  static constexpr std::uint32_t K[64] = {
-      0x428a2f98u, 0x71374491u, 0xb5c0fbcfu, 0xe9b5dba5u, 0x3956c25bu,
-      0x59f111f1u, 0x923f82a4u, 0xab1c5ed5u, 0xd807aa98u, 0x12835b01u,
-      0x243185beu, 0x550c7dc3u, 0x72be5d74u, 0x80deb1feu, 0x9bdc06a7u,
-      0xc19bf174u, 0xe49b69c1u, 0xefbe4786u, 0x0fc19dc6u, 0x240ca1ccu,
-      0x2de92c6fu, 0x4a7484aau, 0x5cb0a9dcu, 0x76f988dau, 0x983e5152u,
-      0xa831c66du, 0xb00327c8u, 0xbf597fc7u, 0xc6e00bf3u, 0xd5a79147u,
-      0x06ca6351u, 0x14292967u, 0x27b70a85u, 0x2e1b2138u, 0x4d2c6dfcu,
-      0x53380d13u, 0x650a7354u, 0x766a0abbu, 0x81c2c92eu, 0x92722c85u,
-      0xa2bfe8a1u, 0xa81a664bu, 0xc24b8b70u, 0xc76c51a3u, 0xd192e819u,
-      0xd6990624u, 0xf40e3585u, 0x106aa070u, 0x19a4c116u, 0x1e376c08u,
-      0x2748774cu, 0x34b0bcb5u, 0x391c0cb3u, 0x4ed8aa4au, 0x5b9cca4fu,
-      0x682e6ff3u, 0x748f82eeu, 0x78a5636fu, 0x84c87814u, 0x8cc70208u,
-      0x90befffau, 0xa4506cebu, 0xbef9a3f7u, 0xc67178f2u};
-  std::uint32_t H[8] = {0x6a09e667u, 0xbb67ae85u, 0x3c6ef372u, 0xa54ff53au,
-                        0x510e527fu, 0x9b05688cu, 0x1f83d9abu, 0x5be0cd19u};
+static constexpr std::uint32_t K[64] = {
+    0x428a2f98u, 0x71374491u, 0xb5c0fbcfu, 0xe9b5dba5u, 0x3956c25bu,
+    0x59f111f1u, 0x923f82a4u, 0xab1c5ed5u, 0xd807aa98u, 0x12835b01u,
+    0x243185beu, 0x550c7dc3u, 0x72be5d74u, 0x80deb1feu, 0x9bdc06a7u,
+    0xc19bf174u, 0xe49b69c1u, 0xefbe4786u, 0x0fc19dc6u, 0x240ca1ccu,
+    0x2de92c6fu, 0x4a7484aau, 0x5cb0a9dcu, 0x76f988dau, 0x983e5152u,
+    0xa831c66du, 0xb00327c8u, 0xbf597fc7u, 0xc6e00bf3u, 0xd5a79147u,
+    0x06ca6351u, 0x14292967u, 0x27b70a85u, 0x2e1b2138u, 0x4d2c6dfcu,
+    0x53380d13u, 0x650a7354u, 0x766a0abbu, 0x81c2c92eu, 0x92722c85u,
+    0xa2bfe8a1u, 0xa81a664bu, 0xc24b8b70u, 0xc76c51a3u, 0xd192e819u,
+    0xd6990624u, 0xf40e3585u, 0x106aa070u, 0x19a4c116u, 0x1e376c08u,
+    0x2748774cu, 0x34b0bcb5u, 0x391c0cb3u, 0x4ed8aa4au, 0x5b9cca4fu,
+    0x682e6ff3u, 0x748f82eeu, 0x78a5636fu, 0x84c87814u, 0x8cc70208u,
+    0x90befffau, 0xa4506cebu, 0xbef9a3f7u, 0xc67178f2u};
 
-  const unsigned char *in = static_cast<const unsigned char *>(data);
-  std::size_t full = len / 64 * 64;
-  unsigned char block[64];
+void compress(std::uint32_t *H, const unsigned char *b) {
+  std::uint32_t w[64];
+  for (int i = 0; i < 16; ++i)
+    w[i] = load_be32(b + 4 * i);
+  for (int i = 16; i < 64; ++i) {
+    std::uint32_t s0 =
+        rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >> 3);
+    std::uint32_t s1 =
+        rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >> 10);
+    w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+  }
+  std::uint32_t a = H[0], b2 = H[1], c = H[2], d = H[3], e = H[4], f = H[5],
+                g = H[6], h = H[7];
+  for (int i = 0; i < 64; ++i) {
+    std::uint32_t S1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25);
+    std::uint32_t ch = (e & f) ^ (~e & g);
+    std::uint32_t t1 = h + S1 + ch + K[i] + w[i];
+    std::uint32_t S0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22);
+    std::uint32_t maj = (a & b2) ^ (a & c) ^ (b2 & c);
+    std::uint32_t t2 = S0 + maj;
+    h = g;
+    g = f;
+    f = e;
+    e = d + t1;
+    d = c;
+    c = b2;
+    b2 = a;
+    a = t1 + t2;
+  }
+  H[0] += a;
+  H[1] += b2;
+  H[2] += c;
+  H[3] += d;
+  H[4] += e;
+  H[5] += f;
+  H[6] += g;
+  H[7] += h;
+}
 
-  auto compress = [&](const unsigned char *b) {
-    std::uint32_t w[64];
-    for (int i = 0; i < 16; ++i)
-      w[i] = load_be32(b + 4 * i);
-    for (int i = 16; i < 64; ++i) {
-      std::uint32_t s0 =
-          rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >> 3);
-      std::uint32_t s1 =
-          rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >> 10);
-      w[i] = w[i - 16] + s0 + w[i - 7] + s1;
-    }
-    std::uint32_t a = H[0], b2 = H[1], c = H[2], d = H[3], e = H[4], f = H[5],
-                  g = H[6], h = H[7];
-    for (int i = 0; i < 64; ++i) {
-      std::uint32_t S1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25);
-      std::uint32_t ch = (e & f) ^ (~e & g);
-      std::uint32_t t1 = h + S1 + ch + K[i] + w[i];
-      std::uint32_t S0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22);
-      std::uint32_t maj = (a & b2) ^ (a & c) ^ (b2 & c);
-      std::uint32_t t2 = S0 + maj;
-      h = g;
-      g = f;
-      f = e;
-      e = d + t1;
-      d = c;
-      c = b2;
-      b2 = a;
-      a = t1 + t2;
-    }
-    H[0] += a;
-    H[1] += b2;
-    H[2] += c;
-    H[3] += d;
-    H[4] += e;
-    H[5] += f;
-    H[6] += g;
-    H[7] += h;
-  };
+} // namespace
 
-  // Process full blocks
-  for (std::size_t i = 0; i < full; i += 64)
-    compress(in + i);
+Sha256::Sha256() noexcept
+    : h_{0x6a09e667u, 0xbb67ae85u, 0x3c6ef372u, 0xa54ff53au,
+         0x510e527fu, 0x9b05688cu, 0x1f83d9abu, 0x5be0cd19u} {}
 
-  // Padding
-  std::size_t rem = len - full;
-  std::memset(block, 0, 64);
-  if (rem)
-    std::memcpy(block, in + full, rem);
-  block[rem] = 0x80;
+void Sha256::update(const void *data, std::size_t len) noexcept {
+  const unsigned char *in = static_cast<const unsigned char *>(data);
+  total_ += len;
+  if (buffered_) {
+    const std::size_t take = std::min(len, sizeof(buf_) - buffered_);
+    std::memcpy(buf_ + buffered_, in, take);
+    buffered_ += take;
+    in += take;
+    len -= take;
+    if (buffered_ < sizeof(buf_))
+      return;
+    compress(h_, buf_);
+    buffered_ = 0;
+  }
+  for (; len >= 64; in += 64, len -= 64)
+    compress(h_, in);
+  std::memcpy(buf_, in, len);
+  buffered_ = len;
+}
 
-  if (rem >= 56) { // need two blocks
-    compress(block);
-    std::memset(block, 0, 64);
+ResidueDigest Sha256::finish() noexcept {
+  // Padding: 0x80, zeros, then the length in bits (big-endian)
+  std::memset(buf_ + buffered_, 0, sizeof(buf_) - buffered_);
+  buf_[buffered_] = 0x80;
+  if (buffered_ >= 56) { // need two blocks
+    compress(h_, buf_);
+    std::memset(buf_, 0, sizeof(buf_));
   }
-  // length in bits (big-endian)
-  std::uint64_t bits = static_cast<std::uint64_t>(len) * 8;
+  const std::uint64_t bits = total_ * 8;
   for (int i = 0; i < 8; ++i)
-    block[56 + 7 - i] = (unsigned char)(bits >> (8 * i));
-  compress(block);
+    buf_[56 + 7 - i] = (unsigned char)(bits >> (8 * i));
+  compress(h_, buf_);
 
-  // Output
+  ResidueDigest d{};
   for (int i = 0; i < 8; ++i)
-    store_be32(out.data() + 4 * i, H[i]);
+    store_be32(d.bytes.data() + 4 * i, h_[i]);
+  return d;
 }
 
-} // namespace
-
 ResidueDigest make_residue_digest(const void *data,
                                   std::size_t nbytes) noexcept {
-  ResidueDigest d{};
-  sha256(data, nbytes, d.bytes);
-  return d;
+  Sha256 h;
+  h.update(data, nbytes);
+  return h.finish();
 }
 
 ResidueDigest make_residue_digest(const std::string &s) noexcept {
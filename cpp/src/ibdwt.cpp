@@ -0,0 +1,415 @@
+// src/ibdwt.cpp
+// Irrational-base discrete weighted transform (Crandall–Fagin) squaring.
+//
+// The p-bit residue is split into N = 2^k variable-width digits; digit j
+// starts at bit ceil(p*j/N). Weighting digit j by a_j = 2^(ceil(p*j/N) -
+// p*j/N) turns the cyclic convolution of length N into multiplication modulo
+// 2^p - 1, so the Mersenne fold happens inside the transform. Digits are kept
+// balanced (|d| <= 2^(w-1)) to keep the floating-point round-off small.
+//
+// The N real digits are packed as n = N/2 complex values (even + i*odd) and
+// transformed with a length-n complex FFT; complex data is stored as separate
+// real/imaginary arrays so the butterfly loops vectorise.
+#include "engine.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstdio>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace ll {
+namespace {
+
+static_assert(GMP_NUMB_BITS == 64, "ibdwt packs digits into 64-bit limbs");
+
+// Largest safe average bits per digit for a length-2^k real transform. Tuned
+// against the measured round-off with balanced digits (worst case ~0.03 over
+// short runs), leaving an order of magnitude below the abort threshold.
+inline double max_bits_per_digit(unsigned k) {
+  return std::min(21.5, 23.8 - 0.35 * k);
+}
+
+// Round-off above this means the product can no longer be trusted.
+inline constexpr double kMaxRoundoff = 0.4;
+
+// Adding then subtracting 1.5 * 2^52 rounds a double with |v| < 2^51 to the
+// nearest integer without a libm call.
+inline double round_fast(double v) {
+  constexpr double kMagic = 6755399441055744.0;
+  return (v + kMagic) - kMagic;
+}
+
+class IbdwtEngine final : public SquareEngine {
+public:
+  explicit IbdwtEngine(std::uint32_t p) : p_(p) {
+    // Choose the smallest power-of-two length that keeps round-off in check.
+    unsigned k = 1;
+    while (static_cast<double>(p) / static_cast<double>(1u << k) >
+           max_bits_per_digit(k))
+      ++k;
+    k_ = k;
+    N_ = std::size_t{1} << k;
+    n_ = N_ / 2;
+
+    // Digit layout and weights: pos_j = ceil(p*j/N), a_j = 2^(pos_j - p*j/N)
+    pos_.resize(N_ + 1);
+    width_.resize(N_);
+    weight_.resize(N_);
+    inv_weight_.resize(N_);
+    for (std::size_t j = 0; j <= N_; ++j) {
+      const std::uint64_t pj = static_cast<std::uint64_t>(p) * j;
+      pos_[j] = static_cast<std::uint32_t>((pj + N_ - 1) >> k);
+    }
+    for (std::size_t j = 0; j < N_; ++j) {
+      width_[j] = static_cast<std::uint8_t>(pos_[j + 1] - pos_[j]);
+      const std::uint64_t frac = (static_cast<std::uint64_t>(pos_[j]) << k) -
+                                 static_cast<std::uint64_t>(p) * j; // 0..N-1
+      const long double a = std::exp2(static_cast<long double>(frac) /
+                                      static_cast<long double>(N_));
+      weight_[j] = static_cast<double>(a);
+      // fold the 1/n of the unnormalised inverse transform in here
+      inv_weight_[j] =
+          static_cast<double>(1.0L / (a * static_cast<long double>(n_)));
+    }
+
+    // Twiddles e^(-2*pi*i*t/len) for every sub-transform length len = 2, 4,
+    // ..., n, stored back to back (len/2 entries at offset len/2 - 1) so that
+    // each butterfly pass reads them contiguously.
+    const long double pi = 3.141592653589793238462643383279502884L;
+    tw_re_.resize(std::max<std::size_t>(n_ - 1, 1));
+    tw_im_.resize(tw_re_.size());
+    for (std::size_t len = 2; len <= n_; len <<= 1) {
+      const std::size_t half = len / 2;
+      for (std::size_t t = 0; t < half; ++t) {
+        const long double ang = -2.0L * pi * static_cast<long double>(t) /
+                                static_cast<long double>(len);
+        tw_re_[half - 1 + t] = static_cast<double>(std::cos(ang));
+        tw_im_[half - 1 + t] = static_cast<double>(std::sin(ang));
+      }
+    }
+
+    // The spectrum comes out of dif() in bit-reversed order: slot i holds
+    // frequency f = bitrev(i). Precompute, per slot, the slot holding n - f
+    // and the real-to-complex split twiddle e^(-2*pi*i*f/N).
+    const unsigned lg = k - 1;
+    auto bitrev = [lg](std::size_t i) {
+      std::size_t r = 0;
+      for (unsigned b = 0; b < lg; ++b)
+        r |= ((i >> b) & 1u) << (lg - 1 - b);
+      return r;
+    };
+    partner_.resize(n_);
+    split_re_.resize(n_);
+    split_im_.resize(n_);
+    for (std::size_t i = 0; i < n_; ++i) {
+      const std::size_t f = bitrev(i);
+      partner_[i] = static_cast<std::uint32_t>(bitrev((n_ - f) & (n_ - 1)));
+      const long double ang = -2.0L * pi * static_cast<long double>(f) /
+                              static_cast<long double>(N_);
+      split_re_[i] = static_cast<double>(std::cos(ang));
+      split_im_[i] = static_cast<double>(std::sin(ang));
+    }
+
+    digits_.assign(N_, 0);
+    re_.assign(n_, 0.0);
+    im_.assign(n_, 0.0);
+  }
+
+  void load(const mpz_t x) override {
+    const std::size_t nl = mpz_size(x);
+    const mp_limb_t *limbs = mpz_limbs_read(x);
+    for (std::size_t j = 0; j < N_; ++j)
+      digits_[j] = extract_bits(limbs, nl, pos_[j], width_[j]);
+    carry_balanced(0);
+  }
+
+  void store(mpz_t x) override {
+    // Re-normalise a copy to non-negative digits, then pack into limbs.
+    std::vector<std::int64_t> d(digits_);
+    std::int64_t carry = 0;
+    for (std::size_t j = 0; j < N_; ++j)
+      carry = split_unsigned(d[j], carry, width_[j]);
+    for (std::size_t j = 0; carry != 0; j = (j + 1) % N_)
+      carry = split_unsigned(d[j], carry, width_[j]); // 2^p == 1 (mod M_p)
+
+    const std::size_t nl = (p_ + 63) / 64;
+    mp_limb_t *out = mpz_limbs_write(x, static_cast<mp_size_t>(nl));
+    std::fill(out, out + nl, mp_limb_t{0});
+    bool all_ones = true;
+    for (std::size_t j = 0; j < N_; ++j) {
+      const std::uint64_t v = static_cast<std::uint64_t>(d[j]);
+      if (v != (std::uint64_t{1} << width_[j]) - 1)
+        all_ones = false;
+      const std::uint32_t bit = pos_[j];
+      const std::size_t li = bit / 64, sh = bit % 64;
+      out[li] |= static_cast<mp_limb_t>(v << sh);
+      if (sh != 0 && sh + width_[j] > 64)
+        out[li + 1] |= static_cast<mp_limb_t>(v >> (64 - sh));
+    }
+    mpz_limbs_finish(x, static_cast<mp_size_t>(nl));
+    if (all_ones) // the digit pattern of M_p itself, i.e. 0
+      mpz_set_ui(x, 0);
+  }
+
+  void square_sub(std::uint32_t c) override {
+    // Weighted inputs, packed as n complex values (even + i*odd).
+    for (std::size_t t = 0; t < n_; ++t) {
+      re_[t] = static_cast<double>(digits_[2 * t]) * weight_[2 * t];
+      im_[t] = static_cast<double>(digits_[2 * t + 1]) * weight_[2 * t + 1];
+    }
+
+    dif(re_.data(), im_.data(), n_);
+    square_spectrum();
+    dit(re_.data(), im_.data(), n_);
+
+    // Unweight, round to integers and propagate carries (subtracting c from
+    // digit 0, which has weight 1).
+    double err = 0.0;
+    std::int64_t carry = -static_cast<std::int64_t>(c);
+    for (std::size_t t = 0; t < n_; ++t) {
+      const double ve = re_[t] * inv_weight_[2 * t];
+      const double vo = im_[t] * inv_weight_[2 * t + 1];
+      const double re = round_fast(ve), ro = round_fast(vo);
+      err = std::max(err, std::max(std::fabs(ve - re), std::fabs(vo - ro)));
+      digits_[2 * t] = static_cast<std::int64_t>(re);
+      digits_[2 * t + 1] = static_cast<std::int64_t>(ro);
+      carry = split_balanced(digits_[2 * t], carry, width_[2 * t]);
+      carry = split_balanced(digits_[2 * t + 1], carry, width_[2 * t + 1]);
+    }
+    wrap_carry(carry);
+
+    if (err > kMaxRoundoff) {
+      char buf[96];
+      std::snprintf(buf, sizeof buf,
+                    "ibdwt round-off error %.3f exceeds %.2f (p=%u, n=2^%u)",
+                    err, kMaxRoundoff, p_, k_);
+      throw std::runtime_error(buf);
+    }
+  }
+
+  bool is_zero() const override {
+    // Balanced digits represent every value in (-M_p, M_p) uniquely, so the
+    // only representation of 0 (mod M_p) is all zeros.
+    return std::all_of(digits_.begin(), digits_.end(),
+                       [](std::int64_t d) { return d == 0; });
+  }
+
+  std::string info() const override {
+    char buf[64];
+    std::snprintf(buf, sizeof buf, "ibdwt:n=2^%u,bpw=%.2f", k_,
+                  static_cast<double>(p_) / static_cast<double>(N_));
+    return buf;
+  }
+
+private:
+  // d <- (d + carry) mod 2^w in [-2^(w-1), 2^(w-1)); returns the new carry.
+  static inline std::int64_t split_balanced(std::int64_t &d, std::int64_t carry,
+                                            unsigned w) {
+    const std::int64_t v = d + carry;
+    const std::int64_t base = std::int64_t{1} << w;
+    std::int64_t lo = v & (base - 1);
+    if (lo >= (base >> 1))
+      lo -= base;
+    d = lo;
+    return (v - lo) >> w; // exact: v - lo is a multiple of 2^w
+  }
+
+  // d <- (d + carry) mod 2^w in [0, 2^w); returns the new carry.
+  static inline std::int64_t split_unsigned(std::int64_t &d, std::int64_t carry,
+                                            unsigned w) {
+    const std::int64_t v = d + carry;
+    const std::int64_t lo = v & ((std::int64_t{1} << w) - 1);
+    d = lo;
+    return (v - lo) >> w;
+  }
+
+  // Fold the carry out of the top digit back into digit 0 (2^p == 1).
+  void wrap_carry(std::int64_t carry) {
+    for (std::size_t j = 0; carry != 0; j = (j + 1) % N_)
+      carry = split_balanced(digits_[j], carry, width_[j]);
+  }
+
+  void carry_balanced(std::int64_t carry) {
+    for (std::size_t j = 0; j < N_; ++j)
+      carry = split_balanced(digits_[j], carry, width_[j]);
+    wrap_carry(carry);
+  }
+
+  static std::int64_t extract_bits(const mp_limb_t *limbs, std::size_t nl,
+                                   std::uint32_t bit, unsigned w) {
+    const std::size_t li = bit / 64, sh = bit % 64;
+    std::uint64_t v = li < nl ? (limbs[li] >> sh) : 0;
+    if (sh != 0 && li + 1 < nl)
+      v |= limbs[li + 1] << (64 - sh);
+    return static_cast<std::int64_t>(v & ((std::uint64_t{1} << w) - 1));
+  }
+
+  // Forward transform: decimation in frequency, natural order in, bit-reversed
+  // order out. Depth-first recursion keeps sub-transforms cache resident;
+  // levels are fused in pairs (radix-4) to halve the passes over memory.
+  void dif(double *xr, double *xi, std::size_t len) const {
+    if (len < 4) {
+      if (len == 2)
+        butterfly2(xr, xi);
+      return;
+    }
+    const std::size_t q = len / 4;
+    dif_pass(xr, xr + q, xr + 2 * q, xr + 3 * q, xi, xi + q, xi + 2 * q,
+             xi + 3 * q, tw_re_.data() + (len / 2 - 1),
+             tw_im_.data() + (len / 2 - 1), tw_re_.data() + (len / 4 - 1),
+             tw_im_.data() + (len / 4 - 1), q);
+    for (std::size_t s = 0; s < 4; ++s)
+      dif(xr + s * q, xi + s * q, q);
+  }
+
+  // Inverse transform: decimation in time, bit-reversed order in, natural
+  // order out (unnormalised; the 1/n lives in inv_weight_).
+  void dit(double *xr, double *xi, std::size_t len) const {
+    if (len < 4) {
+      if (len == 2)
+        butterfly2(xr, xi);
+      return;
+    }
+    const std::size_t q = len / 4;
+    for (std::size_t s = 0; s < 4; ++s)
+      dit(xr + s * q, xi + s * q, q);
+    dit_pass(xr, xr + q, xr + 2 * q, xr + 3 * q, xi, xi + q, xi + 2 * q,
+             xi + 3 * q, tw_re_.data() + (len / 2 - 1),
+             tw_im_.data() + (len / 2 - 1), tw_re_.data() + (len / 4 - 1),
+             tw_im_.data() + (len / 4 - 1), q);
+  }
+
+  // One radix-4 DIF step over quarters r0..r3 / i0..i3 (length q each) with
+  // twiddles w1 = e^(-2*pi*i*t/len) and w2 = w1^2.
+  static void dif_pass(double *__restrict r0, double *__restrict r1,
+                       double *__restrict r2, double *__restrict r3,
+                       double *__restrict i0, double *__restrict i1,
+                       double *__restrict i2, double *__restrict i3,
+                       const double *__restrict w1r,
+                       const double *__restrict w1i,
+                       const double *__restrict w2r,
+                       const double *__restrict w2i, std::size_t q) {
+    for (std::size_t t = 0; t < q; ++t) {
+      const double ar = w1r[t], ai = w1i[t], br = w2r[t], bi = w2i[t];
+      const double s0r = r0[t] + r2[t], s0i = i0[t] + i2[t];
+      const double s1r = r1[t] + r3[t], s1i = i1[t] + i3[t];
+      const double d0r = r0[t] - r2[t], d0i = i0[t] - i2[t];
+      // (a1 - a3) * -i, since w^(t+q) = -i * w^t
+      const double d1r = i1[t] - i3[t], d1i = r3[t] - r1[t];
+      const double b2r = d0r * ar - d0i * ai, b2i = d0r * ai + d0i * ar;
+      const double b3r = d1r * ar - d1i * ai, b3i = d1r * ai + d1i * ar;
+      const double e0r = s0r - s1r, e0i = s0i - s1i;
+      const double e1r = b2r - b3r, e1i = b2i - b3i;
+      r0[t] = s0r + s1r;
+      i0[t] = s0i + s1i;
+      r1[t] = e0r * br - e0i * bi;
+      i1[t] = e0r * bi + e0i * br;
+      r2[t] = b2r + b3r;
+      i2[t] = b2i + b3i;
+      r3[t] = e1r * br - e1i * bi;
+      i3[t] = e1r * bi + e1i * br;
+    }
+  }
+
+  // Exact inverse of dif_pass (up to a factor 4), using conjugate twiddles.
+  static void dit_pass(double *__restrict r0, double *__restrict r1,
+                       double *__restrict r2, double *__restrict r3,
+                       double *__restrict i0, double *__restrict i1,
+                       double *__restrict i2, double *__restrict i3,
+                       const double *__restrict w1r,
+                       const double *__restrict w1i,
+                       const double *__restrict w2r,
+                       const double *__restrict w2i, std::size_t q) {
+    for (std::size_t t = 0; t < q; ++t) {
+      const double ar = w1r[t], ai = -w1i[t], br = w2r[t], bi = -w2i[t];
+      const double c1r = r1[t] * br - i1[t] * bi, c1i = r1[t] * bi + i1[t] * br;
+      const double c3r = r3[t] * br - i3[t] * bi, c3i = r3[t] * bi + i3[t] * br;
+      const double b0r = r0[t] + c1r, b0i = i0[t] + c1i;
+      const double b1r = r0[t] - c1r, b1i = i0[t] - c1i;
+      const double sr = r2[t] + c3r, si = i2[t] + c3i;
+      const double dr = r2[t] - c3r, di = i2[t] - c3i;
+      const double b2r = sr * ar - si * ai, b2i = sr * ai + si * ar;
+      // conj(w)^(t+q) = i * conj(w)^t
+      const double tr = dr * ar - di * ai, ti = dr * ai + di * ar;
+      const double b3r = -ti, b3i = tr;
+      r0[t] = b0r + b2r;
+      i0[t] = b0i + b2i;
+      r2[t] = b0r - b2r;
+      i2[t] = b0i - b2i;
+      r1[t] = b1r + b3r;
+      i1[t] = b1i + b3i;
+      r3[t] = b1r - b3r;
+      i3[t] = b1i - b3i;
+    }
+  }
+
+  static inline void butterfly2(double *xr, double *xi) {
+    const double ur = xr[0], ui = xi[0];
+    xr[0] = ur + xr[1];
+    xi[0] = ui + xi[1];
+    xr[1] = ur - xr[1];
+    xi[1] = ui - xi[1];
+  }
+
+  // Given Z = FFT_n(even + i*odd) in bit-reversed order, square the length-N
+  // real spectrum and repack it so that the inverse length-n FFT yields
+  // (even + i*odd) of the cyclic square.
+  void square_spectrum() {
+    for (std::size_t i = 0; i < n_; ++i) {
+      const std::size_t j = partner_[i];
+      if (j < i)
+        continue;
+      const double zir = re_[i], zii = im_[i], zjr = re_[j], zji = im_[j];
+      square_bin(zir, zii, zjr, zji, i, re_[i], im_[i]);
+      if (j != i)
+        square_bin(zjr, zji, zir, zii, j, re_[j], im_[j]);
+    }
+  }
+
+  // (tr, ti) = Z[f], (ur, ui) = Z[n - f]; slot s holds the split twiddle
+  // w = e^(-2*pi*i*f/N).
+  inline void square_bin(double tr, double ti, double ur, double ui,
+                         std::size_t s, double &outr, double &outi) const {
+    const double wr = split_re_[s], wi = split_im_[s];
+    // even = (Z[f] + conj(Z[n-f])) / 2, odd = -i * (Z[f] - conj(Z[n-f])) / 2
+    const double er = 0.5 * (tr + ur), ei = 0.5 * (ti - ui);
+    const double odr = 0.5 * (ti + ui), odi = -0.5 * (tr - ur);
+    const double wor = wr * odr - wi * odi, woi = wr * odi + wi * odr;
+    const double x0r = er + wor, x0i = ei + woi; // X[f]
+    const double x1r = er - wor, x1i = ei - woi; // X[f + n]
+    const double y0r = x0r * x0r - x0i * x0i, y0i = 2.0 * x0r * x0i;
+    const double y1r = x1r * x1r - x1i * x1i, y1i = 2.0 * x1r * x1i;
+    const double eyr = 0.5 * (y0r + y1r), eyi = 0.5 * (y0i + y1i);
+    const double dr = 0.5 * (y0r - y1r), di = 0.5 * (y0i - y1i);
+    // odd half of the square: (Y[f] - Y[f+n]) / 2 * conj(w), then times i
+    const double oyr = dr * wr + di * wi, oyi = di * wr - dr * wi;
+    outr = eyr - oyi;
+    outi = eyi + oyr;
+  }
+
+  std::uint32_t p_;
+  unsigned k_ = 0;    // N = 2^k real digits
+  std::size_t N_ = 0; // digits
+  std::size_t n_ = 0; // complex FFT length (N/2)
+
+  std::vector<std::uint32_t> pos_;
+  std::vector<std::uint8_t> width_;
+  std::vector<double> weight_, inv_weight_;
+  std::vector<double> tw_re_, tw_im_, split_re_, split_im_;
+  std::vector<std::uint32_t> partner_;
+  std::vector<std::int64_t> digits_;
+  std::vector<double> re_, im_;
+};
+
+} // namespace
+
+std::unique_ptr<SquareEngine> make_ibdwt_engine(std::uint32_t p) {
+  if (p < 3 || (p & 1u) == 0)
+    throw std::invalid_argument("ibdwt engine requires an odd exponent p >= 3");
+  return std::make_unique<IbdwtEngine>(p);
+}
+
+} // namespace ll
@@ -1,14 +1,24 @@
 // src/ll_core.cpp
+#include "engine.hpp"
+#include "ll/checkpoint.hpp"
 #include "ll/hash.hpp"
 #include "ll/ll.hpp"
 #include "ll/prime.hpp"
+#include "ll/progress.hpp"
 
 #include <algorithm> // std::max
+#include <atomic>
 #include <chrono>
 #include <cstdint>
+#include <exception>
 #include <gmp.h>
+#include <numeric>
+#include <optional>
 #include <stdexcept>
 #include <string>
+#include <thread>
+#include <utility>
+#include <vector>
 
 namespace {
 inline std::string compiler_info() {
@@ -25,11 +35,40 @@ inline std::string compiler_info() {
 namespace ll {
 // Forward decl for the internal reducer (no public header exposure)
 void mersenne_reduce_once(mpz_t x, const mpz_t M, std::uint32_t p, mpz_t hi);
-} // namespace ll
 
-namespace ll {
+namespace {
 
-LLResult ll_test(const LLConfig &cfg, ProgressCb cb) {
+Checkpoint snapshot(std::uint32_t p, std::uint32_t iteration, mpz_srcptr s) {
+  Checkpoint ck;
+  ck.p = p;
+  ck.iteration = iteration;
+  ck.limbs.resize((mpz_sizeinbase(s, 2) + 63) / 64);
+  std::size_t count = 0;
+  mpz_export(ck.limbs.data(), &count, -1, sizeof(std::uint64_t), 0, 0, s);
+  ck.limbs.resize(count);
+  return ck;
+}
+
+ResidueDigest digest_of(mpz_srcptr s) {
+  return make_residue_digest(mpz_limbs_read(s),
+                             mpz_size(s) * sizeof(mp_limb_t));
+}
+
+// Restore s from a checkpoint, rejecting anything that is not a residue of
+// this exponent's LL sequence.
+void restore(const Checkpoint &ck, std::uint32_t p, mpz_ptr s) {
+  if (ck.p != p)
+    throw std::runtime_error("checkpoint is for p=" + std::to_string(ck.p) +
+                             ", not p=" + std::to_string(p));
+  if (ck.iteration > p - 2)
+    throw std::runtime_error("checkpoint iteration out of range");
+  mpz_import(s, ck.limbs.size(), -1, sizeof(std::uint64_t), 0, 0,
+             ck.limbs.data());
+  if (mpz_sizeinbase(s, 2) > p || mpz_scan0(s, 0) >= p) // s >= 2^p - 1
+    throw std::runtime_error("checkpoint residue out of range");
+}
+
+LLResult run_ll(const LLConfig &cfg, ProgressCb cb, bool resume) {
   const std::uint32_t p = cfg.p;
   if (p < 2)
     throw std::invalid_argument("p must be >= 2");
@@ -62,78 +101,309 @@ LLResult ll_test(const LLConfig &cfg, ProgressCb cb) {
 
   auto t0 = std::chrono::steady_clock::now();
 
-  // Big integers: preallocate to avoid reallocations
-  mpz_t M, s, tmp, hi;
-  mpz_init2(M, p + 1);       // M ~ p bits
-  mpz_init2(s, p + 1);       // residue s < 2^p
-  mpz_init2(tmp, 2 * p + 2); // s^2 - 2 < 2^(2p)
-  mpz_init2(hi, p + 1);
-
-  // M = 2^p - 1
-  mpz_set_ui(M, 1);
-  mpz_mul_2exp(M, M, p);
-  mpz_sub_ui(M, M, 1);
+  // The engine owns its working buffers; `s` is only used to hand the
+  // canonical residue to digests and checkpoints.
+  auto engine = make_engine(cfg.engine, p);
+  ScopedMpz s(p + 1);
 
-  // s = 4
+  // s = 4, or the saved residue
+  std::uint32_t first = 0;
   mpz_set_ui(s, 4);
+  if (resume && !cfg.checkpoint_path.empty()) {
+    if (auto ck = load_checkpoint(cfg.checkpoint_path)) {
+      restore(*ck, p, s);
+      first = ck->iteration;
+    }
+  }
+  engine->load(s);
+  out.resumed_from = first;
+
+  const bool checkpointing = !cfg.checkpoint_path.empty();
+  const auto ck_period = std::chrono::seconds(cfg.checkpoint_secs);
+  auto last_ck = t0;
+
+  Progress *const progress = cfg.progress;
+  if (progress)
+    progress->start(first, total_iters);
+  // Save state at iteration `next` (s must hold the current residue).
+  auto checkpoint = [&](std::uint32_t next) {
+    save_checkpoint(cfg.checkpoint_path, snapshot(p, next, s));
+    if (progress)
+      progress->publish_digest(next, digest_of(s));
+  };
 
   bool early_composite = false;
+  const CancelToken *const cancel = cfg.cancel;
+  std::uint32_t done = total_iters;
 
   // Lucas–Lehmer loop: exactly p-2 iterations
-  for (std::uint32_t i = 0; i < total_iters; ++i) {
+  for (std::uint32_t i = first; i < total_iters; ++i) {
+    // Native cancel: one relaxed load per iteration.
+    if (cancel && cancel->cancelled()) {
+      done = i;
+      out.cancelled = true;
+      break;
+    }
+
     // Early exit: if previous iteration produced s==0 and we still have work,
     // M_p is composite.
-    if (i > 0 && mpz_cmp_ui(s, 0) == 0) {
+    if (i > 0 && engine->is_zero()) {
       out.final_residue_is_zero = false;
       out.is_prime = false;
       early_composite = true;
+      done = i;
       break;
     }
 
-    // tmp = s*s - 2
-    mpz_mul(tmp, s, s);
-    mpz_sub_ui(tmp, tmp, 2);
-
-    // One-fold Mersenne reduction into [0, M-1]
-    mersenne_reduce_once(tmp, M, p, hi);
+    // s <- s*s - 2 (mod M_p)
+    engine->square_sub(2);
 
-    // s <- tmp
-    mpz_swap(s, tmp);
-
-#if defined(LL_ENABLE_DEBUG_INVARIANTS) || !defined(NDEBUG)
-    if (mpz_sgn(s) < 0 || mpz_cmp(s, M) >= 0)
-      throw std::logic_error("LL invariant violated: residue out of range");
-#endif
+    // Polling channel: one relaxed store and one relaxed load per iteration.
+    if (progress) {
+      progress->set_iteration(i + 1);
+      if (const std::uint32_t req = progress->pending()) {
+        engine->store(s);
+        if (req & Progress::kCancel) {
+          if (checkpointing)
+            checkpoint(i + 1);
+          throw std::runtime_error("cancelled");
+        }
+        progress->publish_digest(i + 1, digest_of(s));
+      }
+    }
 
     // Throttled, zero-copy progress hashing
     if (cb && cfg.enable_progress &&
         ((i + 1) % stride == 0 || i + 1 == total_iters)) {
-      size_t nlimbs = mpz_size(s);
-      const mp_limb_t *limbs = mpz_limbs_read(s);
-      cb(i, make_residue_digest(limbs, nlimbs * sizeof(mp_limb_t)));
+      engine->store(s);
+      try {
+        cb(i, digest_of(s));
+      } catch (...) {
+        // Cancelled from the callback: keep the work done so far.
+        if (checkpointing)
+          checkpoint(i + 1);
+        throw;
+      }
+    }
+
+    // Periodic checkpoint; the clock is only read every 64 iterations.
+    if (checkpointing && ((i + 1) & 63u) == 0 && i + 1 < total_iters) {
+      const auto now = std::chrono::steady_clock::now();
+      if (now - last_ck >= ck_period) {
+        engine->store(s);
+        checkpoint(i + 1);
+        last_ck = now;
+      }
     }
   }
 
-  if (!early_composite) {
-    out.final_residue_is_zero = (mpz_cmp_ui(s, 0) == 0);
+  out.completed = done;
+  if (out.cancelled) {
+    // Partial state: the caller may persist it or simply resume later.
+    engine->store(s);
+    if (checkpointing && done > first)
+      checkpoint(done);
+    out.residue = snapshot(p, done, s).limbs;
+  } else if (!early_composite) {
+    out.final_residue_is_zero = engine->is_zero();
     out.is_prime = out.final_residue_is_zero;
   }
 
-  // Cleanup
-  mpz_clear(M);
-  mpz_clear(s);
-  mpz_clear(tmp);
-  mpz_clear(hi);
-
   auto t1 = std::chrono::steady_clock::now();
   out.ns_elapsed = static_cast<std::uint64_t>(
       std::chrono::duration_cast<std::chrono::nanoseconds>(t1 - t0).count());
 
   // Engine info
-  out.engine_info = std::string("gmp:") +
-                    (::gmp_version ? ::gmp_version : "?") + "; " +
-                    compiler_info() + "; flags:native";
+  out.engine_info = engine->info() + "; " + compiler_info() + "; flags:native";
+
+  return out;
+}
+
+} // namespace
+
+LLResult ll_test(const LLConfig &cfg, ProgressCb cb) {
+  return run_ll(cfg, std::move(cb), /*resume=*/false);
+}
+
+LLResult ll_resume(const LLConfig &cfg, ProgressCb cb) {
+  return run_ll(cfg, std::move(cb), /*resume=*/true);
+}
+
+namespace {
+
+std::uint64_t ns_since(std::chrono::steady_clock::time_point t0) {
+  return static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(
+          std::chrono::steady_clock::now() - t0)
+          .count());
+}
+
+// GMP squaring loop whose buffers are sized once for the largest exponent of
+// a batch; only M changes between exponents, so nothing is reallocated.
+class BatchKernel {
+public:
+  explicit BatchKernel(std::uint32_t max_p) {
+    mpz_init2(M_, max_p + 1);
+    mpz_init2(s_, max_p + 1);
+    mpz_init2(tmp_, 2 * max_p + 2);
+    mpz_init2(hi_, max_p + 1);
+  }
+  ~BatchKernel() {
+    mpz_clear(M_);
+    mpz_clear(s_);
+    mpz_clear(tmp_);
+    mpz_clear(hi_);
+  }
+  BatchKernel(const BatchKernel &) = delete;
+  BatchKernel &operator=(const BatchKernel &) = delete;
+
+  // Primality of M_p for an odd prime p, or nullopt if cancelled.
+  std::optional<bool> run(std::uint32_t p, const CancelToken *cancel) {
+    mpz_set_ui(M_, 0);
+    mpz_setbit(M_, p);
+    mpz_sub_ui(M_, M_, 1);
+    mpz_set_ui(s_, 4);
+    for (std::uint32_t i = 0; i < p - 2; ++i) {
+      if (cancel && cancel->cancelled())
+        return std::nullopt;
+      if (i > 0 && mpz_sgn(s_) == 0)
+        return false; // early composite, as in run_ll
+      mpz_mul(tmp_, s_, s_);
+      if (mpz_cmp_ui(tmp_, 2) < 0)
+        mpz_add(tmp_, tmp_, M_);
+      mpz_sub_ui(tmp_, tmp_, 2);
+      mersenne_reduce_once(tmp_, M_, p, hi_);
+      mpz_swap(s_, tmp_);
+    }
+    return mpz_sgn(s_) == 0;
+  }
+
+private:
+  mpz_t M_, s_, tmp_, hi_;
+};
+
+// Same loop on a dedicated engine (exponents that resolve to IBDWT or mpn).
+std::optional<bool> run_engine(SquareEngine &engine, std::uint32_t p,
+                               const CancelToken *cancel) {
+  ScopedMpz four(8);
+  mpz_set_ui(four, 4);
+  engine.load(four);
+  for (std::uint32_t i = 0; i < p - 2; ++i) {
+    if (cancel && cancel->cancelled())
+      return std::nullopt;
+    if (i > 0 && engine.is_zero())
+      return false;
+    engine.square_sub(2);
+  }
+  return engine.is_zero();
+}
+
+} // namespace
+
+LLBatchResult ll_test_many(const std::vector<std::uint32_t> &ps,
+                           const LLBatchConfig &cfg) {
+  for (std::uint32_t p : ps)
+    if (p < 2 || !is_prime_exponent(p))
+      throw std::invalid_argument("exponent p must be prime (got " +
+                                  std::to_string(p) + ")");
+
+  const std::size_t n = ps.size();
+  LLBatchResult out;
+  out.p = ps;
+  out.is_prime.assign(n, 0);
+  out.done.assign(n, 0);
+  out.ns_elapsed.assign(n, 0);
+
+  // Largest first: the long jobs start early and the small ones fill gaps.
+  std::vector<std::size_t> order(n);
+  std::iota(order.begin(), order.end(), std::size_t{0});
+  std::sort(order.begin(), order.end(),
+            [&](std::size_t a, std::size_t b) { return ps[a] > ps[b]; });
+
+  std::uint32_t max_gmp_p = 2;
+  bool any_gmp = false, any_ibdwt = false, any_mpn = false;
+  for (std::uint32_t p : ps) {
+    switch (resolve_engine(cfg.engine, p)) {
+    case Engine::Ibdwt:
+      any_ibdwt = true;
+      break;
+    case Engine::Mpn:
+      any_mpn = true;
+      break;
+    default:
+      any_gmp = true;
+      max_gmp_p = std::max(max_gmp_p, p);
+    }
+  }
+
+  unsigned threads = cfg.threads
+                         ? cfg.threads
+                         : std::max(1u, std::thread::hardware_concurrency());
+  threads = static_cast<unsigned>(
+      std::min<std::size_t>(threads, std::max<std::size_t>(n, 1)));
+
+  std::atomic<std::size_t> next{0};
+  std::exception_ptr error;
+  std::atomic<bool> failed{false};
+
+  auto worker = [&] {
+    try {
+      BatchKernel kernel(any_gmp ? max_gmp_p : 2);
+      for (std::size_t k;
+           (k = next.fetch_add(1, std::memory_order_relaxed)) < n;) {
+        if (failed.load(std::memory_order_relaxed))
+          return;
+        const std::size_t idx = order[k];
+        const std::uint32_t p = ps[idx];
+        const auto t0 = std::chrono::steady_clock::now();
+        std::optional<bool> prime;
+        if (p == 2) {
+          prime = true;
+        } else if (const Engine e = resolve_engine(cfg.engine, p);
+                   e != Engine::Gmp) {
+          auto engine = make_engine(e, p);
+          prime = run_engine(*engine, p, cfg.cancel);
+        } else {
+          prime = kernel.run(p, cfg.cancel);
+        }
+        if (!prime)
+          return; // cancelled: leave the rest undone
+        out.is_prime[idx] = *prime;
+        out.done[idx] = 1;
+        out.ns_elapsed[idx] = ns_since(t0);
+      }
+    } catch (...) {
+      if (!failed.exchange(true))
+        error = std::current_exception();
+    }
+  };
+
+  const auto t0 = std::chrono::steady_clock::now();
+  if (threads <= 1) {
+    worker();
+  } else {
+    std::vector<std::thread> pool;
+    pool.reserve(threads);
+    for (unsigned t = 0; t < threads; ++t)
+      pool.emplace_back(worker);
+    for (auto &t : pool)
+      t.join();
+  }
+  out.ns_total = ns_since(t0);
+  if (error)
+    std::rethrow_exception(error);
 
+  std::string engines;
+  if (any_gmp)
+    engines = std::string("gmp:") + (::gmp_version ? ::gmp_version : "?");
+  if (any_ibdwt)
+    engines += std::string(engines.empty() ? "" : ",") + "ibdwt";
+  if (any_mpn)
+    engines += std::string(engines.empty() ? "" : ",") + "mpn";
+  out.engine_info =
+      "batch:" + (engines.empty() ? std::string("none") : engines) +
+      ",threads=" + std::to_string(threads) + "; " + compiler_info() +
+      "; flags:native";
   return out;
 }
 
@@ -0,0 +1,118 @@
+// src/mpn_engine.cpp
+// Limb-level GMP engine: mpn_sqr into a preallocated 2n-limb buffer, then a
+// fused Mersenne fold. Per step that is the squaring plus one shift pass and
+// one add pass over n limbs; the top-bit fold and the "- c" only touch the
+// low limbs unless a carry/borrow ripples. No mpz calls, so no size checks,
+// reallocations or compares on the hot path.
+#include "engine.hpp"
+
+#include <algorithm>
+#include <cstdint>
+#include <string>
+#include <vector>
+
+namespace ll {
+namespace {
+
+static_assert(GMP_NUMB_BITS == 64, "mpn engine assumes 64-bit limbs");
+
+class MpnEngine final : public SquareEngine {
+public:
+  explicit MpnEngine(std::uint32_t p)
+      : p_(p), n_((p + GMP_NUMB_BITS - 1) / GMP_NUMB_BITS),
+        q_(p / GMP_NUMB_BITS), r_(p % GMP_NUMB_BITS),
+        top_mask_(r_ ? (mp_limb_t{1} << r_) - 1 : ~mp_limb_t{0}), s_(n_, 0),
+        sq_(2 * n_, 0), hi_(2 * n_, 0) {}
+
+  void load(const mpz_t x) override {
+    std::fill(s_.begin(), s_.end(), 0);
+    const std::size_t used = mpz_size(x);
+    std::copy_n(mpz_limbs_read(x), std::min(used, n_), s_.begin());
+  }
+
+  void store(mpz_t x) override {
+    mp_limb_t *dst = mpz_limbs_write(x, static_cast<mp_size_t>(n_));
+    std::copy(s_.begin(), s_.end(), dst);
+    mp_size_t size = static_cast<mp_size_t>(n_);
+    while (size > 0 && dst[size - 1] == 0)
+      --size;
+    mpz_limbs_finish(x, size);
+  }
+
+  void square_sub(std::uint32_t c) override {
+    const mp_size_t n = static_cast<mp_size_t>(n_);
+    mp_limb_t *s = s_.data();
+    mp_limb_t *sq = sq_.data();
+    mp_limb_t *hi = hi_.data();
+
+    // sq = s^2 < 2^(2p)
+    mpn_sqr(sq, s, n);
+
+    // hi = sq >> p (at most p bits, so n limbs); read before masking lo
+    const mp_size_t hn = 2 * n - static_cast<mp_size_t>(q_);
+    if (r_)
+      mpn_rshift(hi, sq + q_, hn, static_cast<unsigned>(r_));
+    else
+      std::copy_n(sq + q_, hn, hi);
+
+    // s = (sq mod 2^p) + hi < 2^(p+1); p is an odd prime, so bit p still
+    // lies inside limb n-1 and the sum cannot carry out of n limbs
+    sq[n - 1] &= top_mask_;
+    mpn_add_n(s, sq, hi, n);
+
+    // fold bit p back in: s <= 2^p
+    const mp_limb_t top = s[n - 1] >> r_;
+    s[n - 1] &= top_mask_;
+    if (top)
+      mpn_add_1(s, s, n, top);
+
+    // s - c (mod M_p). s <= 2^p and c is tiny, so s - c < M_p whenever it
+    // does not borrow; otherwise wrap to s - c + M_p (s < c: only s in {0,1}).
+    if (c == 0)
+      return canonicalize();
+    if (mpn_sub_1(s, s, n, c)) {
+      // s went negative by (c - s_old); add M_p = 2^p - 1 within p bits
+      mpn_sub_1(s, s, n, 1);
+      s[n - 1] &= top_mask_;
+    }
+  }
+
+  bool is_zero() const override {
+    return mpn_zero_p(s_.data(), static_cast<mp_size_t>(n_));
+  }
+
+  std::string info() const override {
+    return std::string("mpn:") + (::gmp_version ? ::gmp_version : "?");
+  }
+
+private:
+  // With c = 0 the folded value may equal 2^p or M_p; map both to [0, M_p).
+  void canonicalize() {
+    mp_limb_t *s = s_.data();
+    const mp_size_t n = static_cast<mp_size_t>(n_);
+    if (s[n - 1] >> r_) { // s == 2^p  ->  1
+      std::fill(s_.begin(), s_.end(), 0);
+      s[0] = 1;
+      return;
+    }
+    if ((s[n - 1] & top_mask_) != top_mask_)
+      return;
+    for (mp_size_t i = 0; i < n - 1; ++i)
+      if (~s[i] != 0)
+        return;
+    std::fill(s_.begin(), s_.end(), 0); // s == M_p  ->  0
+  }
+
+  std::uint32_t p_;
+  std::size_t n_, q_, r_;
+  mp_limb_t top_mask_;
+  std::vector<mp_limb_t> s_, sq_, hi_;
+};
+
+} // namespace
+
+std::unique_ptr<SquareEngine> make_mpn_engine(std::uint32_t p) {
+  return std::make_unique<MpnEngine>(p);
+}
+
+} // namespace ll
@@ -0,0 +1,349 @@
+// src/pm1.cpp
+#include "engine.hpp"
+#include "ll/factor.hpp"
+#include "ll/prime.hpp"
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
+#include <deque>
+#include <gmp.h>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace ll {
+// Forward decl for the internal reducer (no public header exposure)
+void mersenne_reduce_once(mpz_t x, const mpz_t M, std::uint32_t p, mpz_t hi);
+} // namespace ll
+
+namespace ll {
+namespace {
+
+// ---- cost model -------------------------------------------------------------
+// Costs are in "GMP squarings mod M_p". Stage 2 multiplies two different
+// residues (dearer than a squaring), and LL runs on the IBDWT engine above
+// ibdwt_min_exponent(), which squares ~3x faster than GMP at these sizes.
+inline constexpr double kStage2MulCost = 1.5;
+inline constexpr double kIbdwtSpeedup = 3.0;
+inline constexpr std::uint64_t kMinB1 = 1000;
+inline constexpr std::uint64_t kMaxB1 = 50'000'000;
+
+// Dickman rho on a grid of step 1/kRhoSteps up to kRhoMaxU (0 beyond).
+inline constexpr int kRhoSteps = 200;
+inline constexpr int kRhoMaxU = 30;
+
+const std::vector<double> &rho_table() {
+  static const std::vector<double> t = [] {
+    const int n = kRhoMaxU * kRhoSteps;
+    const double h = 1.0 / kRhoSteps;
+    std::vector<double> r(n + 1, 1.0);
+    // rho'(u) = -rho(u - 1) / u, trapezoid rule
+    for (int i = kRhoSteps + 1; i <= n; ++i) {
+      const double u0 = (i - 1) * h, u1 = i * h;
+      const double f0 = r[i - 1 - kRhoSteps] / u0, f1 = r[i - kRhoSteps] / u1;
+      r[i] = std::max(0.0, r[i - 1] - 0.5 * h * (f0 + f1));
+    }
+    return r;
+  }();
+  return t;
+}
+
+double rho(double u) {
+  if (u <= 1.0)
+    return 1.0;
+  if (u >= kRhoMaxU)
+    return 0.0;
+  const auto &t = rho_table();
+  const double x = u * kRhoSteps;
+  const int i = static_cast<int>(x);
+  const double f = x - i;
+  return t[i] * (1.0 - f) + t[i + 1] * f;
+}
+
+// Probability that an n with ln(n) = ln_n is B1-smooth except for at most
+// one prime in (B1, B2]: rho(1/a) + int_a^b rho((1 - t)/a) dt/t, where
+// a = ln B1 / ln n and b = ln B2 / ln n.
+double semismooth(double ln_n, double ln_b1, double ln_b2) {
+  if (ln_n <= ln_b1)
+    return 1.0;
+  const double a = ln_b1 / ln_n;
+  double g = rho(1.0 / a);
+  const double b = std::min(1.0, ln_b2 / ln_n);
+  if (b > a) {
+    constexpr int kSimpson = 32; // even
+    const double h = (b - a) / kSimpson;
+    double acc = 0.0;
+    for (int i = 0; i <= kSimpson; ++i) {
+      const double t = a + i * h;
+      const double w = (i == 0 || i == kSimpson) ? 1.0 : (i % 2 ? 4.0 : 2.0);
+      acc += w * rho((1.0 - t) / a) / t;
+    }
+    g += acc * h / 3.0;
+  }
+  return std::min(1.0, g);
+}
+
+// Chance that P-1 with (b1, b2) finds a factor f of M_p, f > 2^tf_bits. A
+// factor of k bits occurs with probability ~1/k; f - 1 = 2p * n, n ~ 2^k/2p.
+double pm1_probability(std::uint32_t p, unsigned tf_bits, double b1,
+                       double b2) {
+  const double ln2 = std::log(2.0), ln_2p = std::log(2.0 * p);
+  const double ln_b1 = std::log(b1), ln_b2 = std::log(std::max(b1, b2));
+  double prob = 0.0;
+  for (unsigned k = tf_bits + 1; k < tf_bits + 400; ++k) {
+    const double term = semismooth(k * ln2 - ln_2p, ln_b1, ln_b2) / k;
+    prob += term;
+    if (term < 1e-9)
+      break;
+  }
+  return prob;
+}
+
+// ---- arithmetic mod M_p -----------------------------------------------------
+
+class MersenneMod {
+public:
+  explicit MersenneMod(std::uint32_t p)
+      : p_(p), M_(p + 1), t_(2 * p + 2), hi_(p + 1) {
+    mpz_set_ui(M_, 1);
+    mpz_mul_2exp(M_, M_, p);
+    mpz_sub_ui(M_, M_, 1);
+  }
+  mpz_srcptr M() const { return M_; }
+
+  // r = a * b (mod M_p); r may alias a or b
+  void mul(mpz_ptr r, mpz_srcptr a, mpz_srcptr b) {
+    mpz_mul(t_, a, b);
+    mersenne_reduce_once(t_, M_, p_, hi_);
+    mpz_set(r, t_);
+  }
+  void sqr(mpz_ptr r) { mul(r, r, r); }
+  void mul_ui(mpz_ptr r, unsigned long c) {
+    mpz_mul_ui(r, r, c);
+    mersenne_reduce_once(r, M_, p_, hi_);
+  }
+  // r = a^e (mod M_p)
+  void pow_ui(mpz_ptr r, mpz_srcptr a, std::uint64_t e) {
+    ScopedMpz base(p_ + 1);
+    mpz_set(base, a);
+    mpz_set_ui(r, 1);
+    for (int b = 63 - __builtin_clzll(e); b >= 0; --b) {
+      sqr(r);
+      if ((e >> b) & 1u)
+        mul(r, r, base);
+    }
+  }
+
+private:
+  std::uint32_t p_;
+  ScopedMpz M_, t_, hi_;
+};
+
+// Odd primes <= limit.
+std::vector<std::uint32_t> primes_upto(std::uint64_t limit) {
+  std::vector<std::uint32_t> out;
+  if (limit < 3)
+    return out;
+  std::vector<bool> comp(limit / 2 + 1, false); // index i <=> 2i + 1
+  for (std::uint64_t i = 1; 2 * i + 1 <= limit; ++i) {
+    if (comp[i])
+      continue;
+    const std::uint64_t q = 2 * i + 1;
+    out.push_back(static_cast<std::uint32_t>(q));
+    for (std::uint64_t j = q * q; j <= limit; j += 2 * q)
+      comp[j / 2] = true;
+  }
+  return out;
+}
+
+// E = 2p * prod_{q <= B1} q^floor(log_q B1), via a product tree.
+void stage1_exponent(mpz_ptr E, std::uint32_t p, std::uint64_t b1,
+                     const std::vector<std::uint32_t> &primes) {
+  std::deque<ScopedMpz> level;
+  auto push = [&level](std::uint64_t v) {
+    level.emplace_back(64);
+    mpz_set_ui(level.back(), v);
+  };
+  std::uint64_t acc = 1;
+  auto take = [&](std::uint64_t qe) {
+    if (acc > UINT64_MAX / qe) {
+      push(acc);
+      acc = 1;
+    }
+    acc *= qe;
+  };
+  std::uint64_t two = 2;
+  while (two <= b1 / 2)
+    two *= 2;
+  take(two);
+  take(2ull * p);
+  for (std::uint32_t q : primes) {
+    if (q > b1)
+      break;
+    std::uint64_t qe = q;
+    while (qe <= b1 / q)
+      qe *= q;
+    take(qe);
+  }
+  push(acc);
+
+  while (level.size() > 1) {
+    std::deque<ScopedMpz> next;
+    for (std::size_t i = 0; i < level.size(); i += 2) {
+      next.emplace_back(64);
+      if (i + 1 < level.size())
+        mpz_mul(next.back(), level[i], level[i + 1]);
+      else
+        mpz_set(next.back(), level[i]);
+    }
+    level.swap(next);
+  }
+  mpz_set(E, level.front());
+}
+
+// Proper factor from g = gcd(., M_p); "" for 1 or M_p itself.
+std::string proper_factor(mpz_srcptr g, mpz_srcptr M) {
+  if (mpz_cmp_ui(g, 1) == 0 || mpz_cmp(g, M) == 0)
+    return {};
+  char *s = mpz_get_str(nullptr, 10, g);
+  std::string out(s);
+  void (*freefunc)(void *, size_t);
+  mp_get_memory_functions(nullptr, nullptr, &freefunc);
+  freefunc(s, out.size() + 1);
+  return out;
+}
+
+} // namespace
+
+PM1Bounds pm1_default_bounds(std::uint32_t p, unsigned tf_bits) noexcept {
+  PM1Bounds best;
+  if (p < 3)
+    return best;
+  if (tf_bits == 0)
+    tf_bits = tf_default_bits(p);
+  const double ll = static_cast<double>(p) /
+                    (p >= ibdwt_min_exponent() ? kIbdwtSpeedup : 1.0);
+  double best_gain = 0.0;
+  for (double b1 = kMinB1; b1 <= kMaxB1; b1 *= 1.25) {
+    for (double mult : {1.0, 10.0, 20.0, 40.0, 100.0}) {
+      const double b2 = b1 * mult;
+      double cost = 1.4427 * b1; // log2 of the stage 1 exponent
+      if (mult > 1.0)
+        cost += kStage2MulCost * 2.0 * (b2 / std::log(b2) - b1 / std::log(b1));
+      if (cost > ll) // never spend more than the LL test itself
+        continue;
+      const double prob = pm1_probability(p, tf_bits, b1, b2);
+      const double gain = prob * ll - cost;
+      if (gain > best_gain) {
+        best_gain = gain;
+        best.b1 = static_cast<std::uint64_t>(b1);
+        best.b2 = mult > 1.0 ? static_cast<std::uint64_t>(b2) : 0;
+        best.probability = prob;
+      }
+    }
+  }
+  return best;
+}
+
+PM1Result pm1_factor(const PM1Config &cfg, PM1ProgressCb cb) {
+  const std::uint32_t p = cfg.p;
+  if (p < 3 || !is_prime_exponent(p))
+    throw std::invalid_argument("exponent p must be an odd prime");
+
+  const auto t0 = std::chrono::steady_clock::now();
+  PM1Result out;
+  out.p = p;
+  out.b1 = cfg.b1;
+  out.b2 = cfg.b2;
+  if (out.b1 == 0) {
+    const PM1Bounds auto_b = pm1_default_bounds(p);
+    out.b1 = auto_b.b1;
+    out.b2 = auto_b.b2;
+  }
+  auto finish = [&] {
+    out.ns_elapsed = static_cast<std::uint64_t>(
+        std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now() - t0)
+            .count());
+    return out;
+  };
+  if (out.b1 < 2)
+    return finish(); // not worth running
+
+  MersenneMod mod(p);
+  const auto primes = primes_upto(std::max(out.b1, out.b2));
+
+  // ---- stage 1: x = 3^E --------------------------------------------------
+  ScopedMpz E(64), x(p + 1), g(p + 1);
+  stage1_exponent(E, p, out.b1, primes);
+  const long nbits = static_cast<long>(mpz_sizeinbase(E, 2));
+  const long report = std::max(1L, nbits / 100);
+  mpz_set_ui(x, 3);
+  for (long b = nbits - 2; b >= 0; --b) {
+    mod.sqr(x);
+    if (mpz_tstbit(E, static_cast<mp_bitcnt_t>(b)))
+      mod.mul_ui(x, 3);
+    if (cb && (nbits - 1 - b) % report == 0)
+      cb(1, double(nbits - 1 - b) / double(nbits - 1));
+  }
+  if (cb)
+    cb(1, 1.0);
+
+  mpz_sub_ui(g, x, 1);
+  mpz_gcd(g, g, mod.M());
+  out.factor = proper_factor(g, mod.M());
+  if (!out.factor.empty()) {
+    out.stage = 1;
+    return finish();
+  }
+  if (out.b2 <= out.b1)
+    return finish();
+
+  // ---- stage 2: prod (x^q - 1) over primes B1 < q <= B2 -----------------
+  // Step between consecutive primes with precomputed x^d for even gaps d.
+  auto first = std::upper_bound(primes.begin(), primes.end(),
+                                static_cast<std::uint32_t>(out.b1));
+  if (first == primes.end())
+    return finish();
+  std::uint32_t max_gap = 2;
+  for (auto it = first + 1; it != primes.end() && *it <= out.b2; ++it)
+    max_gap = std::max(max_gap, *it - *(it - 1));
+  std::deque<ScopedMpz> xd; // xd[i] = x^(2i)
+  xd.emplace_back(p + 1);   // d = 0 (unused)
+  xd.emplace_back(p + 1);
+  mod.mul(xd[1], x, x);
+  for (std::uint32_t d = 4; d <= max_gap; d += 2) {
+    xd.emplace_back(p + 1);
+    mod.mul(xd.back(), xd[d / 2 - 1], xd[1]);
+  }
+
+  ScopedMpz xq(p + 1), acc(p + 1), t(p + 1);
+  mod.pow_ui(xq, x, *first);
+  mpz_set_ui(acc, 1);
+  const std::size_t count = static_cast<std::size_t>(
+      std::upper_bound(first, primes.end(),
+                       static_cast<std::uint32_t>(out.b2)) -
+      first);
+  const std::size_t step_report = std::max<std::size_t>(1, count / 100);
+  for (std::size_t i = 0; i < count; ++i) {
+    const auto it = first + static_cast<std::ptrdiff_t>(i);
+    if (i > 0)
+      mod.mul(xq, xq, xd[(*it - *(it - 1)) / 2]);
+    mpz_sub_ui(t, xq, 1);
+    mod.mul(acc, acc, t);
+    if (cb && i % step_report == 0)
+      cb(2, double(i) / double(count));
+  }
+  if (cb)
+    cb(2, 1.0);
+
+  mpz_gcd(g, acc, mod.M());
+  out.factor = proper_factor(g, mod.M());
+  if (!out.factor.empty())
+    out.stage = 2;
+  return finish();
+}
+
+} // namespace ll
@@ -1,6 +1,11 @@
 // src/prime.cpp
 #include "ll/prime.hpp"
+#include <algorithm>
+#include <cmath>
 #include <cstdint>
+#include <cstring>
+#include <stdexcept>
+#include <vector>
 
 namespace ll {
 static inline std::uint64_t mod_mul(std::uint64_t a, std::uint64_t b,
@@ -66,4 +71,107 @@ bool is_prime_exponent(std::uint32_t p) noexcept {
   return true;
 }
 
+namespace {
+
+// Odd numbers 2q+1 are tracked by q; the wheel removes multiples of these
+// primes by copying a precomputed pattern whose period (in q) is their product.
+constexpr std::uint32_t kWheelPrimes[] = {3u, 5u, 7u, 11u, 13u};
+constexpr std::uint32_t kWheelPeriod = 3u * 5u * 7u * 11u * 13u;
+constexpr std::size_t kSegmentBytes = 1u << 16; // odd numbers per segment
+
+struct SieveTables {
+  std::vector<std::uint8_t> wheel; // two periods, so one memcpy never wraps
+  std::vector<std::uint32_t> base; // primes 17 <= q < 2^16
+};
+
+const SieveTables &sieve_tables() {
+  static const SieveTables t = [] {
+    SieveTables t;
+    t.wheel.resize(2 * kWheelPeriod);
+    for (std::uint32_t q = 0; q < 2 * kWheelPeriod; ++q) {
+      const std::uint32_t n = 2 * q + 1;
+      t.wheel[q] =
+          std::none_of(std::begin(kWheelPrimes), std::end(kWheelPrimes),
+                       [n](std::uint32_t w) { return n % w == 0; });
+    }
+    constexpr std::uint32_t kLimit = 1u << 16;
+    std::vector<std::uint8_t> composite(kLimit, 0);
+    for (std::uint32_t i = 2; i * i < kLimit; ++i)
+      if (!composite[i])
+        for (std::uint32_t j = i * i; j < kLimit; j += i)
+          composite[j] = 1;
+    for (std::uint32_t i = 17; i < kLimit; ++i)
+      if (!composite[i])
+        t.base.push_back(i);
+    return t;
+  }();
+  return t;
+}
+
+} // namespace
+
+std::vector<std::uint32_t> primes_in_range(std::uint64_t a, std::uint64_t b) {
+  constexpr std::uint64_t kMax = std::uint64_t{1} << 32;
+  if (b > kMax)
+    throw std::invalid_argument("primes_in_range: b must be <= 2^32");
+  std::vector<std::uint32_t> out;
+  if (b <= a || b <= 2)
+    return out;
+  const auto &tables = sieve_tables();
+
+  // estimated count (x / ln x) to avoid regrowth
+  const double span = static_cast<double>(b - a);
+  out.reserve(static_cast<std::size_t>(
+                  span / std::max(1.0, std::log(double(b)) - 1.1)) +
+              16);
+
+  // primes the wheel and the odd-only layout remove
+  for (std::uint32_t q : {2u, 3u, 5u, 7u, 11u, 13u})
+    if (q >= a && q < b)
+      out.push_back(q);
+
+  // odd numbers 2q+1 for q in [q_lo, q_hi)
+  const std::uint64_t q_lo = a / 2;
+  const std::uint64_t q_hi = b / 2; // 2*q_hi + 1 >= b
+  std::vector<std::uint8_t> seg(kSegmentBytes);
+  for (std::uint64_t s0 = q_lo; s0 < q_hi; s0 += kSegmentBytes) {
+    const std::size_t len = static_cast<std::size_t>(
+        std::min<std::uint64_t>(kSegmentBytes, q_hi - s0));
+
+    // wheel pattern
+    std::size_t filled = 0;
+    std::size_t off = static_cast<std::size_t>(s0 % kWheelPeriod);
+    while (filled < len) {
+      const std::size_t n = std::min<std::size_t>(len - filled, kWheelPeriod);
+      std::memcpy(seg.data() + filled, tables.wheel.data() + off, n);
+      filled += n;
+      off = (off + n) % kWheelPeriod;
+    }
+
+    // cross off odd multiples of the base primes, starting at q^2
+    const std::uint64_t lo = 2 * s0 + 1;         // first odd number
+    const std::uint64_t hi = 2 * (s0 + len) + 1; // past the last one
+    for (std::uint32_t q : tables.base) {
+      const std::uint64_t qq = std::uint64_t{q} * q;
+      if (qq >= hi)
+        break;
+      std::uint64_t m = std::max(qq, (lo + q - 1) / q * q);
+      if ((m & 1) == 0)
+        m += q;
+      for (std::uint64_t j = (m - lo) / 2; j < len; j += q)
+        seg[j] = 0;
+    }
+
+    for (std::size_t j = 0; j < len; ++j) {
+      if (!seg[j])
+        continue;
+      const std::uint64_t n = lo + 2 * j;
+      if (n < a || n < 17)
+        continue; // below the window; 1 and the wheel primes are handled above
+      out.push_back(static_cast<std::uint32_t>(n));
+    }
+  }
+  return out;
+}
+
 } // namespace ll
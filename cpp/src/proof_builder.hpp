@@ -0,0 +1,53 @@
+// src/proof_builder.hpp
+// Prover side of the PRP proofs (ll/proof.hpp); used by prp_test only.
+#pragma once
+#include "engine.hpp" // ScopedMpz
+
+#include <cstdint>
+#include <cstdio>
+#include <string>
+#include <vector>
+
+namespace ll {
+
+// Collects x_i for i = step, 2 step, ..., 2^power step (= span) in a scratch
+// file `path + ".points"` (one fixed-size record per residue, so a residue
+// recomputed after a Gerbicz rollback simply overwrites its record) and turns
+// them into the proof file at `path`. The scratch file is removed when the
+// builder goes away, whether or not a proof was written.
+class ProofBuilder {
+public:
+  ProofBuilder(std::uint32_t p, std::uint32_t power, std::string path);
+  ~ProofBuilder();
+  ProofBuilder(const ProofBuilder &) = delete;
+  ProofBuilder &operator=(const ProofBuilder &) = delete;
+
+  std::uint32_t step() const { return step_; }
+  std::uint32_t span() const { return step_ << power_; }
+  // True if x_i is one of the residues the proof needs.
+  bool wants(std::uint32_t i) const {
+    return i != 0 && i % step_ == 0 && i <= span();
+  }
+
+  // x = x_i (canonical, 0 <= x < M_p) for an i with wants(i).
+  void save(std::uint32_t i, mpz_srcptr x);
+
+  // Compute the middles and write the proof (to a temporary name, then
+  // renamed over `path`). Returns the proof size in bytes.
+  std::uint64_t finish();
+
+private:
+  void load(std::uint32_t index, mpz_ptr x);
+  void middle(std::uint32_t level, std::uint32_t first, std::uint32_t count,
+              std::uint32_t depth, mpz_ptr out);
+
+  std::uint32_t p_, power_, step_;
+  std::size_t nbytes_;
+  std::string path_, points_path_;
+  std::FILE *points_ = nullptr;
+  std::vector<std::uint64_t> r_; // challenges so far
+  std::vector<std::uint8_t> buf_;
+  ScopedMpz M_, wide_, hi_;
+};
+
+} // namespace ll
@@ -0,0 +1,250 @@
+// src/prp.cpp
+#include "ll/prp.hpp"
+#include "engine.hpp"
+#include "ll/prime.hpp"
+#include "ll/progress.hpp"
+#include "ll/proof.hpp"
+#include "proof_builder.hpp"
+
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <gmp.h>
+#include <memory>
+#include <stdexcept>
+#include <string>
+
+namespace ll {
+// Forward decl for the internal reducer (no public header exposure)
+void mersenne_reduce_once(mpz_t x, const mpz_t M, std::uint32_t p, mpz_t hi);
+} // namespace ll
+
+namespace ll {
+namespace {
+
+// Give up after this many failed re-runs from one verified state.
+inline constexpr unsigned kMaxConsecutiveRollbacks = 3;
+
+inline constexpr std::uint32_t kMinBlock = 16;
+inline constexpr std::uint32_t kMaxBlock = 1000;
+// Aim for at least this many checks per run, so a rollback loses little.
+inline constexpr std::uint32_t kMinChecks = 8;
+
+std::uint32_t isqrt32(std::uint32_t n) {
+  std::uint32_t r = 0;
+  while (static_cast<std::uint64_t>(r + 1) * (r + 1) <= n)
+    ++r;
+  return r;
+}
+
+std::uint32_t round_up(std::uint32_t v, std::uint32_t m) {
+  return (v + m - 1) / m * m;
+}
+
+// GMP-side arithmetic mod M_p for the (rare) products of the check.
+class ModM {
+public:
+  explicit ModM(std::uint32_t p)
+      : p_(p), M_(p + 1), hi_(p + 1), wide_(2 * p + 2) {
+    mpz_set_ui(M_, 0);
+    mpz_setbit(M_, p);
+    mpz_sub_ui(M_, M_, 1);
+  }
+  mpz_srcptr M() const { return M_; }
+
+  // r <- a * b (mod M_p); r may alias a or b.
+  void mul(mpz_ptr r, mpz_srcptr a, mpz_srcptr b) {
+    mpz_mul(wide_, a, b);
+    mersenne_reduce_once(wide_, M_, p_, hi_);
+    mpz_set(r, wide_);
+  }
+  void mul_ui(mpz_ptr r, mpz_srcptr a, unsigned long b) {
+    mpz_mul_ui(wide_, a, b);
+    mersenne_reduce_once(wide_, M_, p_, hi_);
+    mpz_set(r, wide_);
+  }
+
+private:
+  std::uint32_t p_;
+  ScopedMpz M_, hi_, wide_;
+};
+
+// n plain squarings of `from` on engine e; result into `to`.
+void square_n(SquareEngine &e, mpz_srcptr from, std::uint32_t n, mpz_ptr to) {
+  e.load(from);
+  for (std::uint32_t k = 0; k < n; ++k)
+    e.square_sub(0);
+  e.store(to);
+}
+
+} // namespace
+
+PRPResult prp_test(const PRPConfig &cfg) {
+  const std::uint32_t p = cfg.p;
+  if (p < 2 || !is_prime_exponent(p))
+    throw std::invalid_argument("exponent p must be prime");
+  if (cfg.proof_power &&
+      (cfg.proof_power > kMaxProofPower || (p >> cfg.proof_power) == 0))
+    throw std::invalid_argument("proof power must be 1.." +
+                                std::to_string(kMaxProofPower) +
+                                " with 2^power <= p");
+  if (cfg.proof_power && cfg.proof_path.empty())
+    throw std::invalid_argument("a proof needs proof_path");
+
+  const auto t0 = std::chrono::steady_clock::now();
+  PRPResult out;
+  out.p = p;
+  if (p == 2) {
+    // M_2 = 3 is prime (and divisible by the base, so no Fermat test)
+    out.is_probable_prime = true;
+    out.engine_info = "prp3:trivial";
+    return out;
+  }
+
+  const std::uint32_t L =
+      cfg.block ? cfg.block : std::clamp(isqrt32(p) / 2, kMinBlock, kMaxBlock);
+  const std::uint32_t m = p - p % L; // last multiple of L; the tail is doubled
+  const std::uint32_t C =
+      cfg.check_every
+          ? round_up(cfg.check_every, L)
+          : std::min<std::uint64_t>(static_cast<std::uint64_t>(L) * L,
+                                    std::max(L, round_up(p / kMinChecks, L)));
+  out.block = L;
+
+  auto engine = make_engine(cfg.engine, p);
+  auto verifier = make_engine(cfg.engine, p);
+  ModM mod(p);
+  ScopedMpz x(p + 1), d(p + 1), d_prev(p + 1), t(p + 1);
+  ScopedMpz good_x(p + 1), good_d(p + 1);
+  std::unique_ptr<ProofBuilder> proof;
+  if (cfg.proof_power)
+    proof = std::make_unique<ProofBuilder>(p, cfg.proof_power, cfg.proof_path);
+
+  // x_0 = 3 and d_0 = x_0; the initial state is verified by definition.
+  mpz_set_ui(x, 3);
+  mpz_set_ui(d, 3);
+  mpz_set(good_x, x);
+  mpz_set(good_d, d);
+  std::uint32_t good_i = 0;
+  engine->load(x);
+
+  const CancelToken *const cancel = cfg.cancel;
+  Progress *const progress = cfg.progress;
+  if (progress)
+    progress->start(0, p);
+  bool injected = false;
+  unsigned failures = 0;
+
+  auto fail = [&](const char *what) {
+    ++out.rollbacks;
+    if (++failures > kMaxConsecutiveRollbacks)
+      throw std::runtime_error(std::string("PRP: ") + what +
+                               " keeps failing; arithmetic is unreliable");
+  };
+
+  std::uint32_t i = 0;
+  while (i < m) {
+    if (cancel && cancel->cancelled()) {
+      out.cancelled = true;
+      break;
+    }
+    engine->square_sub(0);
+    ++i;
+    if (progress)
+      progress->set_iteration(i);
+
+    if (i == cfg.inject_error_at && !injected) {
+      injected = true;
+      engine->store(t);
+      mpz_add_ui(t, t, 1);
+      if (mpz_cmp(t, mod.M()) >= 0)
+        mpz_set_ui(t, 0);
+      engine->load(t);
+    }
+    // a residue re-run after a rollback overwrites the one saved before it
+    if (proof && proof->wants(i)) {
+      engine->store(t);
+      proof->save(i, t);
+    }
+
+    if (i % L != 0)
+      continue;
+    engine->store(x);
+    mpz_set(d_prev, d);
+    mod.mul(d, d, x);
+    if (i % C != 0 && i != m)
+      continue;
+
+    // Gerbicz check: d == x_0 * d_prev^(2^L)
+    square_n(*verifier, d_prev, L, t);
+    mod.mul_ui(t, t, 3);
+    if (mpz_cmp(t, d) == 0) {
+      mpz_set(good_x, x);
+      mpz_set(good_d, d);
+      good_i = i;
+      ++out.gerbicz_checks;
+      failures = 0;
+    } else {
+      fail("Gerbicz check");
+      mpz_set(x, good_x);
+      mpz_set(d, good_d);
+      i = good_i;
+      engine->load(x);
+    }
+  }
+
+  if (!out.cancelled) {
+    // Tail of p - m < L squarings: too short for a check, so run it twice,
+    // in pieces that end at the proof residues falling inside it.
+    mpz_set(x, good_x);
+    ScopedMpz y(p + 1);
+    for (std::uint32_t at = m; at < p;) {
+      std::uint32_t next = p;
+      if (proof && at < proof->span())
+        next = std::min(p, (at / proof->step() + 1) * proof->step());
+      while (true) {
+        square_n(*engine, x, next - at, y);
+        square_n(*verifier, x, next - at, t);
+        if (mpz_cmp(y, t) == 0)
+          break;
+        fail("tail double-check");
+      }
+      mpz_set(x, y);
+      at = next;
+      if (proof && proof->wants(at))
+        proof->save(at, x);
+    }
+    i = p;
+    if (progress)
+      progress->set_iteration(p);
+    ScopedMpz nine(8);
+    mpz_set_ui(nine, 9);
+    mpz_mod(nine, nine, mod.M());
+    out.is_probable_prime = mpz_cmp(x, nine) == 0;
+    out.res64 =
+        mpz_size(x) ? static_cast<std::uint64_t>(mpz_getlimbn(x, 0)) : 0;
+    if (proof) {
+      const auto tp = std::chrono::steady_clock::now();
+      out.proof_bytes = proof->finish();
+      out.proof_power = cfg.proof_power;
+      out.proof_ns = static_cast<std::uint64_t>(
+          std::chrono::duration_cast<std::chrono::nanoseconds>(
+              std::chrono::steady_clock::now() - tp)
+              .count());
+    }
+  }
+
+  out.iterations = i;
+  out.ns_elapsed = static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(
+          std::chrono::steady_clock::now() - t0)
+          .count());
+  out.engine_info = "prp3:" + engine->info() +
+                    ",gerbicz:L=" + std::to_string(L) +
+                    ",every=" + std::to_string(C);
+  if (out.proof_power)
+    out.engine_info += ",proof=2^" + std::to_string(out.proof_power);
+  return out;
+}
+
+} // namespace ll
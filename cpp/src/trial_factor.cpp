@@ -0,0 +1,322 @@
+// src/trial_factor.cpp
+#include "ll/factor.hpp"
+#include "ll/prime.hpp"
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdint>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace ll {
+namespace {
+
+using u64 = std::uint64_t;
+using u128 = unsigned __int128;
+
+// Sieve primes and k-segment size. Larger sieve limits remove more
+// candidates but cost more per segment; 2^14 is a good balance here.
+inline constexpr std::uint32_t kSievePrimeLimit = 1u << 14;
+inline constexpr std::size_t kSegment = 1u << 16;
+
+// Cost model for tf_default_bits (rough, per core): one surviving candidate
+// costs ~ log2(p) Montgomery squarings, one LL iteration ~ kLLIterNs(p).
+inline constexpr double kCandidateNsPerBit = 14.0;
+inline constexpr double kSieveSurvivors = 0.5 * 0.12; // mod-8 filter x sieve
+
+inline double ll_cost_ns(std::uint32_t p) {
+  // ~1.1 ms per iteration at p = 1M, scaling like p log p per squaring
+  const double x = static_cast<double>(p);
+  const double per_iter = 1.1e6 * (x / 1e6) * (std::log2(x) / std::log2(1e6));
+  return per_iter * x;
+}
+
+// 64-bit Montgomery arithmetic for odd q < 2^63.
+struct Mont {
+  u64 q = 1, qinv = 0, one = 0;
+  Mont() = default;
+  explicit Mont(u64 q_) : q(q_) {
+    u64 inv = q; // Newton: inv = q^{-1} mod 2^64
+    for (int i = 0; i < 6; ++i)
+      inv *= 2 - q * inv;
+    qinv = ~inv + 1;   // -q^{-1}
+    one = (0 - q) % q; // 2^64 mod q
+  }
+  u64 mul(u64 a, u64 b) const {
+    const u128 t = static_cast<u128>(a) * b;
+    const u64 m = static_cast<u64>(t) * qinv;
+    const u64 u = static_cast<u64>((t + static_cast<u128>(m) * q) >> 64);
+    return u >= q ? u - q : u;
+  }
+  u64 dbl(u64 a) const {
+    const u64 r = a << 1; // a < q < 2^63, no overflow
+    return r >= q ? r - q : r;
+  }
+};
+
+// 2^p == 1 (mod q) ?
+bool divides_mersenne(std::uint32_t p, u64 q) {
+  const Mont m(q);
+  u64 x = m.one;
+  for (int b = 31 - __builtin_clz(p); b >= 0; --b) {
+    x = m.mul(x, x);
+    if ((p >> b) & 1u)
+      x = m.dbl(x);
+  }
+  return x == m.one;
+}
+
+// Lane i: 2^p[i] == 1 (mod q[i]) ? The n <= kPrescreenLanes chains run in
+// lockstep over the longest exponent; leading zero bits of a shorter p keep
+// its x at one, and the conditional doubling is a select, not a branch.
+void divides_mersenne_lanes(const std::uint32_t *p, const u64 *q, std::size_t n,
+                            bool *hit) {
+  Mont m[kPrescreenLanes];
+  u64 x[kPrescreenLanes];
+  std::uint32_t top = 1;
+  for (std::size_t i = 0; i < n; ++i) {
+    m[i] = Mont(q[i]);
+    x[i] = m[i].one;
+    top = std::max(top, p[i]);
+  }
+  for (int b = 31 - __builtin_clz(top); b >= 0; --b) {
+    for (std::size_t i = 0; i < n; ++i) {
+      const u64 sq = m[i].mul(x[i], x[i]);
+      const u64 d = m[i].dbl(sq);
+      x[i] = ((p[i] >> b) & 1u) ? d : sq;
+    }
+  }
+  for (std::size_t i = 0; i < n; ++i)
+    hit[i] = x[i] == m[i].one;
+}
+
+const std::vector<std::uint32_t> &sieve_primes() {
+  static const std::vector<std::uint32_t> primes = [] {
+    std::vector<bool> comp(kSievePrimeLimit, false);
+    std::vector<std::uint32_t> out;
+    for (std::uint32_t i = 3; i < kSievePrimeLimit; i += 2) {
+      if (comp[i])
+        continue;
+      out.push_back(i);
+      for (std::uint64_t j = std::uint64_t{i} * i; j < kSievePrimeLimit;
+           j += 2 * i)
+        comp[j] = true;
+    }
+    return out;
+  }();
+  return primes;
+}
+
+u64 inv_mod(u64 a, u64 m) { // m prime, a != 0 (mod m)
+  std::int64_t t = 0, nt = 1;
+  std::int64_t r = static_cast<std::int64_t>(m),
+               nr = static_cast<std::int64_t>(a % m);
+  while (nr != 0) {
+    const std::int64_t qq = r / nr;
+    std::swap(t, nt);
+    nt -= qq * t;
+    std::swap(r, nr);
+    nr -= qq * r;
+  }
+  return static_cast<u64>(t < 0 ? t + static_cast<std::int64_t>(m) : t);
+}
+
+} // namespace
+
+unsigned tf_default_bits(std::uint32_t p) noexcept {
+  const double ll = ll_cost_ns(p);
+  const double per_candidate = kCandidateNsPerBit * std::log2(double(p));
+  unsigned bits = 1;
+  while (static_cast<u64>(2) * p + 1 >= (u64{1} << bits))
+    ++bits; // first level that contains q = 2p + 1
+  for (; bits < kTrialFactorMaxBits; ++bits) {
+    const unsigned b = bits + 1; // level [2^bits, 2^b)
+    const double ks = std::ldexp(1.0, static_cast<int>(bits)) / (2.0 * p);
+    if (ks * kSieveSurvivors * per_candidate > ll / b)
+      break;
+  }
+  return bits;
+}
+
+TFResult trial_factor(const TFConfig &cfg) {
+  const std::uint32_t p = cfg.p;
+  if (p < 3 || !is_prime_exponent(p))
+    throw std::invalid_argument("exponent p must be an odd prime");
+  const unsigned max_bits = cfg.max_bits ? cfg.max_bits : tf_default_bits(p);
+  if (max_bits > kTrialFactorMaxBits)
+    throw std::invalid_argument("trial factoring is limited to 63 bits");
+
+  const auto t0 = std::chrono::steady_clock::now();
+  TFResult out;
+  out.p = p;
+  out.bits = std::max(max_bits, cfg.min_bits);
+
+  // q in [2^min_bits, q_end) with q_end = min(2^max_bits, M_p): M_p itself is
+  // of the form 2kp + 1 and must not be reported as its own factor.
+  const u64 two_p = 2 * static_cast<u64>(p);
+  u64 q_end = u64{1} << max_bits;
+  if (p < 63)
+    q_end = std::min(q_end, (u64{1} << p) - 1);
+  const u64 q_begin = cfg.min_bits ? (u64{1} << cfg.min_bits) : 0;
+  if (q_begin >= q_end)
+    return out;
+
+  u64 k = q_begin > 1 ? (q_begin - 1 + two_p - 1) / two_p : 1;
+  k = std::max<u64>(k, 1);
+  const u64 k_end = (q_end - 2) / two_p + 1; // 2kp + 1 < q_end
+
+  // Per sieve prime r, k == root_r (mod r) makes r | 2kp + 1. Only primes
+  // below 2p + 1 are used, so a sieved q is never r itself.
+  std::vector<std::uint32_t> rs, next;
+  for (std::uint32_t r : sieve_primes()) {
+    if (r == p)
+      continue;
+    if (r >= two_p + 1)
+      break;
+    const u64 root = (r - inv_mod(two_p % r, r)) % r;
+    rs.push_back(r);
+    next.push_back(static_cast<std::uint32_t>(
+        (root + r - static_cast<u64>(k % r)) % r)); // offset from k
+  }
+
+  std::vector<std::uint8_t> alive(kSegment);
+  for (u64 base = k; base < k_end; base += kSegment) {
+    const std::size_t len =
+        static_cast<std::size_t>(std::min<u64>(kSegment, k_end - base));
+    std::fill(alive.begin(), alive.begin() + len, std::uint8_t{1});
+    for (std::size_t i = 0; i < rs.size(); ++i) {
+      const std::uint32_t r = rs[i];
+      std::size_t j = next[i];
+      for (; j < len; j += r)
+        alive[j] = 0;
+      next[i] = static_cast<std::uint32_t>(j - len); // carry into next segment
+    }
+    for (std::size_t j = 0; j < len; ++j) {
+      if (!alive[j])
+        continue;
+      const u64 kk = base + j;
+      const u64 q = two_p * kk + 1;
+      if ((q & 7) != 1 && (q & 7) != 7)
+        continue;
+      ++out.tested;
+      if (divides_mersenne(p, q)) {
+        out.factor = q;
+        out.k = kk;
+        out.bits = static_cast<unsigned>(64 - __builtin_clzll(q));
+        goto done;
+      }
+    }
+  }
+
+done:
+  out.ns_elapsed = static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(
+          std::chrono::steady_clock::now() - t0)
+          .count());
+  return out;
+}
+
+PrescreenResult prescreen(const std::vector<std::uint32_t> &ps,
+                          std::uint32_t max_k) {
+  for (std::uint32_t p : ps)
+    if (!is_prime_exponent(p))
+      throw std::invalid_argument("exponent " + std::to_string(p) +
+                                  " is not prime");
+  if (max_k >= (1u << 30))
+    throw std::invalid_argument("max_k must be below 2^30 (q < 2^63)");
+
+  const auto t0 = std::chrono::steady_clock::now();
+  PrescreenResult out;
+  out.p = ps;
+  out.factor.assign(ps.size(), 0);
+  out.k.assign(ps.size(), 0);
+  out.rule.assign(ps.size(), static_cast<std::uint8_t>(PrescreenRule::None));
+
+  static constexpr std::uint32_t kSmall[] = {3,  5,  7,  11, 13, 17, 19, 23, 29,
+                                             31, 37, 41, 43, 47, 53, 59, 61};
+  constexpr std::size_t nsmall = sizeof(kSmall) / sizeof(kSmall[0]);
+  constexpr std::uint8_t kNoRoot = 0xFF;
+  // r | 2kp + 1 exactly when k == -(2p)^-1 (mod r): one root per (p, r), so
+  // the filter below is a byte compare per small prime rather than a division.
+  std::vector<std::uint8_t> roots(ps.size() * nsmall, kNoRoot);
+  std::vector<std::size_t> alive;
+  for (std::size_t i = 0; i < ps.size(); ++i) {
+    if (ps[i] <= 2)
+      continue;
+    alive.push_back(i);
+    for (std::size_t j = 0; j < nsmall; ++j) {
+      const std::uint32_t r = kSmall[j];
+      if (ps[i] % r != 0)
+        roots[i * nsmall + j] =
+            static_cast<std::uint8_t>((r - inv_mod(2 * u64{ps[i]} % r, r)) % r);
+    }
+  }
+  std::uint8_t kmod[nsmall];
+
+  // k ascending, so each exponent keeps its smallest certificate; the
+  // candidates of one k are gathered across all live exponents and tested
+  // in full lanes.
+  std::vector<std::size_t> cand;
+  std::vector<std::uint32_t> cp;
+  std::vector<u64> cq;
+  for (std::uint32_t k = 1; k <= max_k && !alive.empty(); ++k) {
+    cand.clear();
+    cp.clear();
+    cq.clear();
+    for (std::size_t j = 0; j < nsmall; ++j)
+      kmod[j] = static_cast<std::uint8_t>(k % kSmall[j]);
+    for (std::size_t i : alive) {
+      const std::uint32_t p = ps[i];
+      const u64 q = 2 * u64{k} * p + 1;
+      if ((q & 7) != 1 && (q & 7) != 7)
+        continue;
+      if (p < 64 && q >= (u64{1} << p) - 1)
+        continue; // M_p itself (or beyond) is no certificate
+      // a q with a prime factor r < 64 (other than q = r itself) cannot be
+      // the smallest factor: r's own candidate, at a smaller k, comes first
+      const std::uint8_t *root = &roots[i * nsmall];
+      bool small = false;
+      for (std::size_t j = 0; j < nsmall; ++j)
+        small |= root[j] == kmod[j] && q != kSmall[j];
+      if (small)
+        continue;
+      cand.push_back(i);
+      cp.push_back(p);
+      cq.push_back(q);
+    }
+    out.tested += cand.size();
+
+    bool hit[kPrescreenLanes];
+    bool any = false;
+    for (std::size_t j = 0; j < cand.size(); j += kPrescreenLanes) {
+      const std::size_t n =
+          std::min<std::size_t>(kPrescreenLanes, cand.size() - j);
+      divides_mersenne_lanes(&cp[j], &cq[j], n, hit);
+      for (std::size_t l = 0; l < n; ++l) {
+        if (!hit[l])
+          continue;
+        const std::size_t i = cand[j + l];
+        out.factor[i] = cq[j + l];
+        out.k[i] = k;
+        out.rule[i] = static_cast<std::uint8_t>(
+            k == 1 ? PrescreenRule::Euler : PrescreenRule::SmallFactor);
+        any = true;
+      }
+    }
+    if (any)
+      alive.erase(
+          std::remove_if(alive.begin(), alive.end(),
+                         [&](std::size_t i) { return out.factor[i] != 0; }),
+          alive.end());
+  }
+
+  out.ns_elapsed = static_cast<std::uint64_t>(
+      std::chrono::duration_cast<std::chrono::nanoseconds>(
+          std::chrono::steady_clock::now() - t0)
+          .count());
+  return out;
+}
+
+} // namespace ll
@@ -0,0 +1,113 @@
+#include "ll/checkpoint.hpp"
+#include "ll/ll.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <cstdio>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace {
+std::string tmp_path(const char *name) {
+  return std::string(P_tmpdir) + "/" + name;
+}
+} // namespace
+
+TEST_CASE("Checkpoint round-trips and rejects corruption") {
+  const std::string path = tmp_path("ll_ck_roundtrip.ckpt");
+  std::remove(path.c_str());
+  REQUIRE_FALSE(ll::load_checkpoint(path).has_value());
+
+  ll::Checkpoint ck{127, 42, {0x0123456789abcdefull, 0x7fffull}};
+  ll::save_checkpoint(path, ck);
+  auto back = ll::load_checkpoint(path);
+  REQUIRE(back.has_value());
+  REQUIRE(back->p == 127);
+  REQUIRE(back->iteration == 42);
+  REQUIRE(back->limbs == ck.limbs);
+
+  // flip one residue byte
+  std::FILE *f = std::fopen(path.c_str(), "r+b");
+  REQUIRE(f != nullptr);
+  std::fseek(f, 30, SEEK_SET);
+  std::fputc(0x5a, f);
+  std::fclose(f);
+  REQUIRE_THROWS_AS(ll::load_checkpoint(path), std::runtime_error);
+  std::remove(path.c_str());
+}
+
+TEST_CASE("Cancelled run resumes to the same result and digests") {
+  using ll::LLConfig; using ll::ResidueDigest;
+  const std::uint32_t p = 1279; // M_1279 is prime
+  const std::string path = tmp_path("ll_ck_resume.ckpt");
+  std::remove(path.c_str());
+
+  std::vector<ResidueDigest> full;
+  ll::ll_test(LLConfig{p, true, 100},
+              [&](std::uint32_t, const ResidueDigest &d) { full.push_back(d); });
+
+  LLConfig cfg{p, true, 100};
+  cfg.checkpoint_path = path;
+
+  // Cancel from the callback after 5 progress reports.
+  std::vector<ResidueDigest> seen;
+  REQUIRE_THROWS_AS(
+      ll::ll_test(cfg,
+                  [&](std::uint32_t, const ResidueDigest &d) {
+                    seen.push_back(d);
+                    if (seen.size() == 5)
+                      throw std::runtime_error("cancelled");
+                  }),
+      std::runtime_error);
+  auto ck = ll::load_checkpoint(path);
+  REQUIRE(ck.has_value());
+  REQUIRE(ck->iteration == 500);
+
+  auto res = ll::ll_resume(
+      cfg, [&](std::uint32_t, const ResidueDigest &d) { seen.push_back(d); });
+  REQUIRE(res.is_prime);
+  REQUIRE(res.resumed_from == 500);
+  REQUIRE(seen.size() == full.size());
+  for (std::size_t i = 0; i < full.size(); ++i)
+    REQUIRE(seen[i].bytes == full[i].bytes);
+
+  // A checkpoint for another exponent is refused.
+  cfg.p = 1277;
+  REQUIRE_THROWS_AS(ll::ll_resume(cfg), std::runtime_error);
+  std::remove(path.c_str());
+}
+
+TEST_CASE("Cancel token stops a run with resumable partial state") {
+  using ll::LLConfig;
+  const std::uint32_t p = 1279;
+  const std::string path = tmp_path("ll_ck_token.ckpt");
+  std::remove(path.c_str());
+
+  // a token tripped from the progress callback halts before the next squaring
+  ll::CancelToken token;
+  LLConfig cfg{p, true, 100};
+  cfg.cancel = &token;
+  auto part = ll::ll_test(cfg, [&](std::uint32_t i, const ll::ResidueDigest &) {
+    if (i + 1 == 300) token.cancel();
+  });
+  REQUIRE(part.cancelled);
+  REQUIRE_FALSE(part.is_prime);
+  REQUIRE(part.completed == 300);
+  REQUIRE_FALSE(part.residue.empty());
+
+  // the returned state is a valid checkpoint
+  ll::save_checkpoint(path, ll::Checkpoint{p, 300, part.residue});
+  token.reset();
+  LLConfig more{p};
+  more.checkpoint_path = path;
+  more.cancel = &token;
+  auto res = ll::ll_resume(more);
+  REQUIRE_FALSE(res.cancelled);
+  REQUIRE(res.is_prime);
+  REQUIRE(res.resumed_from == 300);
+  REQUIRE(res.completed == p - 2);
+
+  // an already-cancelled token does no work
+  token.cancel();
+  REQUIRE(ll::ll_test(LLConfig{p, false, 0, ll::Engine::Auto, "", 60, nullptr, &token}).completed == 0);
+  std::remove(path.c_str());
+}
@@ -0,0 +1,88 @@
+#include "ll/decimal.hpp"
+#include "ll/hash.hpp"
+#include <algorithm>
+#include <catch2/catch_test_macros.hpp>
+#include <cstdio>
+#include <fstream>
+#include <gmp.h>
+#include <iterator>
+#include <stdexcept>
+#include <string>
+
+namespace {
+
+std::string read_file(const std::string &path) {
+  std::ifstream in(path, std::ios::binary);
+  return {std::istreambuf_iterator<char>(in), std::istreambuf_iterator<char>()};
+}
+
+std::string mersenne_str(std::uint32_t p) {
+  mpz_t m;
+  mpz_init(m);
+  mpz_setbit(m, p);
+  mpz_sub_ui(m, m, 1);
+  std::string s(mpz_sizeinbase(m, 10) + 2, '\0');
+  mpz_get_str(s.data(), 10, m);
+  s.resize(std::char_traits<char>::length(s.data()));
+  mpz_clear(m);
+  return s;
+}
+
+} // namespace
+
+TEST_CASE("Streamed decimal export matches mpz_get_str and hashes the file") {
+  const std::string path = "ll_test_decimal.txt";
+  // single leaf, several levels, and a leading chunk shorter than a leaf
+  for (std::uint32_t p : {1u, 2u, 31u, 127u, 4423u, 86243u, 216091u}) {
+    auto res = ll::write_mersenne_decimal(ll::DecimalExportConfig{p, path});
+    const std::string file = read_file(path);
+    REQUIRE(file == mersenne_str(p) + "\n");
+    REQUIRE(res.digits == file.size() - 1);
+    REQUIRE(res.digits == ll::mersenne_decimal_digits(p));
+    REQUIRE(res.bytes == file.size());
+    REQUIRE(res.sha256.bytes == ll::make_residue_digest(file).bytes);
+  }
+  std::remove(path.c_str());
+}
+
+TEST_CASE("Decimal export reports progress, honours the ceiling and cleans up") {
+  const std::string path = "ll_test_decimal.txt";
+  std::uint64_t last = 0, calls = 0;
+  auto res = ll::write_mersenne_decimal(
+      ll::DecimalExportConfig{6972593, path},
+      [&](std::uint64_t done, std::uint64_t total) {
+        REQUIRE(done >= last);
+        REQUIRE(total == 2098960);
+        last = done;
+        ++calls;
+      });
+  REQUIRE(calls >= 2);
+  REQUIRE(last == res.digits);
+
+  REQUIRE_THROWS_AS(ll::write_mersenne_decimal(ll::DecimalExportConfig{6972593, path, 1u << 20}),
+                    std::length_error);
+  REQUIRE_THROWS_AS(ll::write_mersenne_decimal(ll::DecimalExportConfig{0, path}),
+                    std::invalid_argument);
+
+  // a callback that throws cancels the export and removes the partial file
+  REQUIRE_THROWS_AS(ll::write_mersenne_decimal(
+                        ll::DecimalExportConfig{6972593, path},
+                        [](std::uint64_t, std::uint64_t) { throw std::runtime_error("stop"); }),
+                    std::runtime_error);
+  REQUIRE_FALSE(std::ifstream(path).good());
+}
+
+TEST_CASE("Incremental SHA-256 matches the one-shot digest") {
+  std::string data;
+  for (int i = 0; i < 1000; ++i)
+    data += std::to_string(i * 7919);
+  for (std::size_t piece : {1u, 7u, 63u, 64u, 65u, 1000u}) {
+    ll::Sha256 h;
+    for (std::size_t at = 0; at < data.size(); at += piece)
+      h.update(data.data() + at, std::min(piece, data.size() - at));
+    REQUIRE(h.finish().bytes == ll::make_residue_digest(data).bytes);
+  }
+  // FIPS 180-2 "abc"
+  REQUIRE(ll::to_hex(ll::make_residue_digest(std::string("abc"))) ==
+          "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad");
+}
@@ -0,0 +1,79 @@
+#include "ll/ll.hpp"
+#include "ll/prp.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <stdexcept>
+#include <vector>
+
+TEST_CASE("IBDWT engine agrees with GMP on known exponents") {
+  using ll::Engine; using ll::LLConfig; using ll::ll_test;
+
+  // Mersenne prime exponents, including a few large enough for multi-level FFTs
+  for (auto p : {3u,5u,7u,13u,31u,61u,89u,107u,127u,521u,607u,1279u,2203u}) {
+    auto res = ll_test(LLConfig{p, false, 0, Engine::Ibdwt});
+    REQUIRE(res.is_prime);
+    REQUIRE(res.final_residue_is_zero);
+  }
+
+  // Prime exponents where M_p is composite
+  for (auto p : {11u,23u,29u,37u,523u,1277u,2207u}) {
+    auto res = ll_test(LLConfig{p, false, 0, Engine::Ibdwt});
+    REQUIRE_FALSE(res.is_prime);
+  }
+}
+
+TEST_CASE("IBDWT and GMP produce identical progress digests") {
+  using ll::Engine; using ll::LLConfig; using ll::ll_test;
+  const std::uint32_t p = 4423;
+
+  auto collect = [p](Engine e) {
+    std::vector<ll::ResidueDigest> out;
+    auto res = ll_test(LLConfig{p, true, 50, e},
+                       [&](std::uint32_t, const ll::ResidueDigest &d) {
+                         out.push_back(d);
+                       });
+    REQUIRE(res.is_prime);
+    return out;
+  };
+
+  auto gmp = collect(Engine::Gmp);
+  auto fft = collect(Engine::Ibdwt);
+  REQUIRE(gmp.size() == fft.size());
+  for (std::size_t i = 0; i < gmp.size(); ++i)
+    REQUIRE(gmp[i].bytes == fft[i].bytes);
+}
+
+TEST_CASE("Engine names and engine_info") {
+  using ll::Engine; using ll::LLConfig; using ll::ll_test;
+  REQUIRE(ll::engine_from_string("auto") == Engine::Auto);
+  REQUIRE(ll::engine_from_string("gmp") == Engine::Gmp);
+  REQUIRE(ll::engine_from_string("ibdwt") == Engine::Ibdwt);
+  REQUIRE_THROWS_AS(ll::engine_from_string("cuda"), std::invalid_argument);
+
+  auto small = ll_test(LLConfig{31u, false});
+  REQUIRE(small.engine_info.rfind("gmp:", 0) == 0);
+
+  auto forced = ll_test(LLConfig{31u, false, 0, Engine::Ibdwt});
+  REQUIRE(forced.engine_info.rfind("ibdwt:", 0) == 0);
+}
+
+TEST_CASE("mpn engine agrees with GMP, including the c = 0 wrap cases") {
+  using ll::Engine; using ll::LLConfig; using ll::ll_test;
+
+  for (auto p : {3u,5u,7u,11u,13u,23u,31u,61u,89u,127u,521u,523u,607u,1279u,2203u,2207u}) {
+    auto gmp = ll_test(LLConfig{p, false, 0, Engine::Gmp});
+    auto mpn = ll_test(LLConfig{p, false, 0, Engine::Mpn});
+    REQUIRE(mpn.is_prime == gmp.is_prime);
+    REQUIRE(mpn.engine_info.rfind("mpn:", 0) == 0);
+  }
+
+  // p = 61 and 4423 put bit p in different positions within the top limb;
+  // 64-bit aligned tails are covered by p = 127 (r = 63) above.
+  for (auto p : {61u, 4423u, 9941u}) {
+    auto gmp = ll::prp_test(ll::PRPConfig{p, Engine::Gmp});
+    auto mpn = ll::prp_test(ll::PRPConfig{p, Engine::Mpn});
+    REQUIRE(mpn.res64 == gmp.res64);
+    REQUIRE(mpn.is_probable_prime == gmp.is_probable_prime);
+  }
+
+  REQUIRE(ll::engine_from_string("mpn") == Engine::Mpn);
+}
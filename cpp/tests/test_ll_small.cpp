@@ -1,6 +1,8 @@
 #include "ll/ll.hpp"
+#include "ll/prime.hpp"
 #include <catch2/catch_test_macros.hpp>
 #include <stdexcept>
+#include <vector>
 
 TEST_CASE("Truth table: known primes/composites for M_p") {
   using ll::LLConfig; using ll::ll_test;
@@ -35,3 +37,44 @@ TEST_CASE("p == 2 fast path") {
   REQUIRE(res.is_prime);
   REQUIRE(res.iterations == 0);
 }
+
+TEST_CASE("Batch kernel matches single tests") {
+  using ll::LLBatchConfig; using ll::LLConfig;
+  std::vector<std::uint32_t> ps;
+  for (std::uint32_t p = 2; p < 1300; ++p)
+    if (ll::is_prime_exponent(p)) ps.push_back(p);
+
+  for (unsigned threads : {1u, 3u}) {
+    LLBatchConfig cfg;
+    cfg.threads = threads;
+    auto res = ll::ll_test_many(ps, cfg);
+    REQUIRE(res.p == ps);
+    for (std::size_t k = 0; k < ps.size(); ++k) {
+      REQUIRE(res.done[k] == 1);
+      REQUIRE(bool(res.is_prime[k]) == ll::ll_test(LLConfig{ps[k], false}).is_prime);
+    }
+  }
+
+  // IBDWT-sized exponents go through their own engine
+  LLBatchConfig ibdwt;
+  ibdwt.engine = ll::Engine::Ibdwt;
+  auto res = ll::ll_test_many({127u, 521u, 523u}, ibdwt);
+  REQUIRE((res.is_prime == std::vector<std::uint8_t>{1, 1, 0}));
+
+  REQUIRE_THROWS_AS(ll::ll_test_many({7u, 9u}), std::invalid_argument);
+
+  ll::CancelToken token;
+  token.cancel();
+  LLBatchConfig stopped;
+  stopped.cancel = &token;
+  auto none = ll::ll_test_many({127u, 521u}, stopped);
+  REQUIRE((none.done == std::vector<std::uint8_t>{0, 0}));
+}
+
+TEST_CASE("time_squarings runs the bare step loop on the requested engine") {
+  auto gmp = ll::time_squarings(9941, 20, ll::Engine::Gmp);
+  REQUIRE(gmp.engine_info.rfind("gmp:", 0) == 0);
+  auto fft = ll::time_squarings(9941, 20, ll::Engine::Ibdwt);
+  REQUIRE(fft.engine_info.rfind("ibdwt:", 0) == 0);
+  REQUIRE_THROWS_AS(ll::time_squarings(9, 10), std::invalid_argument);
+}
@@ -1,6 +1,9 @@
 #include "ll/ll.hpp"
+#include "ll/progress.hpp"
 #include <catch2/catch_test_macros.hpp>
 #include <atomic>
+#include <stdexcept>
+#include <thread>
 
 TEST_CASE("Progress callback fires once per iteration") {
   using ll::LLConfig; using ll::ResidueDigest; using ll::ll_test;
@@ -13,3 +16,47 @@ TEST_CASE("Progress callback fires once per iteration") {
   REQUIRE(res.p == p);
   REQUIRE(hits.load() == p - 2);
 }
+
+TEST_CASE("Progress channel tracks, digests and cancels without a callback") {
+  using ll::LLConfig; using ll::Progress; using ll::ResidueDigest;
+  const std::uint32_t p = 1279;
+
+  // full run: counter reaches the end, no digest unless asked for
+  Progress done;
+  LLConfig cfg{p};
+  cfg.progress = &done;
+  REQUIRE(ll::ll_test(cfg).is_prime);
+  REQUIRE(done.total() == p - 2);
+  REQUIRE(done.iteration() == p - 2);
+  REQUIRE_FALSE(done.digest().has_value());
+
+  // a digest requested up front is served at iteration 1 and matches the
+  // callback digest of the same iteration
+  ResidueDigest first{};
+  ll::ll_test(LLConfig{p, true, 1}, [&](std::uint32_t i, const ResidueDigest &d) {
+    if (i == 0) first = d;
+  });
+  Progress asked;
+  asked.request_digest();
+  cfg.progress = &asked;
+  ll::ll_test(cfg);
+  auto d = asked.digest();
+  REQUIRE(d.has_value());
+  REQUIRE(d->iteration == 1);
+  REQUIRE(d->digest.bytes == first.bytes);
+  REQUIRE(asked.digest_seq() == 1);
+
+  // cancel from another thread stops the run (p large enough to outlast
+  // the observer's reaction time)
+  Progress stop;
+  cfg.p = 44497;
+  cfg.progress = &stop;
+  std::thread t([&] {
+    while (stop.iteration() < 100) std::this_thread::yield();
+    stop.cancel();
+  });
+  REQUIRE_THROWS_AS(ll::ll_test(cfg), std::runtime_error);
+  t.join();
+  REQUIRE(stop.iteration() >= 100);
+  REQUIRE(stop.iteration() < cfg.p - 2);
+}
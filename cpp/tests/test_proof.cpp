@@ -0,0 +1,134 @@
+#include "ll/hash.hpp"
+#include "ll/proof.hpp"
+#include "ll/prp.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <cstdio>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace {
+std::string tmp_path(const char *name) {
+  return std::string(P_tmpdir) + "/" + name;
+}
+
+bool exists(const std::string &path) {
+  std::FILE *f = std::fopen(path.c_str(), "rb");
+  if (f)
+    std::fclose(f);
+  return f != nullptr;
+}
+
+std::vector<std::uint8_t> read_all(const std::string &path) {
+  std::vector<std::uint8_t> buf;
+  std::FILE *f = std::fopen(path.c_str(), "rb");
+  for (int c; (c = std::fgetc(f)) != EOF;)
+    buf.push_back(static_cast<std::uint8_t>(c));
+  std::fclose(f);
+  return buf;
+}
+
+void write_all(const std::string &path, const std::vector<std::uint8_t> &buf) {
+  std::FILE *f = std::fopen(path.c_str(), "wb");
+  std::fwrite(buf.data(), 1, buf.size(), f);
+  std::fclose(f);
+}
+} // namespace
+
+TEST_CASE("PRP proof verifies to the test's verdict and residue") {
+  const std::string path = tmp_path("ll_proof.prf");
+  // p = 4423 prime, 4457 composite; powers with and without a tail
+  for (std::uint32_t p : {4423u, 4457u}) {
+    for (std::uint32_t power : {1u, 3u, 6u}) {
+      ll::PRPConfig cfg{p};
+      cfg.proof_power = power;
+      cfg.proof_path = path;
+      auto res = ll::prp_test(cfg);
+      REQUIRE(res.proof_power == power);
+      REQUIRE(res.proof_bytes > 0);
+      REQUIRE_FALSE(exists(path + ".points"));
+
+      auto v = ll::verify_prp_proof(path);
+      REQUIRE(v.p == p);
+      REQUIRE(v.power == power);
+      REQUIRE(v.valid);
+      REQUIRE(v.is_probable_prime == res.is_probable_prime);
+      REQUIRE(v.res64 == res.res64);
+      REQUIRE(v.squarings == (p >> power) + p % (1u << power));
+    }
+  }
+  std::remove(path.c_str());
+}
+
+TEST_CASE("PRP proof survives a Gerbicz rollback") {
+  const std::string path = tmp_path("ll_proof_rollback.prf");
+  ll::PRPConfig cfg{4423};
+  cfg.proof_power = 5;
+  cfg.proof_path = path;
+  cfg.block = 50;
+  cfg.check_every = 500;
+  cfg.inject_error_at = 777; // between two saved residues, before a check
+  auto res = ll::prp_test(cfg);
+  REQUIRE(res.rollbacks == 1);
+  auto v = ll::verify_prp_proof(path);
+  REQUIRE(v.valid);
+  REQUIRE(v.is_probable_prime);
+  std::remove(path.c_str());
+}
+
+TEST_CASE("PRP proof rejects tampering") {
+  const std::string path = tmp_path("ll_proof_tamper.prf");
+  ll::PRPConfig cfg{4457};
+  cfg.proof_power = 4;
+  cfg.proof_path = path;
+  ll::prp_test(cfg);
+  const auto good = read_all(path);
+
+  // a flipped residue bit with the checksum left alone: corrupt file
+  auto bad = good;
+  bad[24 + 1000] ^= 1;
+  write_all(path, bad);
+  REQUIRE_THROWS_AS(ll::verify_prp_proof(path), std::runtime_error);
+
+  // the same flip in B, M_0 or the last middle with a fixed-up checksum: a
+  // well-formed proof that does not verify
+  const std::size_t n = (4457 + 63) / 64 * 8, body = good.size() - 32;
+  for (std::size_t at : {std::size_t{24}, 24 + n, 24 + 4 * n}) {
+    bad = good;
+    bad[at + 3] ^= 0x10;
+    const auto d = ll::make_residue_digest(bad.data(), body);
+    std::copy(d.bytes.begin(), d.bytes.end(), bad.begin() + static_cast<long>(body));
+    write_all(path, bad);
+    REQUIRE_FALSE(ll::verify_prp_proof(path).valid);
+  }
+
+  bad = good;
+  bad.resize(good.size() - 1);
+  write_all(path, bad);
+  REQUIRE_THROWS_AS(ll::verify_prp_proof(path), std::runtime_error);
+  std::remove(path.c_str());
+}
+
+TEST_CASE("PRP proof settings are validated") {
+  ll::PRPConfig cfg{4423};
+  cfg.proof_power = ll::kMaxProofPower + 1;
+  cfg.proof_path = tmp_path("ll_proof_bad.prf");
+  REQUIRE_THROWS_AS(ll::prp_test(cfg), std::invalid_argument);
+  cfg.proof_power = 3;
+  cfg.proof_path.clear();
+  REQUIRE_THROWS_AS(ll::prp_test(cfg), std::invalid_argument);
+  cfg = ll::PRPConfig{7};
+  cfg.proof_power = 3; // 2^3 > 7
+  cfg.proof_path = tmp_path("ll_proof_bad.prf");
+  REQUIRE_THROWS_AS(ll::prp_test(cfg), std::invalid_argument);
+
+  REQUIRE(ll::proof_default_power(2) == 0);
+  // no proof while verifying it would cost more than 1% of the test
+  REQUIRE(ll::proof_default_power(4423) == 0);
+  REQUIRE(ll::proof_default_power(1600033) == 0);
+  REQUIRE(ll::proof_default_power(1700021) >= 1);
+  REQUIRE(ll::proof_default_power(4000037) > ll::proof_default_power(1700021));
+  // huge exponents keep a proof, at whatever power the scratch file allows
+  REQUIRE(ll::proof_default_power(100000007) >= 1);
+  REQUIRE(ll::proof_default_power(4000000007u) <= ll::kMaxProofPower);
+}
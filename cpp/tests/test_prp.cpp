@@ -0,0 +1,59 @@
+#include "ll/ll.hpp"
+#include "ll/prp.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <stdexcept>
+
+TEST_CASE("PRP agrees with Lucas-Lehmer") {
+  for (std::uint32_t p : {3u, 5u, 7u, 11u, 13u, 23u, 31u, 61u, 89u, 127u,
+                          521u, 523u, 607u, 1279u, 2203u, 2281u}) {
+    auto res = ll::prp_test(ll::PRPConfig{p});
+    REQUIRE(res.iterations == p);
+    REQUIRE(res.rollbacks == 0);
+    REQUIRE(res.is_probable_prime == ll::ll_test(ll::LLConfig{p, false}).is_prime);
+  }
+  REQUIRE_THROWS_AS(ll::prp_test(ll::PRPConfig{91}), std::invalid_argument);
+}
+
+TEST_CASE("Gerbicz check catches an injected error and rolls back") {
+  const std::uint32_t p = 4423; // M_4423 is prime
+  for (ll::Engine e : {ll::Engine::Gmp, ll::Engine::Ibdwt}) {
+    ll::PRPConfig cfg{p, e};
+    auto clean = ll::prp_test(cfg);
+    REQUIRE(clean.is_probable_prime);
+    REQUIRE(clean.gerbicz_checks >= 8);
+
+    cfg.inject_error_at = 2000;
+    auto res = ll::prp_test(cfg);
+    REQUIRE(res.rollbacks == 1);
+    REQUIRE(res.is_probable_prime);
+    REQUIRE(res.res64 == clean.res64);
+  }
+
+  // explicit block and check interval
+  ll::PRPConfig cfg{p};
+  cfg.block = 50;
+  cfg.check_every = 500;
+  cfg.inject_error_at = 777;
+  auto res = ll::prp_test(cfg);
+  REQUIRE(res.block == 50);
+  REQUIRE(res.rollbacks == 1);
+  REQUIRE(res.is_probable_prime);
+
+  // composite: same residue with or without the fault
+  auto comp = ll::prp_test(ll::PRPConfig{4457});
+  cfg = ll::PRPConfig{4457};
+  cfg.inject_error_at = 1000;
+  auto comp_faulty = ll::prp_test(cfg);
+  REQUIRE_FALSE(comp.is_probable_prime);
+  REQUIRE(comp_faulty.res64 == comp.res64);
+}
+
+TEST_CASE("PRP honours the cancel token") {
+  ll::CancelToken token;
+  token.cancel();
+  ll::PRPConfig cfg{1279};
+  cfg.cancel = &token;
+  auto res = ll::prp_test(cfg);
+  REQUIRE(res.cancelled);
+  REQUIRE(res.iterations == 0);
+}
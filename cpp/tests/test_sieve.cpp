@@ -0,0 +1,34 @@
+#include "ll/prime.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <cstdint>
+#include <stdexcept>
+#include <vector>
+
+namespace {
+std::vector<std::uint32_t> by_trial_division(std::uint64_t a, std::uint64_t b) {
+  std::vector<std::uint32_t> out;
+  for (std::uint64_t n = a; n < b; ++n) {
+    bool prime = n >= 2;
+    for (std::uint64_t d = 2; prime && d * d <= n; ++d)
+      prime = n % d != 0;
+    if (prime)
+      out.push_back(static_cast<std::uint32_t>(n));
+  }
+  return out;
+}
+} // namespace
+
+TEST_CASE("Sieve matches trial division on assorted windows") {
+  const std::uint64_t windows[][2] = {
+      {0, 1000}, {0, 2}, {2, 3}, {3, 18}, {17, 18}, {90000, 250000},
+      {1000000000, 1000020000}, {4294967296ull - 5000, 4294967296ull}};
+  for (const auto &w : windows)
+    REQUIRE(ll::primes_in_range(w[0], w[1]) == by_trial_division(w[0], w[1]));
+}
+
+TEST_CASE("Sieve counts and bounds") {
+  REQUIRE(ll::primes_in_range(0, 1000000).size() == 78498);
+  REQUIRE(ll::primes_in_range(10, 10).empty());
+  REQUIRE(ll::primes_in_range(4294967296ull - 100, 4294967296ull).back() == 4294967291u);
+  REQUIRE_THROWS_AS(ll::primes_in_range(0, 4294967297ull), std::invalid_argument);
+}
@@ -0,0 +1,87 @@
+#include "ll/factor.hpp"
+#include "ll/prime.hpp"
+#include <catch2/catch_test_macros.hpp>
+#include <stdexcept>
+#include <vector>
+
+TEST_CASE("Trial factoring finds known smallest factors") {
+  using ll::TFConfig; using ll::trial_factor;
+  struct Known { std::uint32_t p; std::uint64_t q; };
+  for (auto [p, q] : {Known{11, 23}, Known{23, 47}, Known{29, 233},
+                      Known{37, 223}, Known{43, 431}, Known{47, 2351},
+                      Known{1000033, 6000199}}) {
+    auto res = trial_factor(TFConfig{p, 0, 40});
+    REQUIRE(res.factor == q);
+    REQUIRE(res.factor == 2 * res.k * p + 1);
+  }
+}
+
+TEST_CASE("Trial factoring finds nothing for Mersenne primes") {
+  using ll::TFConfig; using ll::trial_factor;
+  for (auto p : {3u, 5u, 7u, 13u, 31u, 61u, 127u, 521u, 1279u}) {
+    auto res = trial_factor(TFConfig{p});
+    REQUIRE(res.factor == 0); // M_p itself is never reported
+  }
+}
+
+TEST_CASE("Trial factoring respects the bit window") {
+  using ll::TFConfig; using ll::trial_factor;
+  // 47's smallest factor 2351 has 12 bits; searching from 2^12 skips it
+  auto res = trial_factor(TFConfig{47, 12, 20});
+  REQUIRE(res.factor != 2351);
+  REQUIRE_THROWS_AS(trial_factor(TFConfig{47, 0, 64}), std::invalid_argument);
+  REQUIRE_THROWS_AS(trial_factor(TFConfig{45}), std::invalid_argument);
+}
+
+TEST_CASE("Pre-screen certifies Euler and small-k factors") {
+  using ll::PrescreenRule;
+  const std::vector<std::uint32_t> ps{2, 3, 5, 7, 11, 13, 23, 29, 47, 61, 83, 1000033};
+  auto res = ll::prescreen(ps);
+  REQUIRE(res.p == ps);
+  // 11, 23 and 83 are = 3 (mod 4) with 2p + 1 prime; 3 is excluded (7 = M_3)
+  REQUIRE((res.factor == std::vector<std::uint64_t>{0, 0, 0, 0, 23, 0, 47, 233, 2351, 0, 167, 6000199}));
+  REQUIRE(res.rule[4] == std::uint8_t(PrescreenRule::Euler));
+  REQUIRE(res.rule[10] == std::uint8_t(PrescreenRule::Euler));
+  REQUIRE(res.rule[7] == std::uint8_t(PrescreenRule::SmallFactor));
+  REQUIRE(res.k[8] == 25);
+  REQUIRE(res.rule[9] == std::uint8_t(PrescreenRule::None)); // M_61 is prime
+
+  // agrees with trial factoring over the same k window
+  std::vector<std::uint32_t> block;
+  for (std::uint32_t p = 3; p < 20000; p += 2)
+    if (ll::is_prime_exponent(p)) block.push_back(p);
+  auto many = ll::prescreen(block, 16);
+  for (std::size_t i = 0; i < block.size(); ++i) {
+    const std::uint64_t q_end = 2 * 16 * std::uint64_t{block[i]} + 2;
+    const unsigned bits = 64 - __builtin_clzll(q_end);
+    auto tf = ll::trial_factor(ll::TFConfig{block[i], 0, bits});
+    const bool in_window = tf.factor != 0 && tf.factor < q_end;
+    REQUIRE(many.factor[i] == (in_window ? tf.factor : 0));
+  }
+
+  REQUIRE_THROWS_AS(ll::prescreen({7u, 9u}), std::invalid_argument);
+}
+
+TEST_CASE("P-1 finds smooth factors in stage 1 and stage 2") {
+  using ll::PM1Config; using ll::pm1_factor;
+  // M_67 = 193707721 * 761838257287; 193707720 = 2^3 3^3 5 67 2677
+  auto s1 = pm1_factor(PM1Config{67, 3000, 0});
+  REQUIRE(s1.factor == "193707721");
+  REQUIRE(s1.stage == 1);
+
+  auto s2 = pm1_factor(PM1Config{67, 1000, 3000});
+  REQUIRE(s2.factor == "193707721");
+  REQUIRE(s2.stage == 2);
+
+  auto none = pm1_factor(PM1Config{67, 1000, 2000});
+  REQUIRE(none.factor.empty());
+  REQUIRE(none.stage == 0);
+}
+
+TEST_CASE("P-1 bounds are only chosen when they pay off") {
+  REQUIRE(ll::pm1_default_bounds(1279).b1 == 0); // LL is cheaper
+  auto b = ll::pm1_default_bounds(60000011);
+  REQUIRE(b.b1 > 0);
+  REQUIRE(b.b2 > b.b1);
+  REQUIRE(b.probability > 0.0);
+}
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# scripts/bench.py
+"""
+Benchmarks for the LL core and the API's hot paths.
+
+  python3 scripts/bench.py                       # all suites, JSON to stdout
+  python3 scripts/bench.py --out bench.json      # ... and save it
+  python3 scripts/bench.py --baseline bench.json # compare; exit 1 on regression
+  python3 scripts/bench.py --only square,sieve --quick
+
+Suites:
+  square     ns per LL step (square + subtract + Mersenne reduce) by p and engine
+  callback   ll_test time with a progress callback at strides 1/100/auto,
+             relative to no callback
+  sieve      primes_in_range throughput (integers scanned per second)
+  decimal    write_mersenne_decimal throughput (digits per second)
+  scheduler  exponents/second of block 0 through the API's block runner and
+             worker pool (temporary database)
+
+Every metric records its unit and direction; --baseline flags those that got
+worse by more than --tolerance (relative).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+try:
+    import llcore  # type: ignore
+except ImportError:
+    sys.path.append(str(ROOT / "build" / "bindings" / "python"))
+    import llcore  # type: ignore
+
+SQUARE_PS = [1279, 9941, 44497, 86243, 216091, 756839, 1257787]
+SQUARE_PS_QUICK = [1279, 9941, 86243]
+CALLBACK_P = 21701
+SIEVE_START, SIEVE_SPAN = 10**9, 10**7
+DECIMAL_P = 6972593
+DECIMAL_P_QUICK = 756839
+SCHEDULER_SECS = 10.0
+
+Results = dict[str, dict[str, Any]]
+
+
+def metric(
+    out: Results, name: str, value: float, unit: str, higher_is_better: bool, **extra
+):
+    out[name] = {
+        "value": value,
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+        **extra,
+    }
+    print(f"  {name:<40} {value:>14.4g} {unit}", file=sys.stderr)
+
+
+def best_of(repeats: int, fn: Callable[[], float]) -> float:
+    return min(fn() for _ in range(max(1, repeats)))
+
+
+# ---- suites ----------------------------------------------------------------
+
+
+def bench_square(out: Results, args) -> None:
+    """Calibrate the step count to ~args.target seconds per p, keep the best run."""
+    for p in SQUARE_PS_QUICK if args.quick else SQUARE_PS:
+        for engine in ("gmp", "mpn", "ibdwt"):
+            probe = llcore.time_squarings(p, 8, engine)
+            per_iter = max(1.0, probe["ns_per_iter"])
+            iters = int(min(max(8, args.target * 1e9 / per_iter), p))
+            best = best_of(
+                args.repeats,
+                lambda p=p, iters=iters, engine=engine: llcore.time_squarings(
+                    p, iters, engine
+                )["ns_per_iter"],
+            )
+            metric(
+                out,
+                f"square.{engine}.p{p}",
+                best,
+                "ns/iter",
+                False,
+                iterations=iters,
+                engine_info=probe["engine_info"],
+            )
+
+
+def bench_callback(out: Results, args) -> None:
+    p = CALLBACK_P
+
+    def run(**kw) -> float:
+        t0 = time.perf_counter()
+        llcore.ll_test(p, **kw)
+        return time.perf_counter() - t0
+
+    base = best_of(args.repeats, lambda: run())
+    metric(out, f"callback.none.p{p}", base, "s", False)
+    for label, stride in (("1", 1), ("100", 100), ("auto", 0)):
+        t = best_of(
+            args.repeats,
+            lambda stride=stride: run(
+                progress_stride=stride, callback=lambda i, d: None
+            ),
+        )
+        metric(
+            out,
+            f"callback.stride_{label}.overhead",
+            (t - base) / base * 100,
+            "%",
+            False,
+        )
+
+
+def bench_sieve(out: Results, args) -> None:
+    span = SIEVE_SPAN // 10 if args.quick else SIEVE_SPAN
+
+    def run() -> float:
+        t0 = time.perf_counter()
+        llcore.primes_in_range(SIEVE_START, SIEVE_START + span)
+        return time.perf_counter() - t0
+
+    metric(out, "sieve.1e9", span / best_of(args.repeats, run), "ints/s", True)
+
+
+def bench_decimal(out: Results, args) -> None:
+    p = DECIMAL_P_QUICK if args.quick else DECIMAL_P
+    digits = int(p * math.log10(2)) + 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(pathlib.Path(tmp) / "M.txt")
+
+        def run() -> float:
+            t0 = time.perf_counter()
+            llcore.write_mersenne_decimal(p, path)
+            return time.perf_counter() - t0
+
+        metric(
+            out, f"decimal.p{p}", digits / best_of(args.repeats, run), "digits/s", True
+        )
+
+
+def bench_scheduler(out: Results, args) -> None:
+    """Run block 0 through blocks.run_block for a fixed time on a scratch DB."""
+    sys.path.insert(0, str(ROOT / "api"))
+    from types import SimpleNamespace
+
+    from app import db as dao
+    from app import ws
+    from app.routes import blocks
+    from app.services.costmodel import CostModel
+    from app.services.persistence import Persistence
+    from app.services.scheduler import WorkerPool
+
+    secs = SCHEDULER_SECS / 4 if args.quick else SCHEDULER_SECS
+
+    async def run(db_path: pathlib.Path) -> tuple[int, float, int]:
+        state = SimpleNamespace(
+            block_topics={},
+            block_cancel=set(),
+            block_progress={},
+            block_tokens={},
+            pool=WorkerPool(),
+            db=dao.connect(db_path),
+            costs=CostModel(blocks.BATCH_MAX_P, llcore.ibdwt_min_exponent()),
+        )
+        state.broadcaster = ws.Broadcaster(state.block_topics)
+        state.store = Persistence(state.db)
+        app = SimpleNamespace(state=state)
+        state.store.start()
+        state.pool.start()
+        try:
+            # seeding is setup, not part of the measurement
+            await state.store.read(blocks._seed_block, 0)
+            t0 = time.perf_counter()
+            await blocks.run_block(app, 0, tf=False)
+            while state.pool.is_scheduled(0) and time.perf_counter() - t0 < secs:
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - t0
+            state.pool.cancel(0)
+            blocks.cancel_running(app, 0)
+            while state.pool.is_scheduled(0):
+                await asyncio.sleep(0.05)
+            await state.store.flush()
+            row = state.db.execute(
+                "SELECT COUNT(*) AS n FROM exponents WHERE status='done'"
+            ).fetchone()
+            return int(row["n"]), elapsed, state.pool.size
+        finally:
+            await asyncio.to_thread(state.pool.shutdown)
+            await state.store.close()
+            state.db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        done, elapsed, workers = asyncio.run(run(pathlib.Path(tmp) / "bench.db"))
+    metric(
+        out, "scheduler.block0", done / elapsed, "exponents/s", True, workers=workers
+    )
+
+
+SUITES = {
+    "square": bench_square,
+    "callback": bench_callback,
+    "sieve": bench_sieve,
+    "decimal": bench_decimal,
+    "scheduler": bench_scheduler,
+}
+
+
+# ---- report / compare --------------------------------------------------------
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> list[str]:
+    """Names of metrics that are worse than baseline by more than `tolerance`."""
+    worse = []
+    print(
+        f"\n  {'metric':<40} {'baseline':>12} {'now':>12} {'change':>8}",
+        file=sys.stderr,
+    )
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None or base["unit"] != cur["unit"]:
+            continue
+        b, c = float(base["value"]), float(cur["value"])
+        if cur["unit"] == "%":
+            # overheads: compare percentage points, not ratios of small numbers
+            delta = c - b
+            bad = delta > tolerance * 100
+            change = f"{delta:+.1f}pp"
+        else:
+            rel = (c - b) / b if b else 0.0
+            bad = (-rel if cur["higher_is_better"] else rel) > tolerance
+            change = f"{rel * 100:+.1f}%"
+        flag = "  REGRESSION" if bad else ""
+        print(f"  {name:<40} {b:>12.4g} {c:>12.4g} {change:>8}{flag}", file=sys.stderr)
+        if bad:
+            worse.append(name)
+    return worse
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--only", default="", help="comma-separated suites (default: all)")
+    ap.add_argument("--quick", action="store_true", help="smaller sizes, for CI")
+    ap.add_argument(
+        "--repeats", type=int, default=3, help="runs per measurement (best kept)"
+    )
+    ap.add_argument(
+        "--target", type=float, default=0.2, help="seconds per square measurement"
+    )
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--baseline", help="JSON report to compare against")
+    ap.add_argument(
+        "--tolerance", type=float, default=0.10, help="allowed relative slowdown"
+    )
+    args = ap.parse_args(argv)
+
+    names = [s for s in args.only.split(",") if s] or list(SUITES)
+    unknown = [s for s in names if s not in SUITES]
+    if unknown:
+        ap.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    results: Results = {}
+    for name in names:
+        print(f"==> {name}", file=sys.stderr)
+        SUITES[name](results, args)
+
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "git": _git_rev(),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        pathlib.Path(args.out).write_text(text + "\n")
+
+    if args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text())["results"]
+        worse = compare(results, baseline, args.tolerance)
+        if worse:
+            print(f"\n{len(worse)} regression(s): {', '.join(worse)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# scripts/worker.py
+"""
+Remote worker: pulls exponents from a Mersenne Lab API over HTTP and tests
+them with llcore, so a running block can be spread over many hosts.
+
+  python3 scripts/worker.py --api http://10.0.0.5:8000
+  python3 scripts/worker.py --api http://127.0.0.1:8000 --procs 4   # 4 "nodes"
+  python3 scripts/worker.py --block 3 --once
+
+Each process leases one exponent at a time (POST /leases), heartbeats while
+the test runs (POST /leases/{id}/heartbeat, which also keeps the lease from
+expiring) and submits the verdict (POST /leases/{id}/result). The lease kind
+follows the block's run: 'll' runs a Lucas-Lehmer test, 'prp' a Gerbicz-checked
+PRP test whose probable primes are confirmed by LL before submitting. If the
+block is stopped, or on SIGINT/SIGTERM, the test is cancelled and the lease
+given back; if the server says the lease is gone, the work is dropped.
+
+Only the standard library and llcore are needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+# Longest wait between attempts to submit a result while the server is down.
+SUBMIT_BACKOFF_MAX = 60.0
+
+try:
+    import llcore  # type: ignore
+except ImportError:
+    sys.path.append(str(ROOT / "build" / "bindings" / "python"))
+    import llcore  # type: ignore
+
+
+class Api:
+    def __init__(self, base: str, timeout: float = 30.0):
+        self.base = base.rstrip("/")
+        self.timeout = timeout
+
+    def call(self, method: str, path: str, body: dict | None = None) -> tuple[int, Any]:
+        """(status, decoded JSON or None). Raises OSError if the server is unreachable."""
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            self.base + path,
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                raw = r.read()
+                return r.status, json.loads(raw) if raw else None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+class Worker:
+    def __init__(
+        self, api: Api, name: str, block_id: int | None, state_dir: pathlib.Path
+    ):
+        self.api = api
+        self.name = name
+        self.block_id = block_id
+        self.state_dir = state_dir
+        self.stopping = threading.Event()
+        self.token: Any | None = None
+
+    def stop(self, *_):
+        self.stopping.set()
+        if self.token is not None:
+            self.token.cancel()
+
+    # ---- one lease -----------------------------------------------------------
+
+    def _test(self, lease: dict, token, progress: list[Any], out: dict[str, Any]):
+        """Run the leased test (worker thread). Leaves out['result'] unset if cancelled."""
+        p = int(lease["p"])
+        ck = self.state_dir / f"M_{p}.ckpt"
+        try:
+            prp = None
+            if lease["kind"] == "prp":
+                prp = llcore.prp_test(p, cancel=token, progress=progress[0])
+                if prp["cancelled"]:
+                    return
+                if not prp["is_probable_prime"]:
+                    out["result"] = {
+                        "is_prime": False,
+                        "ns_elapsed": int(prp["ns_elapsed"]),
+                        "engine_info": prp["engine_info"],
+                        "prp": _prp_outcome(prp),
+                    }
+                    return
+                progress[0] = llcore.Progress()  # probable prime: confirm with LL
+            res = llcore.ll_resume(p, str(ck), progress=progress[0], cancel=token)
+            if res["cancelled"]:
+                return
+            out["result"] = {
+                "is_prime": bool(res["is_prime"]),
+                "ns_elapsed": int(res["ns_elapsed"]),
+                "engine_info": res.get("engine_info"),
+                "prp": _prp_outcome(prp) if prp else None,
+            }
+        except Exception as e:  # noqa: BLE001 - reported, and the lease goes back
+            out["error"] = str(e)
+        finally:
+            if "result" in out or "error" in out:
+                ck.unlink(missing_ok=True)
+
+    def run_lease(self, lease: dict) -> str:
+        """Test one leased exponent to the end. Returns what became of it."""
+        lid = lease["lease_id"]
+        token = llcore.CancelToken()
+        self.token = token
+        if self.stopping.is_set():
+            token.cancel()
+        progress = [llcore.Progress()]
+        out: dict[str, Any] = {}
+        t = threading.Thread(
+            target=self._test, args=(lease, token, progress, out), daemon=True
+        )
+        t.start()
+        lost = False
+        every = float(lease.get("heartbeat_secs") or 30)
+        while True:
+            t.join(timeout=every)
+            if not t.is_alive():
+                break
+            prog = progress[0]
+            try:
+                status, reply = self.api.call(
+                    "POST",
+                    f"/leases/{lid}/heartbeat",
+                    {"iteration": int(prog.iteration), "total": int(prog.total)},
+                )
+            except OSError as e:
+                log(self.name, f"heartbeat failed ({e}); carrying on")
+                continue
+            if status == 410:
+                lost = True
+                token.cancel()
+            elif status == 200 and reply.get("cancel"):
+                token.cancel()
+        self.token = None
+
+        if "result" in out:
+            status = self._submit(lid, out["result"])
+            if status is None:
+                return "result unsent (server unreachable)"
+            return "submitted" if status == 200 else f"result rejected ({status})"
+        if lost:
+            return "lease lost"
+        try:
+            self.api.call("DELETE", f"/leases/{lid}")
+        except OSError as e:
+            # the lease expires on its own and the exponent is queued again
+            log(self.name, f"release failed ({e}); leaving the lease to expire")
+        return f"failed: {out['error']}" if "error" in out else "released"
+
+    def _submit(self, lid: str, result: dict) -> int | None:
+        """
+        POST a finished test's result, retrying with backoff while the server
+        is unreachable: the test may have taken hours. Returns the HTTP status,
+        or None if the worker is stopped before the server answers.
+        """
+        delay = 1.0
+        while True:
+            try:
+                status, _ = self.api.call("POST", f"/leases/{lid}/result", result)
+                return status
+            except OSError as e:
+                if self.stopping.is_set():
+                    return None
+                log(self.name, f"submitting failed ({e}); retrying in {delay:.0f}s")
+            self.stopping.wait(delay)
+            delay = min(delay * 2, SUBMIT_BACKOFF_MAX)
+
+    # ---- main loop -----------------------------------------------------------
+
+    def run(self, once: bool = False, idle_secs: float = 5.0) -> int:
+        done = 0
+        while not self.stopping.is_set():
+            try:
+                status, lease = self.api.call(
+                    "POST", "/leases", {"worker": self.name, "block_id": self.block_id}
+                )
+            except OSError as e:
+                log(self.name, f"server unreachable ({e})")
+                status, lease = 0, None
+            if status != 200:
+                if once and status == 204:
+                    break
+                self.stopping.wait(idle_secs)
+                continue
+            t0 = time.monotonic()
+            outcome = self.run_lease(lease)
+            log(
+                self.name,
+                f"M_{lease['p']} ({lease['kind']}): {outcome} in {time.monotonic() - t0:.1f}s",
+            )
+            done += outcome == "submitted"
+        return done
+
+
+def _prp_outcome(prp: dict) -> dict:
+    return {
+        "is_probable_prime": bool(prp["is_probable_prime"]),
+        "res64": prp["res64"],
+        "ns_elapsed": int(prp["ns_elapsed"]),
+        "engine_info": prp["engine_info"],
+    }
+
+
+def log(name: str, msg: str) -> None:
+    print(f"[{time.strftime('%H:%M:%S')}] {name}: {msg}", file=sys.stderr, flush=True)
+
+
+def worker_main(args: argparse.Namespace) -> int:
+    name = f"{args.name or socket.gethostname()}/{os.getpid()}"
+    state = pathlib.Path(args.state_dir or tempfile.mkdtemp(prefix="ll-worker-"))
+    state.mkdir(parents=True, exist_ok=True)
+    w = Worker(Api(args.api), name, args.block, state)
+    signal.signal(signal.SIGTERM, w.stop)
+    signal.signal(signal.SIGINT, w.stop)
+    log(
+        name,
+        f"pulling from {args.api}"
+        + (f" (block {args.block})" if args.block is not None else ""),
+    )
+    done = w.run(once=args.once, idle_secs=args.idle_secs)
+    log(name, f"stopping after {done} results")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument("--api", default="http://127.0.0.1:8000", help="API base URL")
+    ap.add_argument(
+        "--block", type=int, default=None, help="only lease from this block"
+    )
+    ap.add_argument("--procs", type=int, default=1, help="worker processes to run")
+    ap.add_argument("--name", default="", help="worker name prefix (default: hostname)")
+    ap.add_argument(
+        "--state-dir", default="", help="checkpoint directory (default: temp)"
+    )
+    ap.add_argument(
+        "--idle-secs", type=float, default=5.0, help="wait when nothing to lease"
+    )
+    ap.add_argument(
+        "--once", action="store_true", help="exit when nothing is left to lease"
+    )
+    args = ap.parse_args(argv)
+
+    if args.procs <= 1:
+        return worker_main(args)
+    procs = [
+        multiprocessing.Process(target=worker_main, args=(args,))
+        for _ in range(args.procs)
+    ]
+    for pr in procs:
+        pr.start()
+    # Ctrl-C reaches the children too; each gives its lease back
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: [pr.terminate() for pr in procs])
+    for pr in procs:
+        pr.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# tests/conftest.py
+import pathlib
+import sys
+
+import pytest
+
+# the API package (api/app) imports as `app`; llcore is found by app._llcore
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "api"))
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """
+    A TestClient for a fresh API: its own SQLite file and data directories
+    under tmp_path, started and shut down like the real server.
+    """
+    from app import db
+    from app.main import create_app
+    from app.routes import blocks, digits
+    from fastapi.testclient import TestClient
+
+    db_path = tmp_path / "app.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    monkeypatch.setattr(db.connect, "__defaults__", (db_path,))
+    for module, name in (
+        (blocks, "CHECKPOINT_ROOT"),
+        (blocks, "PROOF_ROOT"),
+        (digits, "ARTIFACT_ROOT"),
+    ):
+        path = tmp_path / name.lower()
+        path.mkdir()
+        monkeypatch.setattr(module, name, path)
+    with TestClient(create_app()) as client:
+        yield client
@@ -1,16 +1,20 @@
 # tests/smoke_llcore.py
-import sys
-import pathlib
-import tempfile
+import hashlib
+import itertools
 import math
 import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
 
 try:
     import llcore  # type: ignore
 except ImportError:
     EXT = pathlib.Path(__file__).resolve().parents[1] / "build" / "bindings" / "python"
     sys.path.append(str(EXT))
-    import llcore  # type: ignore  # noqa: E402
+    import llcore  # type: ignore
 
 
 def expected_calls(p: int, stride: int) -> int:
@@ -47,18 +51,259 @@ def test_explicit_stride():
     print(f"[explicit stride] p={p} stride={stride} calls={calls}")
 
 
+def test_engines_agree():
+    for p in (521, 607, 1277, 1279):
+        gmp = llcore.ll_test(p, engine="gmp")
+        fft = llcore.ll_test(p, engine="ibdwt")
+        mpn = llcore.ll_test(p, engine="mpn")
+        assert gmp["is_prime"] == fft["is_prime"] == mpn["is_prime"]
+        assert fft["engine_info"].startswith("ibdwt:")
+        assert mpn["engine_info"].startswith("mpn:")
+    print(f"[engines] gmp == ibdwt == mpn, auto from p>={llcore.ibdwt_min_exponent()}")
+
+
+def test_checkpoint_resume():
+    p = 1279
+    ck = os.path.join(tempfile.gettempdir(), f"M_{p}.ckpt")
+    if os.path.exists(ck):
+        os.remove(ck)
+
+    def cancel_at_600(i, d):
+        if i + 1 >= 600:
+            raise RuntimeError("cancelled")
+
+    try:
+        llcore.ll_test(
+            p, progress_stride=100, callback=cancel_at_600, checkpoint_path=ck
+        )
+        raise AssertionError("expected cancel")
+    except RuntimeError as e:
+        assert "cancelled" in str(e)
+    meta = llcore.read_checkpoint(ck)
+    assert meta["p"] == p and meta["iteration"] == 600
+
+    res = llcore.ll_resume(p, ck)
+    assert res["is_prime"] is True and res["resumed_from"] == 600
+    os.remove(ck)
+    print(f"[checkpoint] p={p} resumed_from={res['resumed_from']}")
+
+
+def test_progress_channel():
+    p = 44497  # prime; long enough for the observer thread to act
+    ck = os.path.join(tempfile.gettempdir(), f"M_{p}.ckpt")
+    if os.path.exists(ck):
+        os.remove(ck)
+    prog = llcore.Progress()
+    assert prog.digest() is None
+
+    def stop_later():
+        while prog.iteration < 500:
+            time.sleep(0.001)
+        prog.request_digest()
+        while prog.digest_seq == 0:
+            time.sleep(0.001)
+        prog.cancel()
+
+    t = threading.Thread(target=stop_later)
+    t.start()
+    try:
+        llcore.ll_test(p, checkpoint_path=ck, progress=prog)
+        raise AssertionError("expected cancel")
+    except RuntimeError as e:
+        assert "cancelled" in str(e)
+    t.join()
+    it, digest = prog.digest()
+    assert it >= 500 and len(digest) == 32 and prog.cancel_requested
+    meta = llcore.read_checkpoint(ck)
+    assert (
+        meta["iteration"] >= it and prog.digest_seq == 2
+    )  # request + cancel checkpoint
+
+    res = llcore.ll_resume(p, ck, progress=llcore.Progress())
+    assert res["is_prime"] is True and res["resumed_from"] == meta["iteration"]
+    os.remove(ck)
+    print(f"[progress] p={p} digest@{it} cancelled@{meta['iteration']}")
+
+
+def test_cancel_token():
+    p = 44497
+    ck = os.path.join(tempfile.gettempdir(), f"M_{p}.token.ckpt")
+    token = llcore.CancelToken()
+    threading.Timer(0.02, token.cancel).start()
+    part = llcore.ll_test(p, cancel=token)
+    assert part["cancelled"] and 0 < part["completed"] < p - 2
+    assert len(part["residue"]) % 8 == 0
+
+    llcore.save_checkpoint(ck, p, part["completed"], part["residue"])
+    token.reset()
+    res = llcore.ll_resume(p, ck, cancel=token)
+    assert res["is_prime"] is True and not res["cancelled"]
+    assert res["resumed_from"] == part["completed"] and res["residue"] is None
+    os.remove(ck)
+    print(f"[cancel] p={p} stopped@{part['completed']} and resumed")
+
+
+def test_ll_test_many():
+    ps = [p for p in range(2, 2300) if all(p % d for d in range(2, math.isqrt(p) + 1))]
+    res = llcore.ll_test_many(ps, threads=2)
+    assert res["p"] == ps and len(res["is_prime"]) == len(ps) and all(res["done"])
+    primes = [p for p, ip in zip(res["p"], res["is_prime"]) if ip]
+    assert primes == [
+        2,
+        3,
+        5,
+        7,
+        13,
+        17,
+        19,
+        31,
+        61,
+        89,
+        107,
+        127,
+        521,
+        607,
+        1279,
+        2203,
+        2281,
+    ]
+    print(
+        f"[batch] {len(ps)} exponents in {res['ns_total'] / 1e6:.1f} ms ({res['engine_info'].split(';')[0]})"
+    )
+
+
+def test_prp():
+    for p in (127, 521, 523, 1279):
+        assert llcore.prp_test(p)["is_probable_prime"] is llcore.ll_test(p)["is_prime"]
+    clean = llcore.prp_test(4423)
+    res = llcore.prp_test(4423, inject_error_at=1500)
+    assert (
+        res["is_probable_prime"]
+        and res["rollbacks"] == 1
+        and res["res64"] == clean["res64"]
+    )
+    print(
+        f"[prp] M_4423 probable prime, {res['gerbicz_checks']} checks, 1 rollback recovered"
+    )
+
+
+def test_prp_proof():
+    p = 11213
+    # too small for a default proof; any power works for the round trip
+    assert llcore.proof_default_power(p) == 0
+    power = 3
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "M_11213.proof")
+        res = llcore.prp_test(p, proof_power=power, proof_path=path)
+        assert (
+            res["proof_power"] == power and os.path.getsize(path) == res["proof_bytes"]
+        )
+        assert not os.path.exists(path + ".points")
+        v = llcore.verify_prp_proof(path)
+        assert v["valid"] and v["is_probable_prime"] and v["res64"] == res["res64"]
+        raw = bytearray(pathlib.Path(path).read_bytes())
+        raw[100] ^= 1
+        pathlib.Path(path).write_bytes(raw)
+        try:
+            llcore.verify_prp_proof(path)
+            raise AssertionError("corrupt proof accepted")
+        except RuntimeError:
+            pass
+    print(
+        f"[proof] M_{p}: power {power}, {res['proof_bytes']} bytes, verified in "
+        f"{v['squarings']} squarings ({v['ns_elapsed'] / 1e6:.1f} ms)"
+    )
+
+
+def test_sieve():
+    assert len(llcore.primes_in_range(0, 1_000_000)) == 78498
+    ps = llcore.primes_in_range(10**9, 10**9 + 1000)
+    assert ps[0] == 1000000007 and all(a < b for a, b in itertools.pairwise(ps))
+    print(f"[sieve] {len(ps)} primes in [1e9, 1e9+1000)")
+
+
+def test_trial_factor():
+    assert llcore.trial_factor(47, max_bits=20)["factor"] == 2351
+    res = llcore.trial_factor(1279, max_bits=30)
+    assert res["factor"] is None and res["bits"] == 30
+    print(
+        f"[tf] M_47 = 2351 * ..., default depth p=1M: {llcore.tf_default_bits(1000003)} bits"
+    )
+
+
+def test_prescreen():
+    res = llcore.prescreen([11, 47, 61, 1000033])
+    assert res["factor"] == [23, 2351, 0, 6000199]
+    assert res["rule"] == bytes([1, 2, 0, 2])
+    block = llcore.primes_in_range(0, 1_000_000)
+    res = llcore.prescreen(block)
+    hits = sum(1 for f in res["factor"] if f)
+    print(
+        f"[prescreen] block 0: {hits}/{len(block)} certified in {res['ns_elapsed'] / 1e6:.0f} ms"
+    )
+
+
+def test_pm1():
+    res = llcore.pm1_factor(67, b1=1000, b2=3000)
+    assert res["factor"] == 193707721 and res["stage"] == 2
+    assert llcore.pm1_default_bounds(1279)["b1"] == 0
+    print(f"[pm1] M_67 factor={res['factor']} stage={res['stage']}")
+
+
+def test_time_squarings():
+    for engine in ("gmp", "mpn", "ibdwt"):
+        t = llcore.time_squarings(9941, 50, engine)
+        assert t["iterations"] == 50 and t["ns"] > 0
+        assert t["engine_info"].startswith(engine)
+    try:
+        llcore.time_squarings(9, 10)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("non-prime exponent accepted")
+    print(
+        f"[time_squarings] p=9941 {t['ns_per_iter']:.0f} ns/iter ({t['engine_info']})"
+    )
+
+
 def test_decimal_writer():
     p = 31
     out = os.path.join(tempfile.gettempdir(), f"M_{p}.txt")
     meta = llcore.write_mersenne_decimal(p, out)
-    text = open(out, "r").read().strip()
+    text = pathlib.Path(out).read_text().strip()
     assert meta["digits"] == len(text)
     assert text == "2147483647"
+    assert meta["sha256"] == hashlib.sha256(b"2147483647\n").hexdigest()
+
+    seen = []
+    big = llcore.write_mersenne_decimal(
+        86243, out, callback=lambda done, total: seen.append((done, total))
+    )
+    assert seen[-1] == (big["digits"], llcore.mersenne_decimal_digits(86243))
+    assert big["sha256"] == hashlib.sha256(pathlib.Path(out).read_bytes()).hexdigest()
+    try:
+        llcore.write_mersenne_decimal(86243, out, memory_limit=1024)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("memory ceiling ignored")
     print(f"[writer] p={p} digits={meta['digits']} path={out}")
 
 
 if __name__ == "__main__":
     test_auto_stride()
     test_explicit_stride()
+    test_engines_agree()
+    test_checkpoint_resume()
+    test_progress_channel()
+    test_cancel_token()
+    test_ll_test_many()
+    test_prp()
+    test_prp_proof()
+    test_sieve()
+    test_trial_factor()
+    test_prescreen()
+    test_pm1()
+    test_time_squarings()
     test_decimal_writer()
     print("OK")
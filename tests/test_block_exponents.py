@@ -0,0 +1,61 @@
+# tests/test_block_exponents.py
+from app import db as dao
+
+
+def _page(api, **params):
+    r = api.get("/blocks/0/exponents", params={"format": "rows", **params})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_pages_cover_the_block(api):
+    first = _page(api, limit=5000)
+    seen = [e["p"] for e in first["exponents"]]
+    after = first["next"]
+    while after is not None:
+        page = _page(api, limit=5000, after=after)
+        seen += [e["p"] for e in page["exponents"]]
+        after = page["next"]
+    assert seen == sorted(seen) and len(seen) == len(set(seen))
+    assert len(seen) == first["block"]["candidate_count"]
+
+
+def test_since_returns_only_changes(api):
+    version = _page(api, limit=1)["version"]
+    assert _page(api, since=version)["count"] == 0
+
+    database = api.app.state.db
+    p = _page(api, limit=1, status="queued")["exponents"][0]["p"]
+    assert dao.exponent_start(database, p)
+    dao.exponent_finish_ok(database, p, 0, 42, "test")
+
+    delta = _page(api, since=version)
+    assert [e["p"] for e in delta["exponents"]] == [p]
+    assert delta["exponents"][0]["status"] == "done"
+    assert delta["more"] is False and delta["version"] > version
+    # nothing changed since the delta's own version
+    assert _page(api, since=delta["version"])["count"] == 0
+
+
+def test_since_pages_when_limited(api):
+    version = _page(api, limit=1)["version"]
+    database = api.app.state.db
+    ps = [e["p"] for e in _page(api, limit=3, status="queued")["exponents"]]
+    for p in ps:
+        assert dao.exponent_start(database, p)
+    got = []
+    while True:
+        delta = _page(api, since=version, limit=2)
+        got += [e["p"] for e in delta["exponents"]]
+        version = delta["version"]
+        if not delta["more"]:
+            break
+    assert got == ps
+
+
+def test_columns_and_filters(api):
+    cols = api.get("/blocks/0/exponents", params={"limit": 10}).json()
+    assert cols["count"] == 10 and set(cols["exponents"]) >= {"p", "status"}
+    bad = api.get("/blocks/0/exponents", params={"since": 0, "status": "queued"})
+    assert bad.status_code == 400
+    assert api.get("/blocks/0/exponents", params={"limit": 0}).status_code == 400
@@ -0,0 +1,58 @@
+# tests/test_db.py
+import sqlite3
+import threading
+
+import pytest
+from app import db
+
+
+@pytest.fixture
+def database(tmp_path):
+    d = db.Database(tmp_path / "app.db")
+    yield d
+    d.close()
+
+
+def test_concurrent_writes_all_commit(database):
+    database.write(lambda c: c.execute("CREATE TABLE t (k INTEGER PRIMARY KEY)"))
+
+    def insert(start: int):
+        futs = [
+            database.submit(lambda c, k: c.execute("INSERT INTO t VALUES (?)", (k,)), k)
+            for k in range(start, start + 200)
+        ]
+        for f in futs:
+            f.result()
+
+    threads = [threading.Thread(target=insert, args=(i * 200,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert database.execute("SELECT count(*) FROM t").fetchone()[0] == 800
+
+
+def test_failed_op_spares_its_batch(database):
+    database.write(lambda c: c.execute("CREATE TABLE t (k INTEGER PRIMARY KEY)"))
+
+    def insert(c, k):
+        c.execute("INSERT INTO t VALUES (?)", (k,))
+        c.execute("INSERT INTO t VALUES (?)", (k + 1,))
+
+    # the middle op inserts k=1, then collides on k=2: only it is rolled back
+    ok1, bad, ok2 = (database.submit(insert, k) for k in (2, 1, 10))
+    ok1.result()
+    ok2.result()
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result()
+    keys = [r[0] for r in database.execute("SELECT k FROM t ORDER BY k")]
+    assert keys == [2, 3, 10, 11]
+
+
+def test_reader_is_per_thread(database):
+    box = []
+    t = threading.Thread(target=lambda: box.append(database.reader()))
+    t.start()
+    t.join()
+    assert database.reader() is database.reader()
+    assert box[0] is not database.reader()
@@ -0,0 +1,59 @@
+# tests/test_jobs.py
+import time
+
+from app import db as dao
+
+
+def _wait_done(api, job_id: str, timeout: float = 60.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = api.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_result_is_memoized(api):
+    first = api.post("/jobs", json={"p": 127}).json()
+    job = _wait_done(api, first["id"])
+    assert job["status"] == "done" and job["result"]["is_prime"] is True
+
+    again = api.post("/jobs", json={"p": 127}).json()
+    assert again == {"id": first["id"], "cached": True}
+    # the registry only holds live jobs; the record comes from the jobs table
+    assert api.app.state.ll_jobs.get(first["id"]) is None
+    assert api.get(f"/jobs/{first['id']}").json() == job
+
+
+def test_block_verdict_is_reused(api):
+    api.get("/blocks/0", params={"exponents": False})
+    p = api.app.state.db.execute(
+        "SELECT p FROM exponents WHERE status='done' AND factor IS NOT NULL LIMIT 1"
+    ).fetchone()[0]
+    r = api.post("/jobs", json={"p": p}).json()
+    assert r["cached"] is True
+    job = api.get(f"/jobs/{r['id']}").json()
+    assert job["status"] == "done"
+    assert job["result"]["source"] == "block" and job["result"]["is_prime"] is False
+
+
+def test_identical_requests_coalesce(api):
+    first = api.post("/jobs", json={"p": 44497}).json()
+    second = api.post("/jobs", json={"p": 44497}).json()
+    assert second == {"id": first["id"], "coalesced": True}
+    assert _wait_done(api, first["id"])["result"]["is_prime"] is True
+
+
+def test_live_job_limit(api):
+    registry = api.app.state.ll_jobs
+    registry.max_live = 0
+    r = api.post("/jobs", json={"p": 9941})
+    assert r.status_code == 429
+    # the refused request leaves nothing behind
+    assert not registry._live
+    assert dao.job_latest_result(api.app.state.db, "ll", 9941) is None
+
+    registry.max_live = 1
+    ok = api.post("/jobs", json={"p": 9941}).json()
+    assert _wait_done(api, ok["id"])["result"]["is_prime"] is True
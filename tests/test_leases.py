@@ -0,0 +1,100 @@
+# tests/test_leases.py
+import time
+
+import pytest
+from app import db as dao
+from app.routes import leases
+
+
+@pytest.fixture
+def leasable(api):
+    """Block 0 marked running with a single queued exponent a worker may lease."""
+    database = api.app.state.db
+    api.get("/blocks/0", params={"exponents": False})
+    p = database.execute(
+        "SELECT min(p) FROM exponents WHERE block_id=0 AND status='queued' AND p>=?",
+        (leases.LEASE_MIN_P,),
+    ).fetchone()[0]
+    database.write(
+        lambda c: c.execute(
+            "UPDATE exponents SET status='done' WHERE block_id=0 AND p!=?", (p,)
+        )
+    )
+    dao.block_set_running(database, 0, "{}")
+    return p
+
+
+def _status(api, p: int) -> str:
+    return dao.exponent_get(api.app.state.db, p)["status"]
+
+
+def test_lease_submit(api, leasable):
+    lease = api.post("/leases", json={"worker": "w1", "block_id": 0}).json()
+    assert lease["p"] == leasable and lease["kind"] == "ll"
+    assert _status(api, leasable) == "running"
+    assert [r["p"] for r in api.get("/leases").json()] == [leasable]
+    # nothing else to hand out while it is held
+    assert api.post("/leases", json={"worker": "w2"}).status_code == 204
+
+    hb = api.post(f"/leases/{lease['lease_id']}/heartbeat", json={"iteration": 5})
+    assert hb.status_code == 200 and hb.json()["cancel"] is False
+
+    result = {"is_prime": False, "ns_elapsed": 7, "engine_info": "remote"}
+    r = api.post(f"/leases/{lease['lease_id']}/result", json=result)
+    assert r.json() == {"ok": True, "p": leasable}
+    assert _status(api, leasable) == "done"
+    assert api.get("/leases").json() == []
+    # a lease is settled once
+    assert (
+        api.post(f"/leases/{lease['lease_id']}/result", json=result).status_code == 410
+    )
+    # nothing queued or leased is left, so the block's run is over
+    assert dao.block_get(api.app.state.db, 0)["status"] != "running"
+
+
+def test_lease_expiry(api, leasable):
+    lease = api.post("/leases", json={"worker": "w1", "block_id": 0}).json()
+    later = int(time.time()) + leases.LEASE_TTL_SECS + 1
+    expired = api.app.state.db.write(dao.leases_expire, later)
+    assert [int(r["p"]) for r in expired] == [leasable]
+    assert _status(api, leasable) == "queued"
+
+    lease_id = lease["lease_id"]
+    assert api.post(f"/leases/{lease_id}/heartbeat", json={}).status_code == 410
+    result = {"is_prime": True}
+    assert api.post(f"/leases/{lease_id}/result", json=result).status_code == 410
+    assert api.delete(f"/leases/{lease_id}").status_code == 410
+
+    # the exponent is up for grabs again, under a new lease
+    again = api.post("/leases", json={"worker": "w2", "block_id": 0}).json()
+    assert again["p"] == leasable and again["lease_id"] != lease_id
+
+
+def test_lease_expiring_under_a_local_run(api, leasable, monkeypatch):
+    database = api.app.state.db
+    lease = api.post("/leases", json={"worker": "w1", "block_id": 0}).json()
+    # a second exponent for a local run to hold the block with
+    q = database.execute(
+        "SELECT min(p) FROM exponents WHERE block_id=0 AND factor IS NULL AND p>?",
+        (leasable,),
+    ).fetchone()[0]
+    database.write(
+        lambda c: c.execute("UPDATE exponents SET status='queued' WHERE p=?", (q,))
+    )
+    start = dao.exponent_start
+
+    def expire_first(conn, p):
+        # the lease runs out while the run is busy, so it never sees leasable
+        if p == q:
+            conn.write(dao.leases_expire, int(time.time()) + leases.LEASE_TTL_SECS + 1)
+        return start(conn, p)
+
+    monkeypatch.setattr(dao, "exponent_start", expire_first)
+    assert api.post("/blocks/0/start", params={"tf": False}).status_code == 200
+    deadline = time.monotonic() + 60
+    while dao.block_get(database, 0)["status"] == "running":
+        assert time.monotonic() < deadline, "block run did not finish"
+        time.sleep(0.05)
+    # the finished run handed the requeued exponent to a fresh one
+    assert _status(api, leasable) == "done" and _status(api, q) == "done"
+    assert api.delete(f"/leases/{lease['lease_id']}").status_code == 410
@@ -0,0 +1,46 @@
+# tests/test_readmodel.py
+from app import db as dao
+
+
+def _get(api, url: str, etag: str | None = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return api.get(
+        url, params={"limit": 2} if url == "/blocks" else {}, headers=headers
+    )
+
+
+def test_blocks_304_while_unchanged(api):
+    first = _get(api, "/blocks")
+    assert first.status_code == 200 and len(first.json()) == 2
+    etag = first.headers["etag"]
+    again = _get(api, "/blocks", etag)
+    assert again.status_code == 304 and again.headers["etag"] == etag
+
+    # a touch re-reads the block, but identical rows keep the ETag
+    api.app.state.readmodel.touch(1)
+    assert _get(api, "/blocks", etag).status_code == 304
+
+    # a committed change does not
+    dao.block_set_running(api.app.state.db, 1, "{}")
+    api.app.state.readmodel.touch(1)
+    changed = _get(api, "/blocks", etag)
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()[1]["status"] == "running"
+
+
+def test_primes_304_while_unchanged(api):
+    for url in ("/primes", "/primes/count"):
+        first = _get(api, url)
+        assert first.status_code == 200
+        assert _get(api, url, first.headers["etag"]).status_code == 304
+
+    database = api.app.state.db
+    api.get("/blocks/0", params={"exponents": False})
+    before = _get(api, "/primes/count")
+    p = 9689  # M_9689 is prime; prescreen leaves it queued
+    assert dao.exponent_start(database, p)
+    dao.exponent_finish_ok(database, p, 1, 1, "test")
+    api.app.state.readmodel.touch(0)
+    after = _get(api, "/primes/count", before.headers["etag"])
+    assert after.status_code == 200
+    assert after.json()["count"] == before.json()["count"] + 1
@@ -30,7 +30,7 @@ export default function BlockGrid() {
   }, []);
 
   async function start(id: number) {
-    await apiFetch(`/blocks/${id}/start?concurrency=1`, { method: "POST" });
+    await apiFetch(`/blocks/${id}/start`, { method: "POST" });
     setActiveBlock(id); // triggers the runner via custom event
   }
 
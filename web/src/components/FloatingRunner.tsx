@@ -39,9 +39,10 @@ export default function FloatingRunner() {
         const m = JSON.parse(ev.data as string) as BlockWsMsg;
         if (m.total != null) setTotal(m.total);
         if (m.tested != null) setTested(m.tested);
-        if (m.p != null && m.pct != null) {
-          setP(m.p);
-          setPctP(m.pct);
+        const latest = m.progress?.[m.progress.length - 1];
+        if (latest) {
+          setP(latest[0]);
+          setPctP(latest[1]);
         }
         if (m.done) handleHide(); // this triggers cleanup → close(1000) below
       } catch (e) {
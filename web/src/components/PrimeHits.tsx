@@ -3,7 +3,9 @@ import { useEffect, useMemo, useState } from "react";
 import { apiFetch, API_BASE } from "@/lib/api";
 import type { PrimeRow, DigitsCreateResp, DigitsJob } from "@/types";
 
-type Generating = { [p: number]: { jobId: string; downloadUrl?: string } };
+type Generating = {
+  [p: number]: { jobId: string; downloadUrl?: string; pct?: number };
+};
 
 export default function PrimeHits() {
   const [rows, setRows] = useState<PrimeRow[]>([]);
@@ -64,6 +66,11 @@ export default function PrimeHits() {
           [p]: { jobId: id, downloadUrl: `${API_BASE}/digits/${id}/download` },
         }));
       } else {
+        const prog = j.progress;
+        if (prog && prog.total_digits > 0) {
+          const pct = Math.floor((prog.digits_written / prog.total_digits) * 100);
+          setGen((g) => ({ ...g, [p]: { jobId: id, pct } }));
+        }
         setTimeout(poll, 800);
       }
     };
@@ -130,7 +137,9 @@ export default function PrimeHits() {
                       disabled={!!g?.jobId}
                       className="px-3 py-1.5 rounded bg-emerald-600 text-white hover:bg-emerald-500 disabled:opacity-50"
                     >
-                      {g?.jobId ? "Preparing…" : "Generate digits"}
+                      {g?.jobId
+                        ? `Preparing…${g.pct != null ? ` ${g.pct}%` : ""}`
+                        : "Generate digits"}
                     </button>
                   ) : (
                     <a
@@ -42,6 +42,8 @@ export type DigitsJob = {
   finished_at?: number | null;
   error?: string | null;
   engine_info?: string | null;
+  // while the export runs
+  progress?: { digits_written: number; total_digits: number } | null;
   artifact?: DigitsArtifact | null;
 };
 
@@ -75,14 +77,16 @@ export type BlockDetail = {
   }>;
 };
 
+// One coalesced frame per tick; fields are present only when they changed.
 export type BlockWsMsg = {
   block_id: number;
+  // latest [p, pct, stage] of each exponent updated since the last frame
+  progress?: [number, number, string][];
   last_p?: number;
-  tested: number;
-  total: number;
+  tested?: number;
+  total?: number;
   done?: boolean;
-  p?: number;
-  pct?: number;
+  stopped?: boolean;
 };
 
 export type PrimeRow = {